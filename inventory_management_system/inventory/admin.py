@@ -1,5 +1,78 @@
-from django.contrib import admin
-from .models import Category, Item, InventoryTransaction, Supplier, UserProfile
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from django.db.models import F
+from django.utils import timezone
+from .forms import StockAdjustmentForm
+from .jobs import cancel_job
+from .models import (
+    ArchivedTransaction, Bin, BinStock, Category, Item, InventoryTransaction, Job, ReorderAlert,
+    StocktakeBatch, StocktakeSession, Supplier, UserProfile, ValuationRollup, Warehouse,
+)
+from .pagination import EstimatedCountPaginator
+from .stock import StockMovementError, apply_movements
+
+
+class LargeTablePaginator(EstimatedCountPaginator):
+    # Below this many rows an exact COUNT(*) is cheap enough. Planner guesses
+    # for searches and filters can be off by orders of magnitude and link to
+    # pages that do not exist, so only the whole table is estimated
+    exact_below = 10000
+    estimate_filtered = False
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables too big to count or facet on every view.
+
+    Counts of the whole table come from the planner, the second count
+    of the unfiltered table is skipped and sidebar facet counts are off.
+    """
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class PrefixInputFilter(admin.SimpleListFilter):
+    """A text box matching the start of ``lookup``, instead of a list of links.
+
+    Rendering a link per related object means loading all of them; this
+    filters on what is typed and needs no query to render.
+    """
+    template = 'admin/inventory/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        # Only the "All" choice; the template uses its query string to clear
+        # the filter and query_parts to keep the other filters when submitting
+        params = changelist.get_filters_params()
+        params.pop(self.parameter_name, None)
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'query_parts': [
+                (name, value)
+                for name, values in params.items()
+                for value in (values if isinstance(values, list) else [values])
+            ],
+            'display': 'All',
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{f'{self.lookup}__istartswith': self.value()})
+        return queryset
+
+
+class CategoryNameFilter(PrefixInputFilter):
+    title = 'category'
+    parameter_name = 'category_name'
+    lookup = 'category__name'
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -7,10 +80,17 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name']
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(LargeTableAdmin):
     list_display = ['name', 'sku', 'category', 'quantity', 'selling_price', 'status']
-    list_filter = ['category', 'status', 'created_at']
-    search_fields = ['name', 'sku', 'barcode']
+    list_filter = [CategoryNameFilter, 'status']
+    list_select_related = ['category']
+    # Prefix matches, served by the item_*_prefix_idx indexes (migration 0008)
+    search_fields = ['name__istartswith', 'sku__istartswith', 'barcode__istartswith']
+    search_help_text = 'Start of the name, SKU or barcode.'
+    date_hierarchy = 'created_at'
+    ordering = ['name', 'id']
+    autocomplete_fields = ['category', 'created_by']
+    actions = ['adjust_stock']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
@@ -27,15 +107,164 @@ class ItemAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Adjust stock of selected items', permissions=['change'])
+    def adjust_stock(self, request, queryset):
+        # Goes through the stock engine, so every item gets an 'adjust'
+        # transaction and bin allocations are respected
+        form = StockAdjustmentForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            movements = [
+                {
+                    'item': pk,
+                    'type': 'adjust',
+                    'quantity': form.cleaned_data['quantity'],
+                    'notes': form.cleaned_data['notes'],
+                    'reference_number': form.cleaned_data['reference_number'],
+                }
+                for pk in queryset.values_list('pk', flat=True)
+            ]
+            try:
+                records = apply_movements(movements, user=request.user)
+            except StockMovementError as exc:
+                self.message_user(request, str(exc), messages.ERROR)
+            else:
+                self.message_user(
+                    request, f'Adjusted stock of {len(records)} item(s).', messages.SUCCESS
+                )
+            return None
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Adjust stock',
+            'opts': self.model._meta,
+            'media': self.media,
+            'form': form,
+            'count': queryset.count(),
+            'preview': queryset[:20],
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across') == '1',
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/inventory/item/adjust_stock.html', context)
+
 @admin.register(InventoryTransaction)
-class InventoryTransactionAdmin(admin.ModelAdmin):
+class InventoryTransactionAdmin(LargeTableAdmin):
     list_display = ['item', 'transaction_type', 'quantity', 'created_at', 'created_by']
-    list_filter = ['transaction_type', 'created_at']
+    list_filter = ['transaction_type']
+    list_select_related = ['item', 'created_by']
+    # Walks txn_created_id_idx backwards, for both the list and the drill-down
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at', '-id']
+    autocomplete_fields = ['item', 'created_by']
+    raw_id_fields = ['bin', 'to_bin']
     readonly_fields = ['created_at']
 
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ['item', 'transaction_type', 'quantity', 'created_at', 'created_by']
+    list_filter = ['transaction_type']
+    list_select_related = ['item', 'created_by']
+    raw_id_fields = ['item', 'created_by']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ReorderAlert)
+class ReorderAlertAdmin(admin.ModelAdmin):
+    list_display = ['item', 'quantity', 'min_stock_level', 'created_at', 'resolved_at']
+    list_select_related = ['item']
+    raw_id_fields = ['item']
+
+@admin.register(Warehouse)
+class WarehouseAdmin(admin.ModelAdmin):
+    list_display = ['code', 'name', 'is_active']
+    search_fields = ['code', 'name']
+
+@admin.register(Bin)
+class BinAdmin(admin.ModelAdmin):
+    list_display = ['code', 'warehouse', 'description']
+    list_filter = ['warehouse']
+    list_select_related = ['warehouse']
+    search_fields = ['code']
+
+@admin.register(BinStock)
+class BinStockAdmin(admin.ModelAdmin):
+    # Read-only: stock in bins only changes through movements and transfers
+    list_display = ['item', 'bin', 'warehouse', 'quantity', 'updated_at']
+    list_filter = ['warehouse']
+    list_select_related = ['item', 'bin__warehouse', 'warehouse']
+    raw_id_fields = ['item', 'bin']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ValuationRollup)
+class ValuationRollupAdmin(admin.ModelAdmin):
+    # Read-only: rows are maintained by inventory.valuation
+    list_display = ['dimension', 'label', 'item_count', 'units', 'stock_value', 'retail_value', 'stale']
+    list_filter = ['dimension', 'stale']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'total', 'attempts', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['created_by']
+    readonly_fields = [f.name for f in Job._meta.fields]
+    actions = ['retry_jobs', 'cancel_jobs']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected failed or cancelled jobs')
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status__in=['failed', 'cancelled']).update(
+            status='queued',
+            run_after=timezone.now(),
+            max_attempts=F('attempts') + 1,
+            worker='',
+            finished_at=None,
+        )
+        self.message_user(request, f'Queued {retried} job(s) again.', messages.SUCCESS)
+
+    @admin.action(description='Cancel selected jobs')
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(cancel_job(job) for job in queryset.filter(status__in=['queued', 'running']))
+        self.message_user(request, f'Cancelled {cancelled} job(s).', messages.SUCCESS)
+
+class StocktakeBatchInline(admin.TabularInline):
+    model = StocktakeBatch
+    fields = ['batch_id', 'scans', 'items', 'created_by', 'created_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(StocktakeSession)
+class StocktakeSessionAdmin(admin.ModelAdmin):
+    # Counts are posted from the stocktake page, which checks variances first
+    list_display = ['name', 'location', 'shelf', 'status', 'created_by', 'created_at', 'posted_at']
+    list_filter = ['status']
+    list_select_related = ['created_by']
+    search_fields = ['name', 'location']
+    readonly_fields = ['status', 'created_by', 'posted_by', 'posted_at']
+    inlines = [StocktakeBatchInline]
+
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
-    list_display = ['name', 'contact_person', 'email', 'phone']
+    list_display = ['name', 'contact_person', 'email', 'phone', 'lead_time_days']
     search_fields = ['name', 'contact_person']
 
 @admin.register(UserProfile)
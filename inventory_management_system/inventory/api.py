@@ -0,0 +1,440 @@
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition, require_GET
+
+from .history import stock_series
+from .jobs import job_payload
+from .lookup import lookup_code
+from .models import (
+    ArchivedTransaction,
+    BinStock,
+    Category,
+    InventoryTransaction,
+    Item,
+    Job,
+    Supplier,
+)
+from .pagination import InvalidCursor, KeysetPaginator
+from .stats import get_dashboard_stats
+from .views import ItemFilterMixin, user_jobs
+from .warehouses import cached_warehouse_summary
+
+MAX_PAGE_SIZE = 200
+MAX_BULK_CODES = 500
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+ITEM_FIELDS = {
+    "id": lambda i: i.pk,
+    "sku": lambda i: i.sku,
+    "barcode": lambda i: i.barcode,
+    "name": lambda i: i.name,
+    "description": lambda i: i.description,
+    "category": lambda i: i.category_id,
+    "category_name": lambda i: i.category.name,
+    "quantity": lambda i: i.quantity,
+    "min_stock_level": lambda i: i.min_stock_level,
+    "max_stock_level": lambda i: i.max_stock_level,
+    "status": lambda i: i.status,
+    "cost_price": lambda i: i.cost_price,
+    "selling_price": lambda i: i.selling_price,
+    "location": lambda i: i.location,
+    "shelf": lambda i: i.shelf,
+    "supplier": lambda i: i.supplier,
+    "last_restocked": lambda i: _iso(i.last_restocked),
+    "created_at": lambda i: _iso(i.created_at),
+    "updated_at": lambda i: _iso(i.updated_at),
+}
+ITEM_DEFAULT_FIELDS = [
+    "id", "sku", "barcode", "name", "category", "quantity", "status",
+    "location", "shelf", "updated_at",
+]
+
+CATEGORY_FIELDS = {
+    "id": lambda c: c.pk,
+    "name": lambda c: c.name,
+    "description": lambda c: c.description,
+    "updated_at": lambda c: _iso(c.updated_at),
+}
+
+SUPPLIER_FIELDS = {
+    "id": lambda s: s.pk,
+    "name": lambda s: s.name,
+    "contact_person": lambda s: s.contact_person,
+    "email": lambda s: s.email,
+    "phone": lambda s: s.phone,
+    "website": lambda s: s.website,
+    "updated_at": lambda s: _iso(s.updated_at),
+}
+
+TRANSACTION_FIELDS = {
+    "id": lambda t: t.pk,
+    "item": lambda t: t.item_id,
+    "transaction_type": lambda t: t.transaction_type,
+    "quantity": lambda t: t.quantity,
+    "previous_quantity": lambda t: t.previous_quantity,
+    "new_quantity": lambda t: t.new_quantity,
+    "reference_number": lambda t: t.reference_number,
+    "related_order": lambda t: t.related_order,
+    "notes": lambda t: t.notes,
+    "bin": lambda t: t.bin_id,
+    "to_bin": lambda t: t.to_bin_id,
+    "created_by": lambda t: t.created_by_id,
+    "created_at": lambda t: _iso(t.created_at),
+}
+
+
+class APIError(Exception):
+    def __init__(self, field, message, status=400):
+        super().__init__(message)
+        self.field = field
+        self.status = status
+
+
+def api_view(view):
+    """JSON counterpart of login_required plus GET-only and error handling."""
+
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"errors": {"__all__": ["Authentication required."]}}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except APIError as exc:
+            return JsonResponse({"errors": {exc.field: [str(exc)]}}, status=exc.status)
+
+    return wrapper
+
+
+def requested_fields(request, available, default):
+    names = request.GET.get("fields")
+    if not names:
+        return list(default)
+    fields = [name.strip() for name in names.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise APIError("fields", f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def serialize(obj, fields, available):
+    return {name: available[name](obj) for name in fields}
+
+
+def page_size(request, default=50):
+    try:
+        return max(1, min(int(request.GET.get("limit", default)), MAX_PAGE_SIZE))
+    except ValueError:
+        raise APIError("limit", "limit must be an integer.")
+
+
+def codes(request, name):
+    # Accepts ?sku=A&sku=B as well as ?skus=A,B
+    values = request.GET.getlist(name) + [
+        value for value in request.GET.get(f"{name}s", "").split(",") if value
+    ]
+    if len(values) > MAX_BULK_CODES:
+        raise APIError(name, f"At most {MAX_BULK_CODES} codes per request.")
+    return values
+
+
+def make_etag(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def collection_etag(queryset, request, stamp_field="updated_at"):
+    # For small unpaged lists: any insert, delete or edit changes the count
+    # or the newest timestamp; the query string distinguishes fields.
+    state = queryset.order_by().aggregate(count=Count("pk"), stamp=Max(stamp_field))
+    return make_etag(request.get_full_path(), state["count"], state["stamp"])
+
+
+def page_response(request, page, stamp, render):
+    """A paged list response, or 304 when the client already has the page.
+
+    The ETag is built from the page's own rows (``stamp(obj)`` for each) and
+    cursors, so revalidating costs the page query and nothing over the rest
+    of the result set; only serializing the page is saved.
+    """
+    etag = quote_etag(
+        make_etag(
+            request.get_full_path(),
+            page.next_cursor,
+            page.previous_cursor,
+            *(stamp(obj) for obj in page),
+        )
+    )
+    response = get_conditional_response(request, etag=etag) or render()
+    response.headers.setdefault("ETag", etag)
+    return response
+
+
+class _Filters(ItemFilterMixin):
+    def __init__(self, request):
+        self.request = request
+
+
+def item_queryset(request):
+    queryset = _Filters(request).filter_items(Item.objects.all())
+    return filter_codes(request, queryset)
+
+
+def filter_codes(request, queryset):
+    skus, barcodes = codes(request, "sku"), codes(request, "barcode")
+    if skus:
+        queryset = queryset.filter(sku__in=skus)
+    if barcodes:
+        queryset = queryset.filter(barcode__in=barcodes)
+    return queryset
+
+
+def item_columns(fields):
+    # Columns to load with .only(); name and id are the pagination key,
+    # updated_at the ETag
+    columns = {name for name in fields if name != "category_name"}
+    columns |= {"id", "name", "updated_at"}
+    if "category_name" in fields:
+        columns |= {"category", "category__name", "category__updated_at"}
+    return sorted(columns)
+
+
+def item_stamp(fields):
+    if "category_name" in fields:
+        # Renaming the category changes category_name
+        return lambda item: (item.pk, item.updated_at, item.category.updated_at)
+    return lambda item: (item.pk, item.updated_at)
+
+
+@api_view
+def item_list(request):
+    """Items matching the item list filters, optionally limited to given
+    SKUs/barcodes, paged by (name, id) cursor."""
+    fields = requested_fields(request, ITEM_FIELDS, ITEM_DEFAULT_FIELDS)
+    queryset = item_queryset(request).only(*item_columns(fields))
+    if "category_name" in fields:
+        queryset = queryset.select_related("category")
+    paginator = KeysetPaginator(queryset, page_size(request), ("name", "id"))
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor as exc:
+        raise APIError("cursor", str(exc))
+    return page_response(
+        request,
+        page,
+        item_stamp(fields),
+        lambda: JsonResponse(
+            {
+                "results": [serialize(item, fields, ITEM_FIELDS) for item in page],
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        ),
+    )
+
+
+def item_detail_etag(request, pk):
+    stamps = Item.objects.filter(pk=pk).values_list("updated_at", "category__updated_at").first()
+    if stamps is None:
+        return None
+    return make_etag(pk, *stamps, request.GET.get("fields", ""))
+
+
+@api_view
+@condition(etag_func=item_detail_etag)
+def item_detail(request, pk):
+    fields = requested_fields(request, ITEM_FIELDS, ITEM_FIELDS)
+    item = get_object_or_404(Item.objects.select_related("category"), pk=pk)
+    return JsonResponse(serialize(item, fields, ITEM_FIELDS))
+
+
+def category_list_etag(request):
+    return collection_etag(Category.objects.all(), request)
+
+
+@api_view
+@condition(etag_func=category_list_etag)
+def category_list(request):
+    fields = requested_fields(request, CATEGORY_FIELDS, CATEGORY_FIELDS)
+    return JsonResponse(
+        {"results": [serialize(c, fields, CATEGORY_FIELDS) for c in Category.objects.all()]}
+    )
+
+
+def supplier_list_etag(request):
+    return collection_etag(Supplier.objects.all(), request)
+
+
+@api_view
+@condition(etag_func=supplier_list_etag)
+def supplier_list(request):
+    fields = requested_fields(request, SUPPLIER_FIELDS, SUPPLIER_FIELDS)
+    return JsonResponse(
+        {"results": [serialize(s, fields, SUPPLIER_FIELDS) for s in Supplier.objects.all()]}
+    )
+
+
+@api_view
+def warehouse_list(request):
+    """Warehouses with the items in stock, units and stock value in each."""
+    results = [
+        {**row, "value": str(row["value"])} for row in cached_warehouse_summary()
+    ]
+    return JsonResponse({"results": results})
+
+
+@api_view
+def item_bins(request, pk):
+    """Where an item's stock is: quantity per bin, plus stock not in a bin."""
+    item = get_object_or_404(Item.objects.only("quantity"), pk=pk)
+    rows = (
+        BinStock.objects.filter(item=item, quantity__gt=0)
+        .order_by("warehouse__code", "bin__code")
+        .values("bin_id", "bin__code", "warehouse_id", "warehouse__code", "quantity")
+    )
+    bins = [
+        {
+            "bin": row["bin_id"],
+            "bin_code": row["bin__code"],
+            "warehouse": row["warehouse_id"],
+            "warehouse_code": row["warehouse__code"],
+            "quantity": row["quantity"],
+        }
+        for row in rows
+    ]
+    return JsonResponse(
+        {
+            "item": item.pk,
+            "quantity": item.quantity,
+            "unallocated": item.quantity - sum(row["quantity"] for row in bins),
+            "bins": bins,
+        }
+    )
+
+
+def transaction_queryset(request, model=InventoryTransaction):
+    queryset = model.objects.all()
+    item = request.GET.get("item")
+    if item:
+        if not item.isdigit():
+            raise APIError("item", "item must be an id.")
+        queryset = queryset.filter(item_id=item)
+    transaction_type = request.GET.get("type")
+    if transaction_type:
+        queryset = queryset.filter(transaction_type=transaction_type)
+    return queryset
+
+
+@api_view
+def transaction_list(request):
+    fields = requested_fields(request, TRANSACTION_FIELDS, TRANSACTION_FIELDS)
+    paginator = KeysetPaginator(
+        transaction_queryset(request),
+        page_size(request),
+        ("-created_at", "-id"),
+        fallbacks=[transaction_queryset(request, ArchivedTransaction)],
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor as exc:
+        raise APIError("cursor", str(exc))
+    # Transactions are append-only, so their ids identify the page
+    return page_response(
+        request,
+        page,
+        lambda record: record.pk,
+        lambda: JsonResponse(
+            {
+                "results": [serialize(t, fields, TRANSACTION_FIELDS) for t in page],
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        ),
+    )
+
+
+@api_view
+def dashboard_stats(request):
+    """The dashboard counters, from the same cache as the dashboard page."""
+    return JsonResponse(get_dashboard_stats())
+
+
+@api_view
+def code_lookup(request):
+    """Resolve a scanned SKU or barcode (?code=) through the lookup cache."""
+    code = request.GET.get("code", "").strip()
+    if not code:
+        raise APIError("code", "code is required.")
+    payload = lookup_code(code)
+    if payload is None:
+        raise APIError("code", f"No item with SKU or barcode {code!r}.", status=404)
+    return JsonResponse(payload)
+
+
+def report_date(request, name, default=None):
+    value = request.GET.get(name)
+    if not value:
+        if default is None:
+            raise APIError(name, f"{name} is required.")
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise APIError(name, f"{name} must be a date in YYYY-MM-DD format.")
+
+
+@api_view
+def stock_over_time(request):
+    """Closing stock quantity and value per day/week/month for one item, a
+    category or a location (?item=, ?category=, ?location=), from the
+    snapshot rollups."""
+    start = report_date(request, "start")
+    end = report_date(request, "end", default=start)
+    if end < start:
+        raise APIError("end", "end must not be before start.")
+    interval = request.GET.get("interval", "day")
+    if interval not in ("day", "week", "month"):
+        raise APIError("interval", "interval must be day, week or month.")
+
+    items = Item.objects.all()
+    for param, lookup in (("item", "pk"), ("category", "category_id")):
+        value = request.GET.get(param)
+        if value:
+            if not value.isdigit():
+                raise APIError(param, f"{param} must be an id.")
+            items = items.filter(**{lookup: value})
+    if request.GET.get("location"):
+        items = items.filter(location=request.GET["location"])
+    if not items.query.where:
+        items = None
+
+    return JsonResponse({"results": stock_series(start, end, items, interval)})
+
+
+@api_view
+def job_list(request):
+    """The user's most recent jobs (every user's for staff), newest first;
+    ?status= narrows them down."""
+    jobs = user_jobs(request)
+    status = request.GET.get("status")
+    if status:
+        if status not in dict(Job.STATUS_CHOICES):
+            raise APIError("status", f"Unknown status {status!r}.")
+        jobs = jobs.filter(status=status)
+    return JsonResponse({"results": [job_payload(job) for job in jobs[:page_size(request)]]})
+
+
+@api_view
+def job_detail(request, pk):
+    """Status and progress of one job; poll until ``status`` is final."""
+    return JsonResponse(job_payload(get_object_or_404(user_jobs(request), pk=pk)))
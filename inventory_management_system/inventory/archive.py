@@ -0,0 +1,64 @@
+import calendar
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .history import compact, start_of
+from .models import ArchivedTransaction, InventoryTransaction
+
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def months_before(day, months):
+    """``day`` moved back ``months`` calendar months, clamped to month end."""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def archive_cutoff(months, today=None):
+    # Transactions created before this instant are eligible for archiving
+    return start_of(months_before(today or timezone.localdate(), months))
+
+
+def archive_transactions(before, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    """Move transactions created before ``before`` into the archive table.
+
+    Stock history up to the cutoff is rolled up into snapshots first, so
+    point-in-time queries never need the archived rows. Rows move oldest
+    first in batches of ``batch_size``, each batch copied and deleted in one
+    transaction, so an interrupted run loses nothing and resumes where it
+    stopped. ``progress``, if given, is called with the running total after
+    each batch. Returns the number of rows archived.
+    """
+    compact(timezone.localdate(before) - timedelta(days=1))
+    fields = [field.attname for field in ArchivedTransaction._meta.concrete_fields]
+    pending = InventoryTransaction.objects.filter(created_at__lt=before).order_by(
+        "created_at", "id"
+    )
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(pending.values(*fields)[:batch_size])
+            if not rows:
+                return moved
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction(**row) for row in rows]
+            )
+            InventoryTransaction.objects.filter(pk__in=[row["id"] for row in rows]).delete()
+        moved += len(rows)
+        if progress is not None:
+            progress(moved)
+
+
+def reaches_archive(since=None):
+    """Whether a history read going back to ``since`` needs archived rows.
+
+    Everything archived is older than every live transaction, so the archive
+    only matters when no live row is older than ``since``.
+    """
+    if since is None:
+        return True
+    return not InventoryTransaction.objects.filter(created_at__lt=since).exists()
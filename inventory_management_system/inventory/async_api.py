@@ -0,0 +1,98 @@
+# Async variants of the read-heavy JSON endpoints in inventory.api. Under an
+# ASGI server they await the async ORM on the event loop instead of holding a
+# worker thread per request. They do not compute ETags.
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+
+from .api import (
+    CATEGORY_FIELDS,
+    ITEM_DEFAULT_FIELDS,
+    ITEM_FIELDS,
+    APIError,
+    _Filters,
+    filter_codes,
+    item_columns,
+    page_size,
+    requested_fields,
+    serialize,
+)
+from .lookup import alookup_code
+from .models import Category, Item
+from .pagination import InvalidCursor, KeysetPaginator
+from .stats import aget_dashboard_stats
+
+
+def async_api_view(view):
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({"errors": {"__all__": ["Authentication required."]}}, status=401)
+        try:
+            return await view(request, *args, **kwargs)
+        except APIError as exc:
+            return JsonResponse({"errors": {exc.field: [str(exc)]}}, status=exc.status)
+
+    return wrapper
+
+
+@async_api_view
+async def item_list(request):
+    fields = requested_fields(request, ITEM_FIELDS, ITEM_DEFAULT_FIELDS)
+    queryset = await _Filters(request).afilter_items(Item.objects.all())
+    queryset = filter_codes(request, queryset).only(*item_columns(fields))
+    if "category_name" in fields:
+        queryset = queryset.select_related("category")
+    paginator = KeysetPaginator(queryset, page_size(request), ("name", "id"))
+    try:
+        page = await paginator.apage(request.GET.get("cursor"))
+    except InvalidCursor as exc:
+        raise APIError("cursor", str(exc))
+    return JsonResponse(
+        {
+            "results": [serialize(item, fields, ITEM_FIELDS) for item in page],
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        }
+    )
+
+
+@async_api_view
+async def item_detail(request, pk):
+    fields = requested_fields(request, ITEM_FIELDS, ITEM_FIELDS)
+    try:
+        item = await Item.objects.select_related("category").aget(pk=pk)
+    except Item.DoesNotExist:
+        raise Http404("No item matches the given query.")
+    return JsonResponse(serialize(item, fields, ITEM_FIELDS))
+
+
+@async_api_view
+async def category_list(request):
+    fields = requested_fields(request, CATEGORY_FIELDS, CATEGORY_FIELDS)
+    return JsonResponse(
+        {
+            "results": [
+                serialize(c, fields, CATEGORY_FIELDS) async for c in Category.objects.all()
+            ]
+        }
+    )
+
+
+@async_api_view
+async def dashboard_stats(request):
+    return JsonResponse(await aget_dashboard_stats())
+
+
+@async_api_view
+async def code_lookup(request):
+    code = request.GET.get("code", "").strip()
+    if not code:
+        raise APIError("code", "code is required.")
+    payload = await alookup_code(code)
+    if payload is None:
+        raise APIError("code", f"No item with SKU or barcode {code!r}.", status=404)
+    return JsonResponse(payload)
@@ -0,0 +1,129 @@
+import csv
+from itertools import chain
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+ITEM_EXPORT_FIELDS = [
+    ("id", "id"),
+    ("sku", "sku"),
+    ("barcode", "barcode"),
+    ("name", "name"),
+    ("category", "category__name"),
+    ("quantity", "quantity"),
+    ("min_stock_level", "min_stock_level"),
+    ("max_stock_level", "max_stock_level"),
+    ("status", "status"),
+    ("cost_price", "cost_price"),
+    ("selling_price", "selling_price"),
+    ("location", "location"),
+    ("shelf", "shelf"),
+    ("supplier", "supplier"),
+    ("updated_at", "updated_at"),
+]
+
+TRANSACTION_EXPORT_FIELDS = [
+    ("id", "id"),
+    ("created_at", "created_at"),
+    ("item_id", "item_id"),
+    ("sku", "item__sku"),
+    ("transaction_type", "transaction_type"),
+    ("quantity", "quantity"),
+    ("previous_quantity", "previous_quantity"),
+    ("new_quantity", "new_quantity"),
+    ("bin", "bin_id"),
+    ("to_bin", "to_bin_id"),
+    ("reference_number", "reference_number"),
+    ("related_order", "related_order"),
+    ("created_by", "created_by__username"),
+]
+
+VALUATION_EXPORT_FIELDS = [
+    ("dimension", "dimension"),
+    ("key", "key"),
+    ("label", "label"),
+    ("item_count", "item_count"),
+    ("units", "units"),
+    ("stock_value", "stock_value"),
+    ("retail_value", "retail_value"),
+    ("potential_profit", "potential_profit"),
+    ("profit_margin", "profit_margin"),
+    ("refreshed_at", "refreshed_at"),
+    ("stale", "stale"),
+]
+
+# Per-item valuation; the last four columns are annotations from valued_items()
+ITEM_VALUATION_FIELDS = [
+    ("id", "id"),
+    ("sku", "sku"),
+    ("name", "name"),
+    ("category", "category__name"),
+    ("supplier", "supplier"),
+    ("location", "location"),
+    ("quantity", "quantity"),
+    ("cost_price", "cost_price"),
+    ("selling_price", "selling_price"),
+    ("stock_value", "stock_value"),
+    ("retail_value", "retail_value"),
+    ("potential_profit", "potential_profit"),
+    ("profit_margin", "profit_margin"),
+]
+
+# Annotations from stocktake.variances()
+STOCKTAKE_VARIANCE_FIELDS = [
+    ("id", "id"),
+    ("sku", "sku"),
+    ("barcode", "barcode"),
+    ("name", "name"),
+    ("location", "location"),
+    ("shelf", "shelf"),
+    ("quantity", "quantity"),
+    ("expected", "expected"),
+    ("counted", "counted"),
+    ("variance", "variance"),
+    ("cost_price", "cost_price"),
+    ("variance_value", "variance_value"),
+]
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    # File-like object whose write() hands the line back to csv.writer's caller
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Stream tuples from the database ``chunk_size`` rows at a time.
+
+    ``queryset`` may also be a list of querysets, streamed one after another.
+    """
+    lookups = [lookup for _, lookup in fields]
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+    return chain.from_iterable(
+        qs.values_list(*lookups).iterator(chunk_size=chunk_size) for qs in querysets
+    )
+
+
+def stream_csv(queryset, fields, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in fields])
+    for row in export_rows(queryset, fields, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_json(queryset, fields, chunk_size=CHUNK_SIZE):
+    headers = [header for header, _ in fields]
+    encoder = DjangoJSONEncoder()
+    yield "["
+    separator = ""
+    for row in export_rows(queryset, fields, chunk_size):
+        yield separator + encoder.encode(dict(zip(headers, row)))
+        separator = ","
+    yield "]"
+
+
+STREAMERS = {
+    "csv": (stream_csv, "text/csv"),
+    "json": (stream_json, "application/json"),
+}
@@ -0,0 +1,116 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Item
+from .search import search_items
+from .warehouses import cached_warehouse_summary
+
+FACETS_CACHE_KEY = "inventory:item-facets"
+FACET_FIELDS = ("status", "location", "shelf", "category")
+# Columns whose change can move an item between facet values
+FACET_COLUMNS = {"status", "location", "shelf", "category", "category_id"}
+
+
+def facet_rows(queryset):
+    """Item counts grouped by every facet column at once.
+
+    One ``GROUP BY`` yields all combinations that occur, which is far fewer
+    rows than items, and every facet can be derived from it in Python.
+    """
+    return [
+        (
+            row["status"],
+            row["location"],
+            row["shelf"],
+            str(row["category_id"]),
+            row["category__name"],
+            row["count"],
+        )
+        for row in queryset.order_by()
+        .values("status", "location", "shelf", "category_id", "category__name")
+        .annotate(count=Count("id"))
+    ]
+
+
+def cached_facet_rows():
+    rows = cache.get(FACETS_CACHE_KEY)
+    if rows is None:
+        rows = facet_rows(Item.objects.all())
+        cache.set(
+            FACETS_CACHE_KEY, rows, getattr(settings, "INVENTORY_FACETS_CACHE_TIMEOUT", 300)
+        )
+    return rows
+
+
+def invalidate_facets():
+    cache.delete(FACETS_CACHE_KEY)
+
+
+def _matches(row, filters, skip):
+    status, location, shelf, category, _, _ = row
+    # Same semantics as ItemFilterMixin.filter_items
+    if skip != "status" and filters.get("status") and status != filters["status"]:
+        return False
+    if skip != "location" and filters.get("location") and location != filters["location"]:
+        return False
+    if skip != "shelf" and filters.get("shelf") and shelf != filters["shelf"]:
+        return False
+    if skip != "category" and filters.get("category") and category != filters["category"]:
+        return False
+    return True
+
+
+def get_facets(params):
+    """Return value/label/count choices for each item list filter.
+
+    Each facet's counts apply every active filter except its own, so picking
+    a location still shows how many items every other location holds. With
+    no search term the grouped rows come from cache; a search narrows them
+    with one grouped query over the matching items.
+    """
+    filters = {field: params.get(field, "") for field in FACET_FIELDS}
+    search = params.get("search", "").strip()
+    if search:
+        rows = facet_rows(search_items(Item.objects.all(), search))
+    else:
+        rows = cached_facet_rows()
+
+    counts = {field: Counter() for field in FACET_FIELDS}
+    category_names = {}
+    for row in rows:
+        category_names[row[3]] = row[4]
+        for index, field in enumerate(FACET_FIELDS):
+            if _matches(row, filters, field):
+                counts[field][row[index]] += row[5]
+
+    def choices(field, labels):
+        return [
+            {"value": value, "label": label, "count": counts[field][value]}
+            for value, label in labels
+        ]
+
+    # Warehouse counts are items in stock there, not narrowed by other filters
+    warehouses = [
+        {"value": str(row["id"]), "label": row["name"], "count": row["items"]}
+        for row in cached_warehouse_summary()
+        if row["is_active"]
+    ]
+
+    return {
+        "warehouse": warehouses,
+        "status": choices("status", Item.STATUS_CHOICES),
+        "location": choices(
+            "location", sorted((v, v) for v in counts["location"] if v)
+        ),
+        "shelf": choices("shelf", sorted((v, v) for v in counts["shelf"] if v)),
+        "category": choices(
+            "category",
+            sorted(
+                ((v, category_names[v]) for v in counts["category"]),
+                key=lambda choice: choice[1],
+            ),
+        ),
+    }
@@ -0,0 +1,237 @@
+import math
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import chain
+from statistics import NormalDist
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import reaches_archive
+from .models import ArchivedTransaction, InventoryTransaction, Item, Supplier
+from .signals import items_updated
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FORECAST_DAYS = 365
+SERVICE_LEVEL = 0.95
+COVER_DAYS = 30
+UPDATE_BATCH_SIZE = 1000
+
+
+def default_lead_time():
+    return getattr(settings, "INVENTORY_DEFAULT_LEAD_TIME_DAYS", 7)
+
+
+def daily_demand(since, until, category_ids=None):
+    """Yield ``(item_id, units)`` per item and day with outgoing stock.
+
+    Summed by the database, so only one row per item-day crosses the wire
+    however many movements there were. Reads through to the archive when
+    the window reaches it.
+    """
+    models = [InventoryTransaction]
+    if reaches_archive(since):
+        models.append(ArchivedTransaction)
+    querysets = []
+    for model in models:
+        queryset = model.objects.filter(
+            transaction_type="out", created_at__gte=since, created_at__lt=until
+        )
+        if category_ids is not None:
+            queryset = queryset.filter(item__category_id__in=category_ids)
+        querysets.append(
+            queryset.annotate(day=TruncDate("created_at"))
+            .values("item_id", "day")
+            .annotate(units=Sum("quantity"))
+            .order_by()
+            .values_list("item_id", "units")
+            .iterator(chunk_size=10000)
+        )
+    # An item-day split across live and archive tables shows up twice; the
+    # sums below are unaffected, only the squares would be, and the split
+    # day is at most one per item.
+    return chain.from_iterable(querysets)
+
+
+def demand_stats(rows, days):
+    """Mean and standard deviation of daily demand per item.
+
+    Days without outgoing stock count as zero demand. Returns
+    ``(item_ids, means, deviations)``; NumPy arrays when NumPy is installed,
+    lists otherwise.
+    """
+    if np is not None:
+        # Filled straight from the row iterator, without a Python list per column
+        pairs = np.fromiter(rows, dtype=[("item_id", np.int64), ("units", np.float64)])
+        units = pairs["units"]
+        item_ids, index = np.unique(pairs["item_id"], return_inverse=True)
+        totals = np.bincount(index, weights=units, minlength=len(item_ids))
+        squares = np.bincount(index, weights=units * units, minlength=len(item_ids))
+        means = totals / days
+        deviations = np.sqrt(np.maximum(squares / days - means * means, 0.0))
+        return item_ids, means, deviations
+
+    totals = defaultdict(float)
+    squares = defaultdict(float)
+    for item_id, quantity in rows:
+        totals[item_id] += quantity
+        squares[item_id] += quantity * quantity
+    item_ids = sorted(totals)
+    means = [totals[pk] / days for pk in item_ids]
+    deviations = [
+        math.sqrt(max(squares[pk] / days - mean * mean, 0.0))
+        for pk, mean in zip(item_ids, means)
+    ]
+    return item_ids, means, deviations
+
+
+def reorder_levels(means, deviations, lead_times, service_level, cover_days):
+    """Reorder point (min) and order-up-to level (max) per item.
+
+    Safety stock covers demand variability over the lead time at the given
+    service level: ``z * sd * sqrt(lead)``. The reorder point adds expected
+    lead-time demand; the max adds ``cover_days`` of demand on top.
+    """
+    z = NormalDist().inv_cdf(service_level)
+    if np is not None:
+        lead = np.asarray(lead_times, dtype=np.float64)
+        reorder_point = np.ceil(means * lead + z * deviations * np.sqrt(lead))
+        order_up_to = np.maximum(np.ceil(reorder_point + means * cover_days), reorder_point + 1)
+        return reorder_point.astype(np.int64).tolist(), order_up_to.astype(np.int64).tolist()
+
+    minimums, maximums = [], []
+    for mean, deviation, lead in zip(means, deviations, lead_times):
+        reorder_point = math.ceil(mean * lead + z * deviation * math.sqrt(lead))
+        minimums.append(reorder_point)
+        maximums.append(max(math.ceil(reorder_point + mean * cover_days), reorder_point + 1))
+    return minimums, maximums
+
+
+def forecast_partition(category_ids, since, until, service_level, cover_days):
+    """Suggested ``{item_id: (min, max)}`` for items with demand in the window.
+
+    ``category_ids=None`` covers the whole catalog. Items without outgoing
+    stock in the window get no suggestion.
+    """
+    days = max((until - since).days, 1)
+    item_ids, means, deviations = demand_stats(
+        daily_demand(since, until, category_ids), days
+    )
+    if not len(item_ids):
+        return {}
+    lead_by_supplier = dict(Supplier.objects.values_list("name", "lead_time_days"))
+    items = Item.objects.exclude(status="discontinued")
+    if category_ids is not None:
+        items = items.filter(category_id__in=category_ids)
+    suppliers = dict(items.values_list("id", "supplier").iterator(chunk_size=10000))
+    fallback = default_lead_time()
+    lead_times = [lead_by_supplier.get(suppliers.get(pk), fallback) for pk in item_ids]
+    minimums, maximums = reorder_levels(
+        means, deviations, lead_times, service_level, cover_days
+    )
+    return {
+        int(pk): (low, high)
+        for pk, low, high in zip(item_ids, minimums, maximums)
+        if pk in suppliers
+    }
+
+
+def _run_partition(args):
+    # Forked workers must not reuse the parent's database connections
+    connections.close_all()
+    return forecast_partition(*args)
+
+
+def category_partitions(workers):
+    """Split categories into ``workers`` groups of similar item counts."""
+    counts = Item.objects.values_list("category_id").annotate(n=Count("id")).order_by("-n")
+    partitions = [[] for _ in range(workers)]
+    sizes = [0] * workers
+    for category_id, count in counts:
+        smallest = sizes.index(min(sizes))
+        partitions[smallest].append(category_id)
+        sizes[smallest] += count
+    return [p for p in partitions if p]
+
+
+def forecast_levels(
+    days=FORECAST_DAYS, service_level=SERVICE_LEVEL, cover_days=COVER_DAYS, workers=0, now=None
+):
+    """Suggested stock levels for every item, from the last ``days`` of demand.
+
+    With ``workers`` > 1 categories are partitioned across a process pool,
+    each worker reading and computing its own share of the history.
+    """
+    until = now or timezone.now()
+    since = until - timedelta(days=days)
+    if workers <= 1:
+        return forecast_partition(None, since, until, service_level, cover_days)
+    jobs = [
+        (partition, since, until, service_level, cover_days)
+        for partition in category_partitions(workers)
+    ]
+    connections.close_all()
+    levels = {}
+    with ProcessPoolExecutor(max_workers=len(jobs), initializer=django.setup) as pool:
+        for result in pool.map(_run_partition, jobs):
+            levels.update(result)
+    return levels
+
+
+def apply_levels(levels, batch_size=UPDATE_BATCH_SIZE):
+    """Write suggested levels back, skipping items already at them.
+
+    Levels are small integers, so many items share the same (min, max) pair;
+    each shared pair is written with one ``UPDATE ... WHERE id IN``, which
+    is far cheaper than the per-row CASE expressions ``bulk_update`` builds.
+    Pairs held by a single item go through ``bulk_update``. Returns the
+    number of items updated.
+    """
+    now = timezone.now()
+    by_level = defaultdict(list)
+    pending = sorted(levels)
+    for start in range(0, len(pending), batch_size):
+        current = Item.objects.filter(pk__in=pending[start:start + batch_size]).values_list(
+            "id", "min_stock_level", "max_stock_level"
+        )
+        for pk, low, high in current:
+            if (low, high) != levels[pk]:
+                by_level[levels[pk]].append(pk)
+
+    singles = []
+    item_ids = []
+    with transaction.atomic():
+        for (low, high), pks in by_level.items():
+            item_ids.extend(pks)
+            if len(pks) == 1:
+                singles.append(
+                    Item(pk=pks[0], min_stock_level=low, max_stock_level=high, updated_at=now)
+                )
+                continue
+            for start in range(0, len(pks), batch_size):
+                Item.objects.filter(pk__in=pks[start:start + batch_size]).update(
+                    min_stock_level=low, max_stock_level=high, updated_at=now
+                )
+        Item.objects.bulk_update(
+            singles, ["min_stock_level", "max_stock_level", "updated_at"], batch_size=batch_size
+        )
+        if item_ids:
+            item_ids.sort()
+            transaction.on_commit(
+                lambda: items_updated.send(
+                    sender=Item,
+                    item_ids=item_ids,
+                    fields=["min_stock_level", "max_stock_level", "updated_at"],
+                    bins=False,
+                )
+            )
+    return len(item_ids)
@@ -1,10 +1,78 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
+from .models import InventoryTransaction, Item
+from .stock import StockMovementError, movement_delta
 
 class UserRegisterForm(UserCreationForm):
     email = forms.EmailField(required=True)
     
     class Meta:
         model = User
-        fields = ['username', 'email', 'password1', 'password2']
\ No newline at end of file
+        fields = ['username', 'email', 'password1', 'password2']
+
+class StockMovementForm(forms.ModelForm):
+    # A bin id rather than a ModelChoiceField, so batches of movements are
+    # validated without a query per row; the stock engine checks it exists
+    bin = forms.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        model = InventoryTransaction
+        fields = ['transaction_type', 'quantity', 'notes', 'reference_number', 'related_order']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        transaction_type = cleaned_data.get('transaction_type')
+        quantity = cleaned_data.get('quantity')
+        if transaction_type and quantity is not None:
+            try:
+                movement_delta(transaction_type, quantity)
+            except StockMovementError as exc:
+                self.add_error('quantity', str(exc))
+        return cleaned_data
+
+class StockTransferForm(forms.Form):
+    from_bin = forms.IntegerField(required=False, min_value=1)
+    to_bin = forms.IntegerField(required=False, min_value=1)
+    quantity = forms.IntegerField(min_value=1)
+    notes = forms.CharField(required=False)
+    reference_number = forms.CharField(required=False, max_length=100)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        from_bin = cleaned_data.get('from_bin')
+        to_bin = cleaned_data.get('to_bin')
+        if from_bin == to_bin:
+            raise forms.ValidationError('Choose two different bins.')
+        return cleaned_data
+
+class StockAdjustmentForm(forms.Form):
+    # Signed correction applied to every selected item, as one 'adjust' movement each
+    quantity = forms.IntegerField(help_text='Use a negative number to remove stock.')
+    notes = forms.CharField(required=False)
+    reference_number = forms.CharField(required=False, max_length=100)
+
+    def clean_quantity(self):
+        quantity = self.cleaned_data['quantity']
+        try:
+            movement_delta('adjust', quantity)
+        except StockMovementError as exc:
+            raise forms.ValidationError(str(exc))
+        return quantity
+
+class ItemUpdateForm(forms.ModelForm):
+    # The quantity the editor was shown. Quantity edits are applied as a change
+    # from it, so stock that moved while the form was open is not overwritten.
+    quantity_seen = forms.IntegerField(widget=forms.HiddenInput)
+
+    class Meta:
+        model = Item
+        fields = [
+            'name', 'description', 'category', 'sku', 'barcode', 'cost_price',
+            'selling_price', 'quantity', 'min_stock_level', 'max_stock_level',
+            'status', 'location', 'shelf', 'supplier',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['quantity_seen'].initial = self.instance.quantity
@@ -0,0 +1,72 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+ITEM_ROW_TEMPLATE = "inventory/item_row.html"
+
+# Version of the cached category list, bumped on any category change
+CATEGORY_VERSION = "categories"
+
+
+@lru_cache(maxsize=None)
+def compiled_template(name):
+    # Compiled once per process, whatever loaders are configured
+    return get_template(name)
+
+
+def render_fragments(template_name, objects, key, context, timeout):
+    """Render ``template_name`` once per object, reusing cached fragments.
+
+    ``key(obj)`` must change whenever the fragment would, so stale fragments
+    are never served and need no explicit invalidation. Cached fragments are
+    fetched with a single ``get_many`` and new ones stored with a single
+    ``set_many``.
+    """
+    keyed = [(key(obj), obj) for obj in objects]
+    cached = cache.get_many([k for k, _ in keyed])
+    template = compiled_template(template_name)
+    rendered = {}
+    for k, obj in keyed:
+        if k not in cached and k not in rendered:
+            rendered[k] = template.render(context(obj))
+    if rendered:
+        cache.set_many(rendered, timeout)
+    return [mark_safe(cached.get(k) or rendered[k]) for k, _ in keyed]
+
+
+def item_row_key(item):
+    # The "v2" retires rows cached before they carried live-update hooks
+    return f"inventory:item-row:v2:{item.pk}:{item.updated_at.timestamp()}"
+
+
+def render_item_rows(items):
+    """Item list table rows, cached per item and keyed on ``updated_at``."""
+    return render_fragments(
+        ITEM_ROW_TEMPLATE,
+        items,
+        item_row_key,
+        lambda item: {"item": item},
+        getattr(settings, "INVENTORY_FRAGMENT_CACHE_TIMEOUT", 86400),
+    )
+
+
+def version_key(name):
+    return f"inventory:version:{name}"
+
+
+def cache_version(name):
+    """Current version of a group of cached fragments, for use in their keys.
+
+    Versions are timestamps rather than counters, so a version lost from the
+    cache is never reissued and old fragments cannot come back.
+    """
+    return cache.get_or_set(version_key(name), time.time_ns, None)
+
+
+def bump_version(name):
+    # Retires every fragment keyed on the old version; they simply expire
+    cache.set(version_key(name), time.time_ns(), None)
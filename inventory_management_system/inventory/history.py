@@ -0,0 +1,219 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import InventoryTransaction, Item, SnapshotRun, StockSnapshot
+
+MAX_SERIES_POINTS = 1000
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def log_quantities(day, items=None):
+    """Closing stock on ``day`` for ``items``, read straight from the log.
+
+    For each item this is the ``new_quantity`` of its last movement up to the
+    end of the day. If it has none, it is the ``previous_quantity`` of its
+    first later movement, or else its current quantity. Both lookups are
+    correlated subqueries on (item, created_at), so the log is never replayed.
+    """
+    end = start_of(day + timedelta(days=1))
+    items = Item.objects.all() if items is None else items
+    last_before = InventoryTransaction.objects.filter(
+        item=OuterRef("pk"), created_at__lt=end
+    ).order_by("-created_at", "-id")
+    first_after = InventoryTransaction.objects.filter(
+        item=OuterRef("pk"), created_at__gte=end
+    ).order_by("created_at", "id")
+    rows = (
+        items.filter(created_at__lt=end)
+        .annotate(
+            closing=Subquery(last_before.values("new_quantity")[:1]),
+            opening_after=Subquery(first_after.values("previous_quantity")[:1]),
+        )
+        .order_by()
+        .values_list("pk", "quantity", "cost_price", "closing", "opening_after")
+    )
+    state = {}
+    for pk, quantity, cost, closing, opening_after in rows.iterator(chunk_size=2000):
+        if closing is not None:
+            quantity = closing
+        elif opening_after is not None:
+            quantity = opening_after
+        state[pk] = (quantity, cost)
+    return state
+
+
+def watermark():
+    return SnapshotRun.objects.aggregate(date=Max("date"))["date"]
+
+
+def stock_at(day, items=None):
+    """Closing stock on ``day`` as ``{item_id: (quantity, unit_cost)}``.
+
+    Starts from the latest checkpoint on or before ``day``, then applies the
+    daily snapshots after it. Days after the last rollup are filled in from
+    the log for just the items that moved or were created since. Before the
+    first checkpoint, everything comes from the log.
+    """
+    checkpoint = (
+        SnapshotRun.objects.filter(is_checkpoint=True, date__lte=day)
+        .aggregate(date=Max("date"))["date"]
+    )
+    if checkpoint is None:
+        return log_quantities(day, items)
+
+    last_run = watermark()
+    snapshots = StockSnapshot.objects.filter(
+        date__gte=checkpoint, date__lte=min(day, last_run)
+    )
+    if items is not None:
+        snapshots = snapshots.filter(item__in=items.values("pk"))
+    state = {}
+    rows = snapshots.order_by("date").values_list("item_id", "quantity", "unit_cost")
+    for item_id, quantity, cost in rows.iterator(chunk_size=2000):
+        state[item_id] = (quantity, cost)
+
+    if day > last_run:
+        state.update(log_quantities(day, changed_items(last_run + timedelta(days=1), day, items)))
+    return state
+
+
+def changed_items(first_day, last_day, items=None):
+    """Items that moved or were created between two days, inclusive."""
+    start, end = start_of(first_day), start_of(last_day + timedelta(days=1))
+    moved = InventoryTransaction.objects.filter(
+        created_at__gte=start, created_at__lt=end
+    ).values("item_id")
+    items = Item.objects.all() if items is None else items
+    return items.filter(pk__in=moved) | items.filter(created_at__gte=start, created_at__lt=end)
+
+
+def save_snapshots(day, state):
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(item_id=item_id, date=day, quantity=quantity, unit_cost=cost)
+            for item_id, (quantity, cost) in state.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["item", "date"],
+        update_fields=["quantity", "unit_cost"],
+        batch_size=2000,
+    )
+
+
+def rollup_day(day):
+    # Snapshot only the items that moved or were created on the day
+    save_snapshots(day, log_quantities(day, changed_items(day, day)))
+    SnapshotRun.objects.update_or_create(date=day, defaults={"is_checkpoint": False})
+
+
+def checkpoint(day):
+    # A full snapshot of every item, so later reads need not look further back
+    save_snapshots(day, stock_at(day))
+    SnapshotRun.objects.update_or_create(date=day, defaults={"is_checkpoint": True})
+
+
+def compact(until=None):
+    """Roll up every day after the last run up to ``until`` (default
+    yesterday), writing a checkpoint on the first of each month.
+
+    The first run starts with a checkpoint on the day before the earliest
+    item or movement. Each day commits separately, so an interrupted run
+    picks up where it stopped. Returns the number of days processed.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    last_run = watermark()
+    if last_run is None:
+        earliest = [
+            InventoryTransaction.objects.aggregate(first=Min("created_at"))["first"],
+            Item.objects.aggregate(first=Min("created_at"))["first"],
+        ]
+        earliest = [timezone.localdate(value) for value in earliest if value]
+        if not earliest:
+            return 0
+        last_run = min(earliest) - timedelta(days=1)
+        if last_run > until:
+            return 0
+        with transaction.atomic():
+            checkpoint(last_run)
+
+    processed = 0
+    day = last_run + timedelta(days=1)
+    while day <= until:
+        with transaction.atomic():
+            rollup_day(day)
+            if day.day == 1:
+                checkpoint(day)
+        processed += 1
+        day += timedelta(days=1)
+    return processed
+
+
+def series_dates(start, end, interval):
+    dates, day = [], start
+    while day <= end and len(dates) < MAX_SERIES_POINTS:
+        dates.append(day)
+        if interval == "month":
+            day = (day.replace(day=1) + timedelta(days=32)).replace(day=min(start.day, 28))
+        else:
+            day += timedelta(days=7 if interval == "week" else 1)
+    return dates
+
+
+def stock_series(start, end, items=None, interval="day"):
+    """Total closing quantity and value of ``items`` at each point from
+    ``start`` to ``end``.
+
+    One ``stock_at`` call for ``start``, then a single forward pass over the
+    daily snapshots with running totals. Points past the last rollup are
+    computed directly.
+    """
+    dates = series_dates(start, end, interval)
+    if not dates:
+        return []
+    state = stock_at(start, items)
+    quantity = sum(q for q, _ in state.values())
+    value = sum((q * c for q, c in state.values()), Decimal("0"))
+    series = [{"date": start, "quantity": quantity, "value": value}]
+
+    last_run = watermark() or start
+    snapshots = StockSnapshot.objects.filter(date__gt=start, date__lte=min(end, last_run))
+    if items is not None:
+        snapshots = snapshots.filter(item__in=items.values("pk"))
+    rows = snapshots.order_by("date").values_list("date", "item_id", "quantity", "unit_cost")
+    pending = iter(dates[1:])
+    point = next(pending, None)
+
+    def emit_until(limit):
+        nonlocal point
+        while point is not None and point <= limit:
+            if point > last_run:
+                return
+            series.append({"date": point, "quantity": quantity, "value": value})
+            point = next(pending, None)
+
+    for day, item_id, new_quantity, cost in rows.iterator(chunk_size=2000):
+        emit_until(day - timedelta(days=1))
+        old_quantity, old_cost = state.get(item_id, (0, Decimal("0")))
+        quantity += new_quantity - old_quantity
+        value += new_quantity * cost - old_quantity * old_cost
+        state[item_id] = (new_quantity, cost)
+    emit_until(min(end, last_run))
+
+    while point is not None:
+        recent = stock_at(point, items)
+        series.append(
+            {
+                "date": point,
+                "quantity": sum(q for q, _ in recent.values()),
+                "value": sum((q * c for q, c in recent.values()), Decimal("0")),
+            }
+        )
+        point = next(pending, None)
+    return series
@@ -0,0 +1,276 @@
+import csv
+import io
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from . import valuation
+from .models import Category, Item
+from .signals import items_updated
+
+IMPORT_FIELDS = [
+    "name",
+    "description",
+    "sku",
+    "barcode",
+    "cost_price",
+    "selling_price",
+    "quantity",
+    "min_stock_level",
+    "max_stock_level",
+    "status",
+    "location",
+    "shelf",
+    "supplier",
+]
+REQUIRED_COLUMNS = {"name", "sku", "category", "cost_price", "selling_price"}
+
+# Stock levels of existing items change through stock movements only, so a
+# catalog refresh leaves quantity alone unless asked otherwise. Only the
+# columns present in the file are written.
+DEFAULT_UPDATE_FIELDS = [
+    f for f in IMPORT_FIELDS if f not in ("sku", "quantity")
+] + ["category", "updated_at"]
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def add_error(self, row_number, field, message):
+        self.errors.append((row_number, field, message))
+
+    @property
+    def rejected(self):
+        return len({row for row, _, _ in self.errors})
+
+    def as_dict(self, max_errors=None):
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": [
+                {"row": row, "field": field, "message": message}
+                for row, field, message in errors
+            ],
+        }
+
+    def write_error_report(self, fileobj):
+        writer = csv.writer(fileobj)
+        writer.writerow(["row", "field", "message"])
+        writer.writerows(self.errors)
+
+
+def iter_csv(fileobj):
+    """Yield ``(row_number, dict)`` pairs from a CSV file without reading it whole.
+
+    ``fileobj`` may be opened in text or binary mode.
+    """
+    if isinstance(fileobj, io.TextIOBase):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_xlsx(fileobj):
+    """Yield ``(row_number, dict)`` pairs from the first sheet of a workbook.
+
+    Requires the optional ``openpyxl`` package; the sheet is read in
+    read-only mode so rows are streamed rather than loaded into memory.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ImportError("XLSX import requires the openpyxl package.") from exc
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, [])]
+        for number, values in enumerate(rows, start=2):
+            yield number, {
+                key: "" if value is None else str(value)
+                for key, value in zip(header, values)
+            }
+    finally:
+        workbook.close()
+
+
+class ItemImporter:
+    """Validate and upsert item rows in batches, keyed on ``sku``.
+
+    Every row is checked with the model's own field validators (lengths,
+    decimal places, choices), and unique SKU/barcode conflicts are caught
+    before writing. Valid rows are written with one
+    ``bulk_create(update_conflicts=True)`` per batch. Rejected rows end up in
+    ``ImportResult.errors``, and a rejected row never affects the rest of its
+    batch.
+
+    Existing items only change in the file's columns, and a blank cell keeps
+    the item's current value; new items get the model defaults instead.
+    """
+
+    def __init__(self, batch_size=1000, user=None, update_fields=None, progress=None):
+        self.batch_size = batch_size
+        # Called with the number of rows read so far after every batch
+        self.progress = progress
+        self.user = user
+        self.update_fields = update_fields or DEFAULT_UPDATE_FIELDS
+        self.fields = {name: Item._meta.get_field(name) for name in IMPORT_FIELDS}
+        self.categories = {}
+        self.columns = None
+        self.seen_skus = set()
+        self.seen_barcodes = set()
+        # Barcodes are unique, so only one item can be without one
+        self.blank_barcode_taken = False
+
+    def run(self, rows):
+        result = ImportResult()
+        self.categories = dict(Category.objects.values_list("name", "id"))
+        self.blank_barcode_taken = Item.objects.filter(barcode="").exists()
+        rows = iter(rows)
+        read = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch, result)
+            read += len(batch)
+            if self.progress is not None:
+                self.progress(read)
+        return result
+
+    def clean_row(self, number, row, result):
+        row = {key.strip(): (value or "").strip() for key, value in row.items() if key}
+        missing = REQUIRED_COLUMNS - {key for key, value in row.items() if value}
+        for column in sorted(missing):
+            result.add_error(number, column, "This field is required.")
+        if missing:
+            return None
+
+        data, valid = {}, True
+        for name, field in self.fields.items():
+            raw = row.get(name, "")
+            if raw == "":
+                continue
+            try:
+                data[name] = field.clean(raw, None)
+            except ValidationError as exc:
+                result.add_error(number, name, " ".join(exc.messages))
+                valid = False
+        if not valid:
+            return None
+        data["category"] = row["category"]
+        return data
+
+    def resolve_categories(self, names):
+        missing = [name for name in names if name not in self.categories]
+        if missing:
+            Category.objects.bulk_create(
+                [Category(name=name) for name in missing], ignore_conflicts=True
+            )
+            self.categories.update(
+                Category.objects.filter(name__in=missing).values_list("name", "id")
+            )
+
+    def write_fields(self):
+        return [
+            name
+            for name in self.update_fields
+            if name not in self.fields or name in self.columns
+        ]
+
+    def import_batch(self, batch, result):
+        if self.columns is None:
+            self.columns = {key.strip() for key in batch[0][1] if key}
+        cleaned = []
+        for number, row in batch:
+            data = self.clean_row(number, row, result)
+            if data is None:
+                continue
+            if data["sku"] in self.seen_skus:
+                result.add_error(number, "sku", "Duplicate SKU earlier in this file.")
+                continue
+            barcode = data.get("barcode")
+            if barcode in self.seen_barcodes:
+                result.add_error(number, "barcode", "Duplicate barcode earlier in this file.")
+                continue
+            self.seen_skus.add(data["sku"])
+            if barcode:
+                self.seen_barcodes.add(barcode)
+            cleaned.append((number, data))
+        if not cleaned:
+            return
+
+        skus = [data["sku"] for _, data in cleaned]
+        barcodes = [data["barcode"] for _, data in cleaned if "barcode" in data]
+        existing = Item.objects.filter(Q(sku__in=skus) | Q(barcode__in=barcodes))
+        fields = [name for name in IMPORT_FIELDS if name in self.columns]
+        current, barcode_owner = {}, {}
+        # Groups the existing items are in now, whose valuation rollups go
+        # stale if the import moves items out of them
+        previous_groups = {dimension: set() for dimension in valuation.DIMENSIONS}
+        rows = existing.values(
+            *dict.fromkeys(["sku", "barcode", "category_id", "supplier", "location", *fields])
+        )
+        for row in rows:
+            current[row["sku"]] = row
+            if row["barcode"]:
+                barcode_owner[row["barcode"]] = row["sku"]
+            for dimension, (column, _) in valuation.DIMENSIONS.items():
+                previous_groups[dimension].add(str(row[column]))
+
+        self.resolve_categories({data["category"] for _, data in cleaned})
+
+        items, created = [], 0
+        for number, data in cleaned:
+            owner = barcode_owner.get(data.get("barcode"))
+            if owner is not None and owner != data["sku"]:
+                result.add_error(number, "barcode", f"Barcode already used by SKU {owner}.")
+                continue
+            if data["sku"] in current:
+                # Blank or missing cells keep what the item has now
+                for name in fields:
+                    data.setdefault(name, current[data["sku"]][name])
+            elif not data.get("barcode"):
+                if self.blank_barcode_taken:
+                    result.add_error(
+                        number, "barcode", "Another item already has no barcode; one is required."
+                    )
+                    continue
+                self.blank_barcode_taken = True
+            category_id = self.categories[data.pop("category")]
+            items.append(Item(category_id=category_id, created_by=self.user, **data))
+            if data["sku"] not in current:
+                created += 1
+        if not items:
+            return
+
+        with transaction.atomic():
+            Item.objects.bulk_create(
+                items,
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=self.write_fields(),
+            )
+            item_ids = [item.pk for item in items if item.pk is not None]
+            if len(item_ids) != len(items):
+                item_ids = list(
+                    Item.objects.filter(sku__in=[i.sku for i in items]).values_list(
+                        "pk", flat=True
+                    )
+                )
+            transaction.on_commit(
+                lambda: items_updated.send(sender=Item, item_ids=item_ids)
+            )
+            transaction.on_commit(lambda: valuation.mark_stale(previous_groups))
+        result.created += created
+        result.updated += len(items) - created
@@ -0,0 +1,434 @@
+"""Background jobs: long operations run by worker processes, not requests.
+
+Jobs are rows in the ``Job`` table, so the queue needs nothing beyond the
+database. A view calls ``enqueue()`` and answers at once with the job's
+status URL; the ``run_jobs`` command claims queued jobs and runs them, in a
+process pool with ``--workers``. Tasks report progress through their
+``JobContext``, which also doubles as a heartbeat and notices cancellation.
+
+A job that raises is retried with exponential backoff until it has used
+``max_attempts``; ``JobError`` fails it at once. Jobs whose worker stops
+sending heartbeats (killed, machine lost) are put back in the queue, or
+failed once out of attempts.
+"""
+import io
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .archive import ARCHIVE_BATCH_SIZE, archive_cutoff, archive_transactions
+from .importer import ItemImporter, iter_csv, iter_xlsx
+from .labels import label_items, render_labels
+from .models import Job, StocktakeSession
+from .stock import StockMovementError
+from .stocktake import StocktakeError, post_variances
+from .valuation import refresh_rollups
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between progress writes from one job
+PROGRESS_INTERVAL = 0.5
+LABEL_CHUNK_SIZE = 500
+MAX_BACKGROUND_LABELS = 50000
+
+
+def retry_delay():
+    # Seconds before the first retry; doubled for each further attempt
+    return getattr(settings, "INVENTORY_JOB_RETRY_DELAY", 30)
+
+
+def stale_after():
+    # Seconds without a heartbeat before a running job counts as abandoned
+    return getattr(settings, "INVENTORY_JOB_STALE_AFTER", 600)
+
+
+def heartbeat_interval():
+    return stale_after() / 5
+
+
+class JobError(Exception):
+    """Fails a job without retrying, e.g. for input that can never work."""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Task:
+    def __init__(self, name, func, max_attempts):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+
+
+TASKS = {}
+
+
+def task(name, max_attempts=3):
+    """Register ``func(context, **params)`` as the task for jobs of ``name``."""
+
+    def register(func):
+        TASKS[name] = Task(name, func, max_attempts)
+        return func
+
+    return register
+
+
+def enqueue(kind, params=None, user=None, upload=None):
+    """Queue a job of ``kind`` and return it.
+
+    ``params`` must be JSON-serializable; ``upload`` is stored as the job's
+    input file for the worker to read. The job is only visible to workers
+    once the surrounding transaction commits.
+    """
+    if kind not in TASKS:
+        raise ValueError(f"Unknown job kind: {kind!r}")
+    job = Job(
+        kind=kind,
+        params=params or {},
+        max_attempts=TASKS[kind].max_attempts,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    if upload is not None:
+        job.input_file.save(os.path.basename(upload.name), upload, save=False)
+    job.save()
+    return job
+
+
+def enqueue_once(kind, params=None, user=None):
+    """Queue a job of ``kind`` unless one with the same params is waiting."""
+    waiting = Job.objects.filter(kind=kind, status="queued", params=params or {}).first()
+    return waiting or enqueue(kind, params, user)
+
+
+def cancel_job(job):
+    """Cancel a queued or running job; a running task stops at its next
+    progress report. Returns whether the job was still unfinished."""
+    cancelled = Job.objects.filter(pk=job.pk, status__in=["queued", "running"]).update(
+        status="cancelled", finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return bool(cancelled)
+
+
+def job_payload(job):
+    """The job's status as the JSON API and 202 responses report it."""
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "percent": job.percent,
+        "message": job.message,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error else "",
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "url": reverse("api-job-detail", args=[job.pk]),
+        "output": reverse("job-output", args=[job.pk]) if job.output_file else None,
+    }
+
+
+class JobContext:
+    """Handed to a running task for progress reports and output files."""
+
+    def __init__(self, job):
+        self.job = job
+        self.reported_at = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """Record progress, throttled to one write per ``PROGRESS_INTERVAL``.
+
+        Each write also refreshes the heartbeat. Raises ``JobCancelled`` once
+        the job has been cancelled (or taken back as abandoned), so the task
+        stops at its next report.
+        """
+        job = self.job
+        job.progress = done
+        if total is not None:
+            job.total = total
+        if message is not None:
+            job.message = message[:200]
+        now = time.monotonic()
+        if not force and now - self.reported_at < PROGRESS_INTERVAL:
+            return
+        self.reported_at = now
+        updated = Job.objects.filter(pk=job.pk, status="running", worker=job.worker).update(
+            progress=job.progress,
+            total=job.total,
+            message=job.message,
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise JobCancelled()
+
+    def save_output(self, name, content):
+        if isinstance(content, str):
+            content = content.encode()
+        self.job.output_file.save(name, ContentFile(content), save=False)
+        Job.objects.filter(pk=self.job.pk).update(output_file=self.job.output_file.name)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, limit=1):
+    """Mark up to ``limit`` due jobs as running for ``worker``; return their ids.
+
+    Each job is taken with a conditional UPDATE, so two workers racing for
+    the same row cannot both win, on any database. Where the database can
+    skip locked rows, concurrent workers also avoid picking the same
+    candidates in the first place.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        candidates = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status="queued", run_after__lte=now)
+            .order_by("run_after", "id")
+            .values_list("pk", flat=True)[:limit]
+        )
+        return [
+            pk
+            for pk in candidates
+            if Job.objects.filter(pk=pk, status="queued").update(
+                status="running",
+                worker=worker,
+                attempts=F("attempts") + 1,
+                started_at=now,
+                heartbeat_at=now,
+                error="",
+            )
+        ]
+
+
+def heartbeat(job_ids):
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status="running").update(heartbeat_at=timezone.now())
+
+
+class Heartbeat(threading.Thread):
+    """Keeps the heartbeat of jobs run in this process fresh, however rarely
+    their tasks report progress."""
+
+    def __init__(self, job_ids):
+        super().__init__(daemon=True)
+        self.job_ids = job_ids
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(heartbeat_interval()):
+                try:
+                    heartbeat(self.job_ids)
+                except Exception:
+                    logger.exception("Heartbeat for jobs %s failed", self.job_ids)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.join()
+
+
+def requeue_abandoned():
+    """Retry (or fail, when out of attempts) jobs whose worker went silent."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after())
+    abandoned = Job.objects.filter(status="running", heartbeat_at__lt=cutoff)
+    failed = abandoned.filter(attempts__gte=F("max_attempts")).update(
+        status="failed",
+        error="Worker stopped responding.",
+        finished_at=timezone.now(),
+    )
+    retried = abandoned.update(status="queued", run_after=timezone.now(), worker="")
+    return retried + failed
+
+
+def execute(pk):
+    """Run a claimed job to completion, recording its outcome."""
+    job = Job.objects.get(pk=pk)
+    context = JobContext(job)
+    finished = Job.objects.filter(pk=pk, status="running", worker=job.worker)
+    try:
+        task = TASKS.get(job.kind)
+        if task is None:
+            raise JobError(f"Unknown job kind: {job.kind!r}")
+        result = task.func(context, **job.params)
+    except JobCancelled:
+        logger.info("Job %s stopped after cancellation", pk)
+        return
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", pk, job.kind)
+        error = traceback.format_exc()
+        now = timezone.now()
+        if isinstance(exc, JobError) or job.attempts >= job.max_attempts:
+            finished.update(status="failed", error=error, finished_at=now)
+        else:
+            delay = retry_delay() * 2 ** (job.attempts - 1)
+            finished.update(
+                status="queued",
+                error=error,
+                worker="",
+                run_after=now + timedelta(seconds=delay),
+            )
+        return
+    finished.update(
+        status="succeeded",
+        result=result,
+        progress=job.progress,
+        total=job.total,
+        message=job.message,
+        finished_at=timezone.now(),
+    )
+
+
+def work(workers=1, once=False, poll_interval=1.0, log=None):
+    """Claim and run jobs until interrupted, or until the queue is empty with
+    ``once``. More than one worker runs jobs in a process pool, each job in
+    its own process, while this process claims work and sends heartbeats.
+    A single worker runs jobs itself, with a thread sending heartbeats.
+    """
+    log = log or (lambda message: None)
+    name = worker_name()
+    if workers <= 1:
+        while True:
+            requeue_abandoned()
+            claimed = claim(name)
+            for pk in claimed:
+                log(f"Running job {pk}")
+                with Heartbeat([pk]):
+                    execute(pk)
+            if not claimed:
+                if once:
+                    return
+                time.sleep(poll_interval)
+
+    # Spawned rather than forked, so workers never share this process's
+    # database connections
+    context = multiprocessing.get_context("spawn")
+    running = {}
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=django.setup) as pool:
+        while True:
+            for future in [f for f in running if f.done()]:
+                pk = running.pop(future)
+                if future.exception() is not None:
+                    logger.error("Worker process failed on job %s", pk, exc_info=future.exception())
+            heartbeat(list(running.values()))
+            requeue_abandoned()
+            claimed = claim(name, workers - len(running)) if len(running) < workers else []
+            for pk in claimed:
+                log(f"Running job {pk}")
+                running[pool.submit(execute, pk)] = pk
+            if running:
+                wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            elif once:
+                return
+            else:
+                time.sleep(poll_interval)
+
+
+@task("import_items")
+def import_items_task(context, batch_size=1000, update_quantity=False):
+    job = context.job
+    if not job.input_file:
+        raise JobError("The job has no file to import.")
+    importer = ItemImporter(
+        batch_size=batch_size,
+        user=job.created_by,
+        progress=lambda rows: context.progress(rows, message=f"{rows} rows read"),
+    )
+    if update_quantity:
+        importer.update_fields = importer.update_fields + ["quantity"]
+    with job.input_file.open("rb") as fileobj:
+        try:
+            if job.input_file.name.lower().endswith(".xlsx"):
+                rows = iter_xlsx(fileobj)
+            else:
+                rows = iter_csv(fileobj)
+            result = importer.run(rows)
+        except ImportError as exc:
+            raise JobError(str(exc))
+    if result.errors:
+        report = io.StringIO(newline="")
+        result.write_error_report(report)
+        context.save_output(f"import-errors-{job.pk}.csv", report.getvalue())
+    return result.as_dict(max_errors=100)
+
+
+@task("render_labels")
+def render_labels_task(context, pks=(), filters=None):
+    items = list(label_items(pks, **(filters or {}))[:MAX_BACKGROUND_LABELS])
+    total = len(items)
+    context.progress(0, total, force=True)
+    labels = []
+    for start in range(0, total, LABEL_CHUNK_SIZE):
+        labels.extend(render_labels(items[start:start + LABEL_CHUNK_SIZE]))
+        context.progress(len(labels), message=f"{len(labels)} of {total} labels")
+    html = render_to_string("inventory/print_labels.html", {"labels": labels})
+    context.save_output(f"labels-{context.job.pk}.html", html)
+    return {"labels": len(labels)}
+
+
+@task("refresh_valuation")
+def refresh_valuation_task(context, full=True):
+    return {"groups": refresh_rollups(full=full)}
+
+
+@task("archive_transactions", max_attempts=5)
+def archive_transactions_task(context, months=12, batch_size=ARCHIVE_BATCH_SIZE):
+    cutoff = archive_cutoff(months)
+    moved = archive_transactions(
+        cutoff,
+        batch_size=batch_size,
+        progress=lambda moved: context.progress(moved, message=f"{moved} archived"),
+    )
+    return {"archived": moved, "cutoff": cutoff.isoformat()}
+
+
+@task("post_stocktake")
+def post_stocktake_task(context, session, item_ids=None):
+    job = context.job
+    # A session the job will not post any more takes scans again
+    reopen = StocktakeSession.objects.filter(pk=session, status="posting")
+    try:
+        posted = post_variances(
+            StocktakeSession.objects.get(pk=session),
+            user=job.created_by,
+            item_ids=item_ids,
+            progress=lambda done, total: context.progress(done, total, f"{done} of {total} posted"),
+        )
+    except (StocktakeError, StockMovementError) as exc:
+        reopen.update(status="counting")
+        raise JobError(str(exc))
+    except JobCancelled:
+        reopen.update(status="counting")
+        raise
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            reopen.update(status="counting")
+        raise
+    return {"adjusted": posted}
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from .barcodes import barcode_svg
+from .fragments import render_fragments
+from .models import Item
+
+LABEL_TEMPLATE = "inventory/label.html"
+
+
+def label_cache_key(item):
+    # Any edit to the item or its category changes the key, so stale labels
+    # are never served and need no explicit invalidation.
+    return "inventory:label:{}:{}:{}".format(
+        item.pk,
+        item.updated_at.timestamp(),
+        item.category.updated_at.timestamp(),
+    )
+
+
+def item_barcode_svg(item):
+    try:
+        return mark_safe(barcode_svg(item.barcode or item.sku))
+    except ValueError:
+        # Not encodable (e.g. non-ASCII); the label still prints the text
+        return ""
+
+
+def render_labels(items):
+    """Render one HTML label per item, reusing cached fragments.
+
+    ``items`` should come from a ``select_related('category')`` queryset.
+    """
+    return render_fragments(
+        LABEL_TEMPLATE,
+        items,
+        label_cache_key,
+        lambda item: {"item": item, "barcode_svg": item_barcode_svg(item)},
+        getattr(settings, "INVENTORY_LABEL_CACHE_TIMEOUT", 86400),
+    )
+
+
+def label_items(pks=(), **filters):
+    """Items to label, chosen by primary key and/or field filters, in shelf
+    order and ready for ``render_labels``."""
+    if pks:
+        filters["pk__in"] = pks
+    return (
+        Item.objects.select_related("category")
+        .filter(**filters)
+        .order_by("location", "shelf", "name", "id")
+    )
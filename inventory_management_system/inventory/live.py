@@ -0,0 +1,236 @@
+"""Live item updates pushed to browsers as server-sent events.
+
+Writers append compact events to a short log in the shared cache, numbered
+by a cache counter. Each ASGI process runs one poller that reads new log
+entries and fans them out to the streams it holds, so delivery works across
+processes with any shared cache backend and costs one cache read per poll
+interval per process, however many browsers are connected.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Item
+from .stats import aget_dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+LOG_PREFIX = "inventory:live:"
+SEQUENCE_KEY = f"{LOG_PREFIX}seq"
+# Larger batches (imports, forecasts) are announced as a single "reload"
+MAX_ITEMS_PER_EVENT = 500
+# Events a stream may buffer before it is told to reload instead
+QUEUE_SIZE = 100
+# Browsers reconnect after this long if the stream drops
+RETRY_MS = 5000
+# Seconds a numbered log entry may take to be written before it counts as
+# lost (evicted, or its writer died between numbering and writing it)
+MISSING_TIMEOUT = 5
+RELOAD = {"type": "reload"}
+STATUS_LABELS = dict(Item.STATUS_CHOICES)
+STATS_FIELDS = ["total_items", "total_categories", "low_stock_items", "out_of_stock_items"]
+
+
+def poll_interval():
+    return getattr(settings, "INVENTORY_LIVE_POLL_INTERVAL", 1.0)
+
+
+def log_timeout():
+    # How long a disconnected browser can catch up via Last-Event-ID
+    return getattr(settings, "INVENTORY_LIVE_LOG_TIMEOUT", 300)
+
+
+def item_delta(row):
+    """The fields a list row or counter needs, from an Item ``values()`` row."""
+    return {
+        "id": row["id"],
+        "quantity": row["quantity"],
+        "status": row["status"],
+        "status_display": STATUS_LABELS.get(row["status"], row["status"]),
+        "updated_at": timezone.localtime(row["updated_at"]),
+    }
+
+
+def publish(event):
+    """Append ``event`` to the shared log and return its sequence number."""
+    cache.add(SEQUENCE_KEY, 0, None)
+    try:
+        sequence = cache.incr(SEQUENCE_KEY)
+    except ValueError:
+        # Evicted between add and incr; pollers see the reset and reload
+        sequence = 1
+        cache.set(SEQUENCE_KEY, sequence, None)
+    cache.set(f"{LOG_PREFIX}{sequence}", event, log_timeout())
+    return sequence
+
+
+def publish_items(item_ids):
+    if not item_ids:
+        return None
+    if len(item_ids) > MAX_ITEMS_PER_EVENT:
+        return publish(RELOAD)
+    rows = Item.objects.filter(pk__in=item_ids).values("id", "quantity", "status", "updated_at")
+    return publish({"type": "items", "items": [item_delta(row) for row in rows]})
+
+
+def publish_deleted(item_ids):
+    return publish({"type": "deleted", "ids": list(item_ids)})
+
+
+async def read_log(after, upto):
+    """``(sequence, event)`` pairs after ``after`` up to ``upto``, stopping
+    at the first entry not in the log; None when there are too many to
+    replay.
+
+    ``publish`` numbers an entry before writing it, so a missing entry may
+    just not be written yet.
+    """
+    if upto <= after:
+        return []
+    if upto - after > QUEUE_SIZE:
+        return None
+    keys = {f"{LOG_PREFIX}{sequence}": sequence for sequence in range(after + 1, upto + 1)}
+    found = await cache.aget_many(keys)
+    events = []
+    for key, sequence in keys.items():
+        if key not in found:
+            break
+        events.append((sequence, found[key]))
+    return events
+
+
+def format_event(sequence, event):
+    event = dict(event)
+    lines = [f"id: {sequence}"] if sequence else []
+    lines.append(f"event: {event.pop('type')}")
+    lines.append(f"data: {json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    def __init__(self, stats=False):
+        self.stats = stats
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, sequence, event):
+        try:
+            self.queue.put_nowait((sequence, event))
+        except asyncio.QueueFull:
+            # A stream that cannot keep up gets one reload instead of a backlog
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((sequence, RELOAD))
+
+
+class Broker:
+    """Per-process fan-out from the shared log to local event streams."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.sequence = 0
+        self.task = None
+        # Entry being waited for, and since when (event loop time)
+        self.missing = None
+        self.missing_since = 0.0
+
+    async def subscribe(self, stats=False, last_event_id=None):
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            # Streams from a previous event loop can never be read again
+            self.subscribers = set()
+            self.sequence = await cache.aget(SEQUENCE_KEY, 0)
+            self.missing = None
+            self.task = loop.create_task(self.poll())
+        subscriber = Subscriber(stats)
+        if last_event_id is not None:
+            # Entries up to self.sequence were in the log when delivered, so
+            # a gap here means they expired
+            events = await read_log(last_event_id, self.sequence)
+            if last_event_id > self.sequence or events is None or (
+                len(events) < self.sequence - last_event_id
+            ):
+                events = [(self.sequence, RELOAD)]
+            for sequence, event in events:
+                subscriber.put(sequence, event)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def poll(self):
+        while True:
+            await asyncio.sleep(poll_interval())
+            if not self.subscribers:
+                self.task = None
+                return
+            try:
+                await self.deliver()
+            except Exception:
+                logger.exception("Live update poll failed")
+
+    async def deliver(self):
+        latest = await cache.aget(SEQUENCE_KEY, 0)
+        if latest < self.sequence:
+            # The counter was lost and restarted; nothing can be replayed
+            events = [(latest, RELOAD)]
+        else:
+            events = await read_log(self.sequence, latest)
+            if events is None:
+                events = [(latest, RELOAD)]
+            elif len(events) < latest - self.sequence:
+                events = self.wait_for(self.sequence + len(events) + 1, latest, events)
+        if not events:
+            return
+        self.sequence = events[-1][0]
+        subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            for sequence, event in events:
+                subscriber.put(sequence, event)
+        if any(subscriber.stats for subscriber in subscribers):
+            # One stats read per process rather than one fetch per browser
+            stats = await aget_dashboard_stats()
+            event = {field: stats[field] for field in STATS_FIELDS}
+            event["type"] = "stats"
+            event["top_categories"] = [
+                {"name": c["name"], "item_count": c["item_count"]}
+                for c in stats["by_category"][:5]
+            ]
+            for subscriber in subscribers:
+                if subscriber.stats:
+                    subscriber.put(None, event)
+
+    def wait_for(self, missing, latest, events):
+        # Deliver what comes before a missing entry and pick it up on a later
+        # poll; reload only once it has been missing for MISSING_TIMEOUT
+        now = asyncio.get_running_loop().time()
+        if missing != self.missing:
+            self.missing, self.missing_since = missing, now
+        elif now - self.missing_since > MISSING_TIMEOUT:
+            return [(latest, RELOAD)]
+        return events
+
+
+broker = Broker()
+
+
+async def event_stream(stats=False, last_event_id=None, keepalive=15):
+    """Server-sent events for one browser, until it disconnects."""
+    subscriber = await broker.subscribe(stats, last_event_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                sequence, event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                # Comment line; keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(sequence, event)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from .models import Item
+
+MISSING = "__missing__"
+KEY_PREFIX = "inventory:code:"
+
+
+class LocalLRU:
+    """Bounded, thread-safe in-process LRU with a per-entry time to live.
+
+    The TTL bounds how long another process's write can go unseen here,
+    since write-through invalidation only reaches the local process and the
+    shared cache.
+    """
+
+    def __init__(self, maxsize=10000, ttl=5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = LocalLRU(
+    maxsize=getattr(settings, "INVENTORY_LOOKUP_LRU_SIZE", 10000),
+    ttl=getattr(settings, "INVENTORY_LOOKUP_LRU_TTL", 5.0),
+)
+
+
+def shared_cache():
+    # Any Django cache alias; the default local-memory cache stands in for a
+    # shared Redis/Memcached tier in development.
+    return caches[getattr(settings, "INVENTORY_LOOKUP_CACHE", "default")]
+
+
+def shared_timeout(missing=False):
+    if missing:
+        return getattr(settings, "INVENTORY_LOOKUP_NEGATIVE_TIMEOUT", 60)
+    return getattr(settings, "INVENTORY_LOOKUP_TIMEOUT", 3600)
+
+
+def item_payload(item):
+    return {
+        "id": item.pk,
+        "sku": item.sku,
+        "barcode": item.barcode,
+        "name": item.name,
+        "quantity": item.quantity,
+        "status": item.status,
+        "selling_price": str(item.selling_price),
+        "location": item.location,
+        "shelf": item.shelf,
+        "updated_at": item.updated_at.isoformat(),
+    }
+
+
+def item_codes(item):
+    return [code for code in (item.sku, item.barcode) if code]
+
+
+def lookup_code(code):
+    """Return the payload of the item whose SKU or barcode is ``code``, or None.
+
+    Checks the process-local LRU, then the shared cache, then the database.
+    Unknown codes are cached as misses too, so repeated bad scans stay off
+    the database.
+    """
+    key = KEY_PREFIX + code
+    value = local_cache.get(key)
+    if value is None:
+        value = shared_cache().get(key)
+        if value is None:
+            item = Item.objects.filter(Q(sku=code) | Q(barcode=code)).order_by().first()
+            if item is None:
+                value = MISSING
+                shared_cache().set(key, value, shared_timeout(missing=True))
+            else:
+                value = item_payload(item)
+                store(item, value)
+        local_cache.set(key, value)
+    return None if value == MISSING else value
+
+
+async def alookup_code(code):
+    """Async counterpart of :func:`lookup_code`."""
+    key = KEY_PREFIX + code
+    value = local_cache.get(key)
+    if value is None:
+        value = await shared_cache().aget(key)
+        if value is None:
+            item = await Item.objects.filter(Q(sku=code) | Q(barcode=code)).order_by().afirst()
+            if item is None:
+                value = MISSING
+                await shared_cache().aset(key, value, shared_timeout(missing=True))
+            else:
+                value = item_payload(item)
+                keys = {KEY_PREFIX + c: value for c in item_codes(item)}
+                await shared_cache().aset_many(keys, shared_timeout())
+        local_cache.set(key, value)
+    return None if value == MISSING else value
+
+
+def store(item, payload=None):
+    payload = payload or item_payload(item)
+    keys = {KEY_PREFIX + code: payload for code in item_codes(item)}
+    shared_cache().set_many(keys, shared_timeout())
+    for key in keys:
+        local_cache.set(key, payload)
+
+
+def forget_codes(codes):
+    keys = [KEY_PREFIX + code for code in codes if code]
+    shared_cache().delete_many(keys)
+    for key in keys:
+        local_cache.delete(key)
+
+
+def item_saved(item, previous_codes=()):
+    # Write-through: stale codes are dropped and the new payload replaces
+    # any cached entry (including a cached miss) for the current codes.
+    forget_codes(set(previous_codes) - set(item_codes(item)))
+    store(item)
+
+
+def item_deleted(item):
+    forget_codes(item_codes(item))
+
+
+def items_changed(item_ids):
+    """Refresh cached entries after bulk writes, with a single query and a
+    single ``set_many``."""
+    keys = {}
+    for item in Item.objects.filter(pk__in=item_ids):
+        payload = item_payload(item)
+        keys.update((KEY_PREFIX + code, payload) for code in item_codes(item))
+    shared_cache().set_many(keys, shared_timeout())
+    for key, payload in keys.items():
+        local_cache.set(key, payload)
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.archive import ARCHIVE_BATCH_SIZE, archive_cutoff, archive_transactions
+from inventory.jobs import enqueue
+from inventory.models import InventoryTransaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Move transactions older than --months into the archive table, rolling "
+        "up stock snapshots to the cutoff first. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", type=int, default=12, help="Keep this many months live (default 12)."
+        )
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report how many rows would move."
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue the run for the job workers instead of running it here.",
+        )
+
+    def handle(self, *args, **options):
+        if options["months"] < 1:
+            raise CommandError("--months must be at least 1.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        cutoff = archive_cutoff(options["months"])
+        if options["dry_run"]:
+            count = InventoryTransaction.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(
+                f"{count} transaction(s) created before {cutoff:%Y-%m-%d} would be archived."
+            )
+            return
+        if options["background"]:
+            job = enqueue(
+                "archive_transactions",
+                {"months": options["months"], "batch_size": options["batch_size"]},
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued archive job {job.pk}."))
+            return
+        moved = archive_transactions(cutoff, batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {moved} transaction(s) created before {cutoff:%Y-%m-%d}.")
+        )
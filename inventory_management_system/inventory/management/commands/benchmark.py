@@ -0,0 +1,152 @@
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.facets import facet_rows
+from inventory.lookup import local_cache
+from inventory.models import Item
+from inventory.search import search_items
+from inventory.stats import compute_dashboard_stats
+
+
+def percentile(samples, pct):
+    # Nearest-rank percentile of an already sorted list
+    return samples[max(math.ceil(pct / 100 * len(samples)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the key views and the ORM queries behind them, reporting p50/p99 "
+        "latency and query counts. Save a run with --output and compare later "
+        "runs against it with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User to authenticate as.")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--cold", action="store_true", help="Clear the caches before every iteration."
+        )
+        parser.add_argument("--only", help="Run only scenarios whose name contains this.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--compare", help="JSON results of an earlier run to diff against.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['username']!r}.")
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        item = Item.objects.select_related("category").order_by("pk").first()
+        if item is None:
+            raise CommandError("No items to benchmark against; run generate_data first.")
+        baseline = {}
+        if options["compare"]:
+            with open(options["compare"]) as handle:
+                baseline = json.load(handle)
+
+        self.client = Client()
+        self.client.force_login(user)
+        scenarios = self.scenarios(user, item)
+        if options["only"]:
+            scenarios = [s for s in scenarios if options["only"] in s[0]]
+
+        results = {}
+        self.stdout.write(
+            f"{'scenario':<32}{'p50 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'queries':>9}"
+        )
+        for name, run in scenarios:
+            result = self.measure(run, options)
+            results[name] = result
+            line = (
+                f"{name:<32}{result['p50']:>9.2f}{result['p99']:>9.2f}"
+                f"{result['mean']:>9.2f}{result['queries']:>9}"
+            )
+            if name in baseline:
+                change = (result["p50"] / baseline[name]["p50"] - 1) * 100
+                line += f"   p50 {change:+.0f}% vs baseline"
+            self.stdout.write(line)
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+
+    def view(self, url_name, args=(), params=None):
+        url = reverse(url_name, args=args)
+
+        def run():
+            response = self.client.get(url, params or {})
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}.")
+
+        return run
+
+    def scenarios(self, user, item):
+        word = item.name.split()[0]
+        scenarios = [
+            ("item-list", self.view("item-list")),
+            ("item-list ?status", self.view("item-list", params={"status": "available"})),
+            ("item-list ?category", self.view("item-list", params={"category": item.category_id})),
+            ("item-list ?search", self.view("item-list", params={"search": word})),
+            ("item-list ?paginate=cursor", self.view("item-list", params={"paginate": "cursor"})),
+            ("dashboard", self.view("dashboard")),
+            ("print-item", self.view("print-item", args=[item.pk])),
+            ("orm: item-list page", lambda: list(Item.objects.order_by("name", "id")[:10])),
+            (
+                "orm: item search",
+                lambda: list(search_items(Item.objects.all(), word).order_by("name", "id")[:10]),
+            ),
+            ("orm: dashboard stats", compute_dashboard_stats),
+            ("orm: facets", lambda: facet_rows(Item.objects.all())),
+            (
+                "orm: print-item",
+                lambda: Item.objects.select_related("category").get(pk=item.pk),
+            ),
+        ]
+        if user.is_staff and user.has_perm("inventory.view_item"):
+            changelist = "admin:inventory_item_changelist"
+            scenarios += [
+                ("admin changelist", self.view(changelist)),
+                ("admin changelist ?q", self.view(changelist, params={"q": word})),
+            ]
+        else:
+            self.stderr.write("Skipping the admin changelist: user cannot view items in admin.")
+        return scenarios
+
+    def measure(self, run, options):
+        def prepare():
+            if options["cold"]:
+                cache.clear()
+                local_cache.clear()
+
+        for _ in range(options["warmup"]):
+            prepare()
+            run()
+        samples = []
+        for _ in range(options["iterations"]):
+            prepare()
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+        # Counted on a separate run, so query capture does not skew timings
+        prepare()
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        samples.sort()
+        return {
+            "p50": percentile(samples, 50),
+            "p99": percentile(samples, 99),
+            "mean": statistics.fmean(samples),
+            "queries": len(queries),
+        }
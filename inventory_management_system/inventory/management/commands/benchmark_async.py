@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from inventory.models import Item
+
+# (sync url name, async url name, needs an item pk); each pair returns the
+# same JSON so only the view style differs
+ENDPOINTS = [
+    ("api-item-list", "async-item-list", False),
+    ("api-item-detail", "async-item-detail", True),
+    ("api-category-list", "async-category-list", False),
+    ("api-code-lookup", "async-code-lookup", False),
+    ("api-dashboard", "async-dashboard", False),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput of the sync and async read endpoints under "
+        "concurrent load, using in-process test clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", required=True, help="User to authenticate as.")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Thread pool size for the sync run, like a threaded WSGI worker.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['username']!r}.")
+        item = Item.objects.order_by("pk").first()
+        if item is None:
+            raise CommandError("No items to benchmark against.")
+
+        self.stdout.write(f"{'endpoint':<22}{'sync req/s':>12}{'async req/s':>13}")
+        for sync_name, async_name, with_pk in ENDPOINTS:
+            args = [item.pk] if with_pk else []
+            params = {"code": item.sku} if "lookup" in sync_name else {}
+            sync_rate = self.run_sync(user, reverse(sync_name, args=args), params, options)
+            async_rate = self.run_async(user, reverse(async_name, args=args), params, options)
+            self.stdout.write(f"{sync_name:<22}{sync_rate:>12.1f}{async_rate:>13.1f}")
+
+    def run_sync(self, user, url, params, options):
+        # Test clients are not thread-safe, so each pool thread has its own
+        local = threading.local()
+
+        def fetch(index):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+                client.force_login(user)
+            client.get(url, params)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(fetch, range(options["requests"])))
+        return options["requests"] / (time.perf_counter() - start)
+
+    def run_async(self, user, url, params, options):
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def main():
+            semaphore = asyncio.Semaphore(options["concurrency"])
+
+            async def fetch():
+                async with semaphore:
+                    await client.get(url, params)
+
+            await asyncio.gather(*(fetch() for _ in range(options["requests"])))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        return options["requests"] / (time.perf_counter() - start)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.reorder import check_reorder_levels
+
+
+class Command(BaseCommand):
+    help = "Raise reorder alerts for items that crossed below their minimum stock level."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running, checking every N seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            opened, resolved = check_reorder_levels()
+            self.stdout.write(f"Opened {len(opened)} alerts, resolved {resolved}.")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.history import compact
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll up stock movements into daily per-item snapshots, with a full "
+        "checkpoint on the first of each month. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--until", help="Last day to roll up (YYYY-MM-DD); defaults to yesterday."
+        )
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            try:
+                until = date.fromisoformat(options["until"])
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format.")
+        days = compact(until)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {days} day(s)."))
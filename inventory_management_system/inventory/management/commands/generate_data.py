@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.models import Item
+from inventory.synthetic import Generator
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic synthetic categories, items, "
+        "transactions and users for load tests and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--items", type=int, default=10000)
+        parser.add_argument("--transactions", type=int, default=100000)
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument(
+            "--days", type=int, default=365, help="Spread transactions over this many days."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="GEN",
+            help="Prefix for SKUs, barcodes and usernames; must not already be in use.",
+        )
+
+    def handle(self, *args, **options):
+        if options["categories"] < 1 or options["items"] < 1:
+            raise CommandError("--categories and --items must be at least 1.")
+        if min(options["transactions"], options["users"], options["days"]) < 0:
+            raise CommandError("--transactions, --users and --days cannot be negative.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if Item.objects.filter(sku__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(
+                f"Items with prefix {options['prefix']!r} already exist; pick another --prefix."
+            )
+
+        verbose = options["verbosity"] > 1
+        generator = Generator(
+            categories=options["categories"],
+            items=options["items"],
+            transactions=options["transactions"],
+            users=options["users"],
+            days=options["days"],
+            batch_size=options["batch_size"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+            progress=self.stdout.write if verbose else None,
+        )
+        start = time.perf_counter()
+        counts = generator.run()
+        elapsed = time.perf_counter() - start
+        rows = sum(counts.values())
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {summary} in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)."
+            )
+        )
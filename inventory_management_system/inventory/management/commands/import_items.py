@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.importer import ItemImporter, iter_csv, iter_xlsx
+
+
+class Command(BaseCommand):
+    help = "Import or update items from a CSV or XLSX file, matched on SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "xlsx"])
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--user", help="Username recorded as creator of new items.")
+        parser.add_argument(
+            "--update-quantity",
+            action="store_true",
+            help="Overwrite quantity on existing items as well.",
+        )
+        parser.add_argument(
+            "--errors", help="Write the per-row error report to this CSV file."
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in ("csv", "xlsx"):
+            raise CommandError("Cannot tell the file format; pass --format.")
+
+        user = None
+        if options["user"]:
+            try:
+                user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+
+        importer = ItemImporter(batch_size=options["batch_size"], user=user)
+        if options["update_quantity"]:
+            importer.update_fields = importer.update_fields + ["quantity"]
+
+        with path.open("rb") as fileobj:
+            try:
+                rows = iter_csv(fileobj) if file_format == "csv" else iter_xlsx(fileobj)
+                result = importer.run(rows)
+            except ImportError as exc:
+                raise CommandError(str(exc))
+
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as report:
+                result.write_error_report(report)
+        elif result.errors:
+            result.write_error_report(sys.stderr)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {result.created}, updated {result.updated}, "
+                f"rejected {result.rejected} rows."
+            )
+        )
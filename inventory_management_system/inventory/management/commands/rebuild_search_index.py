@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inventory.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the item full-text search index from the item table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        backend = get_search_backend(options["database"])
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt search index ({type(backend).__name__}).")
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from inventory.jobs import enqueue
+from inventory.valuation import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute stale valuation rollups, or all of them with --full. Reports "
+        "queue a refresh when they find stale groups; run this after month-end "
+        "to have them ready."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full", action="store_true", help="Rebuild every rollup from the items."
+        )
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Queue the refresh for the job workers instead of running it here.",
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            job = enqueue("refresh_valuation", {"full": options["full"]})
+            self.stdout.write(self.style.SUCCESS(f"Queued valuation job {job.pk}."))
+            return
+        refreshed = refresh_rollups(full=options["full"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} valuation group(s)."))
@@ -0,0 +1,48 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.jobs import work
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (imports, label runs, valuation rebuilds, "
+        "archiving). Runs until interrupted; start one per machine and scale "
+        "with --workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Jobs to run at once, each in its own process (default 1, inline).",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no queued job is due."
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds between checks for new jobs when idle.",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if options["poll_interval"] <= 0:
+            raise CommandError("--poll-interval must be positive.")
+        if options["verbosity"] > 1:
+            logging.getLogger("inventory.jobs").setLevel(logging.INFO)
+        log = self.stdout.write if options["verbosity"] > 0 else None
+        try:
+            work(
+                workers=options["workers"],
+                once=options["once"],
+                poll_interval=options["poll_interval"],
+                log=log,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
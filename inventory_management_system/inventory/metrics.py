@@ -0,0 +1,136 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current_metrics = ContextVar("inventory_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view_name = None
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.wall_time = 0.0
+        self.budget = None
+
+    @property
+    def over_budget(self):
+        return self.budget is not None and self.query_count > self.budget
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.query_count += 1
+
+
+def record_sql(execute, sql, params, many, context):
+    # Installed on every connection; only active inside a measured request.
+    # Async ORM calls run in worker threads with a copy of the request's
+    # context, so the contextvar finds the right request there too.
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.sql_wrapper(execute, sql, params, many, context)
+
+
+def install_sql_timer(connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+def get_query_budget(view_name):
+    budgets = getattr(settings, "INVENTORY_QUERY_BUDGETS", {})
+    return budgets.get(view_name, getattr(settings, "INVENTORY_DEFAULT_QUERY_BUDGET", None))
+
+
+class MetricsRegistry:
+    """Process-local aggregate of request metrics, keyed by URL name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def record(self, metrics):
+        with self._lock:
+            view = self._views.setdefault(
+                metrics.view_name,
+                {
+                    "requests": 0,
+                    "queries": 0,
+                    "sql_seconds": 0.0,
+                    "template_seconds": 0.0,
+                    "duration_seconds": 0.0,
+                    "over_budget": 0,
+                    "buckets": [0] * len(DURATION_BUCKETS),
+                },
+            )
+            view["requests"] += 1
+            view["queries"] += metrics.query_count
+            view["sql_seconds"] += metrics.sql_time
+            view["template_seconds"] += metrics.template_time
+            view["duration_seconds"] += metrics.wall_time
+            view["over_budget"] += metrics.over_budget
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.wall_time <= bound:
+                    view["buckets"][index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(values, buckets=list(values["buckets"]))
+                for name, values in self._views.items()
+            }
+
+    def prometheus(self):
+        """Render the aggregates in the Prometheus text exposition format."""
+        views = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, key):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for view, values in views:
+                lines.append(f'{name}{{view="{view}"}} {values[key]}')
+
+        family("inventory_requests_total", "counter", "Requests handled.", "requests")
+        family("inventory_request_queries_total", "counter", "SQL queries executed.", "queries")
+        family("inventory_request_sql_seconds_total", "counter", "Time spent in SQL.", "sql_seconds")
+        family(
+            "inventory_request_template_seconds_total",
+            "counter",
+            "Time spent rendering templates.",
+            "template_seconds",
+        )
+        family(
+            "inventory_request_query_budget_exceeded_total",
+            "counter",
+            "Requests that ran more queries than their budget.",
+            "over_budget",
+        )
+
+        name = "inventory_request_duration_seconds"
+        lines.append(f"# HELP {name} Wall-clock request duration.")
+        lines.append(f"# TYPE {name} histogram")
+        for view, values in views:
+            for bound, count in zip(DURATION_BUCKETS, values["buckets"]):
+                lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{view="{view}",le="+Inf"}} {values["requests"]}')
+            lines.append(f'{name}_sum{{view="{view}"}} {values["duration_seconds"]}')
+            lines.append(f'{name}_count{{view="{view}"}} {values["requests"]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
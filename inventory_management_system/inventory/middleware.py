@@ -0,0 +1,98 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import (
+    RequestMetrics,
+    current_metrics,
+    get_query_budget,
+    install_sql_timer,
+    registry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetricsMiddleware:
+    """Measure SQL queries, SQL time, template time and wall time per request.
+
+    Results are attached to ``request.query_metrics``, aggregated per URL name
+    for the metrics endpoint, and checked against ``INVENTORY_QUERY_BUDGETS``.
+    Works for both sync and async views. Template time covers
+    TemplateResponses, which are rendered here; views that render templates
+    themselves count it as view time. Queries run while a streaming response
+    is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        connection_created.connect(install_sql_timer)
+        for connection in connections.all(initialized_only=True):
+            install_sql_timer(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        metrics, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def process_template_response(self, request, response):
+        # Rendered here rather than just after by the handler, so the time can
+        # be measured; middleware that alters template responses must come
+        # after this one in MIDDLEWARE to run before it
+        start = time.perf_counter()
+        try:
+            response.render()
+        finally:
+            request.query_metrics.template_time += time.perf_counter() - start
+        return response
+
+    def start(self, request):
+        metrics = RequestMetrics()
+        request.query_metrics = metrics
+        return metrics, current_metrics.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        metrics.wall_time = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        metrics.view_name = match.view_name if match else "unresolved"
+        metrics.budget = get_query_budget(metrics.view_name)
+        registry.record(metrics)
+
+        if metrics.over_budget:
+            logger.warning(
+                "%s ran %d queries, over its budget of %d (%s)",
+                metrics.view_name,
+                metrics.query_count,
+                metrics.budget,
+                request.path,
+            )
+        if settings.DEBUG:
+            response["Server-Timing"] = (
+                f"sql;dur={metrics.sql_time * 1000:.1f};desc=\"{metrics.query_count} queries\", "
+                f"tpl;dur={metrics.template_time * 1000:.1f}, "
+                f"total;dur={metrics.wall_time * 1000:.1f}"
+            )
+        return response
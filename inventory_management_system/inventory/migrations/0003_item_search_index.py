@@ -0,0 +1,85 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE inventory_item_fts USING fts5(
+        name, description, sku, barcode,
+        content='inventory_item', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER inventory_item_fts_insert AFTER INSERT ON inventory_item BEGIN
+        INSERT INTO inventory_item_fts(rowid, name, description, sku, barcode)
+        VALUES (new.id, new.name, new.description, new.sku, new.barcode);
+    END
+    """,
+    """
+    CREATE TRIGGER inventory_item_fts_delete AFTER DELETE ON inventory_item BEGIN
+        INSERT INTO inventory_item_fts(inventory_item_fts, rowid, name, description, sku, barcode)
+        VALUES ('delete', old.id, old.name, old.description, old.sku, old.barcode);
+    END
+    """,
+    # Only text columns fire this, so stock movements don't touch the index
+    """
+    CREATE TRIGGER inventory_item_fts_update
+    AFTER UPDATE OF name, description, sku, barcode ON inventory_item BEGIN
+        INSERT INTO inventory_item_fts(inventory_item_fts, rowid, name, description, sku, barcode)
+        VALUES ('delete', old.id, old.name, old.description, old.sku, old.barcode);
+        INSERT INTO inventory_item_fts(rowid, name, description, sku, barcode)
+        VALUES (new.id, new.name, new.description, new.sku, new.barcode);
+    END
+    """,
+    "INSERT INTO inventory_item_fts(inventory_item_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS inventory_item_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_item_fts_delete",
+    "DROP TRIGGER IF EXISTS inventory_item_fts_insert",
+    "DROP TABLE IF EXISTS inventory_item_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE inventory_item ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(sku, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(barcode, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX inventory_item_search_gin ON inventory_item USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS inventory_item_search_gin",
+    "ALTER TABLE inventory_item DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            # Other databases fall back to the icontains search backend
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_item_name_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(0), run(1)),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_transaction_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+                ('description', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'ordering': ['warehouse', 'code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BinStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Warehouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('address', models.TextField(blank=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedtransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('in', 'Stock In'), ('out', 'Stock Out'), ('adjust', 'Adjustment'), ('return', 'Return'), ('transfer', 'Bin Transfer')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='inventorytransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('in', 'Stock In'), ('out', 'Stock Out'), ('adjust', 'Adjustment'), ('return', 'Return'), ('transfer', 'Bin Transfer')], max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['location', 'shelf'], name='item_location_shelf_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='bin',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.bin'),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='to_bin',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.bin'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='bin',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='inventory.bin'),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='to_bin',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.bin'),
+        ),
+        migrations.AddField(
+            model_name='binstock',
+            name='bin',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock', to='inventory.bin'),
+        ),
+        migrations.AddField(
+            model_name='binstock',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bin_stock', to='inventory.item'),
+        ),
+        migrations.AddField(
+            model_name='binstock',
+            name='warehouse',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='bin',
+            name='warehouse',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='bins', to='inventory.warehouse'),
+        ),
+        migrations.AddIndex(
+            model_name='binstock',
+            index=models.Index(fields=['warehouse', 'item', 'quantity'], name='binstock_wh_item_qty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='binstock',
+            index=models.Index(fields=['bin', 'item'], name='binstock_bin_item_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='binstock',
+            constraint=models.UniqueConstraint(fields=('item', 'bin'), name='one_stock_row_per_item_per_bin'),
+        ),
+        migrations.AddConstraint(
+            model_name='binstock',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='bin_stock_not_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='bin',
+            constraint=models.UniqueConstraint(fields=('warehouse', 'code'), name='unique_bin_code_per_warehouse'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+PREFIX_COLUMNS = ['name', 'sku', 'barcode']
+
+# Case-insensitive prefix search (istartswith) compiles to LIKE 'x%' on SQLite,
+# which can only use an index with NOCASE collation, and to
+# UPPER(col::text) LIKE UPPER('x%') on PostgreSQL, which needs an expression
+# index with pattern ops to work under any locale.
+STATEMENTS = {
+    'sqlite': (
+        [
+            f'CREATE INDEX item_{column}_prefix_idx ON inventory_item ({column} COLLATE NOCASE)'
+            for column in PREFIX_COLUMNS
+        ],
+        [f'DROP INDEX IF EXISTS item_{column}_prefix_idx' for column in PREFIX_COLUMNS],
+    ),
+    'postgresql': (
+        [
+            f'CREATE INDEX item_{column}_prefix_idx ON inventory_item '
+            f'(UPPER({column}::text) text_pattern_ops)'
+            for column in PREFIX_COLUMNS
+        ],
+        [f'DROP INDEX IF EXISTS item_{column}_prefix_idx' for column in PREFIX_COLUMNS],
+    ),
+}
+
+
+def run(direction):
+    def operation(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_warehouses_and_bins'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['created_at', 'id'], name='item_created_id_idx'),
+        ),
+        migrations.RunPython(run(0), run(1)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_days',
+            field=models.PositiveIntegerField(default=7),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_supplier_lead_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValuationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('category', 'Category'), ('supplier', 'Supplier'), ('location', 'Location')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=200)),
+                ('label', models.CharField(blank=True, max_length=200)),
+                ('item_count', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('retail_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('stale', models.BooleanField(default=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['dimension', '-stock_value'],
+                'indexes': [models.Index(condition=models.Q(('stale', True)), fields=['dimension', 'key'], name='rollup_stale_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'key'), name='one_rollup_per_group')],
+            },
+        ),
+    ]
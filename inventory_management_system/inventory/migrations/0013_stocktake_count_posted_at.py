@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_stocktakes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stocktakecount',
+            name='posted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.contrib.auth.models import User
 from django.urls import reverse
@@ -63,6 +67,18 @@ class Item(models.Model):
             models.Index(fields=['sku']),
             models.Index(fields=['category']),
             models.Index(fields=['status']),
+            models.Index(fields=['location', 'shelf'], name='item_location_shelf_idx'),
+            # Matches Meta.ordering plus the pk tiebreaker used by cursor pagination
+            models.Index(fields=['name', 'id'], name='item_name_id_idx'),
+            # Admin date hierarchy drill-down
+            models.Index(fields=['created_at', 'id'], name='item_created_id_idx'),
+            # Partial index holding only the few items at or below their
+            # reorder point, so the reorder queue never scans the table
+            models.Index(
+                fields=['supplier', 'id'],
+                condition=models.Q(quantity__lte=models.F('min_stock_level')),
+                name='item_low_stock_idx',
+            ),
         ]
     
     def __str__(self):
@@ -91,6 +107,7 @@ class InventoryTransaction(models.Model):
         ('out', 'Stock Out'),
         ('adjust', 'Adjustment'),
         ('return', 'Return'),
+        ('transfer', 'Bin Transfer'),
     ]
     
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='transactions')
@@ -103,6 +120,11 @@ class InventoryTransaction(models.Model):
     # Reference information
     reference_number = models.CharField(max_length=100, blank=True)
     related_order = models.CharField(max_length=100, blank=True)
+
+    # Bin the stock moved in or out of (the source, for transfers); empty for
+    # stock not allocated to a bin
+    bin = models.ForeignKey('Bin', on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
+    to_bin = models.ForeignKey('Bin', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     
     # Auditing
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -110,10 +132,185 @@ class InventoryTransaction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='txn_created_id_idx'),
+            models.Index(fields=['item', 'created_at', 'id'], name='txn_item_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.transaction_type} - {self.item.name} ({self.quantity})"
 
+class ArchivedTransaction(models.Model):
+    # Transactions moved out of the live log by archive_transactions. Columns
+    # mirror InventoryTransaction and keep the original ids, so history reads
+    # can continue from the live table into this one with the same cursor.
+    id = models.BigIntegerField(primary_key=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='archived_transactions')
+    transaction_type = models.CharField(max_length=10, choices=InventoryTransaction.TRANSACTION_TYPES)
+    quantity = models.IntegerField()
+    previous_quantity = models.IntegerField()
+    new_quantity = models.IntegerField()
+    notes = models.TextField(blank=True)
+    reference_number = models.CharField(max_length=100, blank=True)
+    related_order = models.CharField(max_length=100, blank=True)
+    bin = models.ForeignKey('Bin', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    to_bin = models.ForeignKey('Bin', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archived_created_id_idx'),
+            models.Index(fields=['item', 'created_at', 'id'], name='archived_item_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.transaction_type} - {self.item_id} ({self.quantity}, archived)"
+
+class Warehouse(models.Model):
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=100)
+    address = models.TextField(blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['code']
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+class Bin(models.Model):
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='bins')
+    code = models.CharField(max_length=50)
+    description = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['warehouse', 'code']
+        constraints = [
+            models.UniqueConstraint(fields=['warehouse', 'code'], name='unique_bin_code_per_warehouse'),
+        ]
+
+    def __str__(self):
+        return f"{self.warehouse.code}/{self.code}"
+
+class BinStock(models.Model):
+    # Quantity of an item held in a bin. Item.quantity is the total over its
+    # bins plus any stock not yet put away; both change in the same
+    # transaction. warehouse is copied from the bin so per-warehouse totals
+    # are answered from the (warehouse, item, quantity) index alone.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='bin_stock')
+    bin = models.ForeignKey(Bin, on_delete=models.PROTECT, related_name='stock')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='stock')
+    quantity = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'bin'], name='one_stock_row_per_item_per_bin'),
+            models.CheckConstraint(condition=models.Q(quantity__gte=0), name='bin_stock_not_negative'),
+        ]
+        indexes = [
+            models.Index(fields=['warehouse', 'item', 'quantity'], name='binstock_wh_item_qty_idx'),
+            models.Index(fields=['bin', 'item'], name='binstock_bin_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} in {self.bin_id}: {self.quantity}"
+
+class StockSnapshot(models.Model):
+    # Closing stock of an item on a date. Written for every item on
+    # checkpoint dates and, between checkpoints, only for items that moved.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='snapshots')
+    date = models.DateField()
+    quantity = models.IntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'date'], name='one_snapshot_per_item_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'item'], name='snapshot_date_item_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.date}: {self.quantity}"
+
+class SnapshotRun(models.Model):
+    # One row per day rolled up; checkpoint days hold a snapshot of every item
+    date = models.DateField(unique=True)
+    is_checkpoint = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}{' (checkpoint)' if self.is_checkpoint else ''}"
+
+class ReorderAlert(models.Model):
+    # Open while the item stays at or below min_stock_level; resolved once it
+    # is restocked above it, so each threshold crossing alerts exactly once.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='reorder_alerts')
+    quantity = models.IntegerField()
+    min_stock_level = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['item'],
+                condition=models.Q(resolved_at__isnull=True),
+                name='one_open_reorder_alert_per_item',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Reorder {self.item.name} ({self.quantity}/{self.min_stock_level})"
+
+class ValuationRollup(models.Model):
+    # Stock valuation per category, supplier or location, maintained by
+    # inventory.valuation. Item changes only flag the affected groups as
+    # stale; the refresh_valuation job recomputes them from the items, so
+    # writes never pay for aggregation.
+    DIMENSION_CHOICES = [
+        ('category', 'Category'),
+        ('supplier', 'Supplier'),
+        ('location', 'Location'),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Category id, supplier name or location; '' for items without one
+    key = models.CharField(max_length=200, blank=True)
+    label = models.CharField(max_length=200, blank=True)
+    item_count = models.IntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    retail_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    stale = models.BooleanField(default=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['dimension', '-stock_value']
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='one_rollup_per_group'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['dimension', 'key'],
+                condition=models.Q(stale=True),
+                name='rollup_stale_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.label or self.key}: {self.stock_value}"
+
 class Supplier(models.Model):
     name = models.CharField(max_length=200)
     contact_person = models.CharField(max_length=100, blank=True)
@@ -122,6 +319,8 @@ class Supplier(models.Model):
     address = models.TextField(blank=True)
     website = models.URLField(blank=True)
     notes = models.TextField(blank=True)
+    # Days from order to delivery, used by the demand forecast
+    lead_time_days = models.PositiveIntegerField(default=7)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -132,6 +331,159 @@ class Supplier(models.Model):
     def __str__(self):
         return self.name
 
+class JobFileStorage(FileSystemStorage):
+    # Job inputs and outputs, shared by the web processes and the workers.
+    # The directory is read on use, so it follows settings overrides.
+    @property
+    def base_location(self):
+        return getattr(settings, 'INVENTORY_JOB_FILES_DIR', settings.BASE_DIR / 'job_files')
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+def job_storage():
+    return JobFileStorage()
+
+class Job(models.Model):
+    # A unit of background work, run by the run_jobs worker command. See
+    # inventory.jobs for the task registry, claiming and retries.
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    # Queued jobs are not picked up before this; retries back off through it
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    input_file = models.FileField(upload_to='jobs/input/', storage=job_storage, blank=True)
+    output_file = models.FileField(upload_to='jobs/output/', storage=job_storage, blank=True)
+
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['run_after', 'id'],
+                condition=models.Q(status='queued'),
+                name='job_queued_idx',
+            ),
+            models.Index(
+                fields=['heartbeat_at'],
+                condition=models.Q(status='running'),
+                name='job_running_idx',
+            ),
+            models.Index(fields=['created_by', '-created_at'], name='job_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'succeeded' else None
+        return min(100, self.progress * 100 // self.total)
+
+    def get_absolute_url(self):
+        return reverse('job-detail', kwargs={'pk': self.pk})
+
+class StocktakeSession(models.Model):
+    # A physical count of one location and/or shelf, or of everything when
+    # both are blank. Scans are ingested in batches and posted as 'adjust'
+    # movements by inventory.stocktake.
+    STATUS_CHOICES = [
+        ('counting', 'Counting'),
+        ('posting', 'Posting'),
+        ('posted', 'Posted'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    name = models.CharField(max_length=200)
+    location = models.CharField(max_length=100, blank=True)
+    shelf = models.CharField(max_length=50, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='counting')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='stocktakes')
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+
+    def __str__(self):
+        return self.name
+
+    def get_absolute_url(self):
+        return reverse('stocktake-detail', kwargs={'pk': self.pk})
+
+class StocktakeCount(models.Model):
+    # Units counted per item, summed over every scan batch of the session
+    session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='counts')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='stocktake_counts')
+    counted = models.PositiveIntegerField(default=0)
+    scans = models.PositiveIntegerField(default=0)
+    # Item.quantity when the item was first scanned; variances are posted
+    # against it, so movements between the count and posting are kept
+    expected = models.IntegerField(null=True, blank=True)
+    # Set when the item's variance is posted; a session closes once every
+    # variance has been
+    posted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'item'], name='one_count_per_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id}: {self.counted}"
+
+class StocktakeBatch(models.Model):
+    # One upload of scans. Devices name their batches, so a retried upload
+    # is recognised and never counted twice.
+    session = models.ForeignKey(StocktakeSession, on_delete=models.CASCADE, related_name='batches')
+    batch_id = models.CharField(max_length=100)
+    scans = models.PositiveIntegerField(default=0)
+    items = models.PositiveIntegerField(default=0)
+    # Units per scanned code that matched no SKU or barcode
+    unknown = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'batch_id'], name='one_batch_per_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id}/{self.batch_id}"
+
 # User Profile extension (optional)
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
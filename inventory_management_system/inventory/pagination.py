@@ -0,0 +1,196 @@
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction):
+    raw = json.dumps([direction, values], default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Malformed pagination cursor.") from exc
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise InvalidCursor("Malformed pagination cursor.")
+    return direction, values
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique, totally ordered key.
+
+    ``ordering`` must end in a unique field (normally ``id``) and match an
+    index, e.g. ``("name", "id")`` for items or ``("-created_at", "-id")`` for
+    transactions. Each page is a single ``WHERE key > cursor ORDER BY key
+    LIMIT n+1`` query, so page depth never affects cost and no ``COUNT(*)``
+    is issued.
+
+    ``fallbacks`` are further querysets over tables with the same key columns
+    whose rows all sort after ``queryset``'s, such as archived transactions.
+    They are only queried once the rows before them run out, so a page that
+    stays within the live table costs one query.
+    """
+
+    def __init__(self, queryset, per_page, ordering, fallbacks=()):
+        self.queryset = queryset
+        self.fallbacks = tuple(fallbacks)
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.model_fields = [queryset.model._meta.get_field(f) for f in self.fields]
+
+    def _seek(self, values, forward):
+        # Expands (a, b) > (x, y) into a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith("-")
+            lookup = "lt" if descending == forward else "gt"
+            clause = Q(**{f"{self.fields[index]}__{lookup}": values[index]})
+            for prior in range(index):
+                clause &= Q(**{self.fields[prior]: values[prior]})
+            condition |= clause
+        return condition
+
+    def _key(self, obj):
+        return [self.model_fields[i].value_to_string(obj) for i in range(len(self.fields))]
+
+    def _parse(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor("Pagination cursor does not match ordering.")
+        try:
+            return [field.to_python(value) for field, value in zip(self.model_fields, values)]
+        except Exception as exc:
+            raise InvalidCursor("Malformed pagination cursor.") from exc
+
+    def _query(self, cursor):
+        direction, values = decode_cursor(cursor) if cursor else ("next", None)
+        forward = direction == "next"
+        if forward:
+            ordering = self.ordering
+            sources = (self.queryset, *self.fallbacks)
+        else:
+            ordering = [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+            sources = (*reversed(self.fallbacks), self.queryset)
+        seek = self._seek(self._parse(values), forward) if values is not None else None
+        querysets = [
+            (queryset if seek is None else queryset.filter(seek)).order_by(*ordering)
+            for queryset in sources
+        ]
+        return querysets, forward, values is not None
+
+    def _limit(self, rows):
+        return self.per_page + 1 - len(rows)
+
+    def _build(self, rows, forward, has_cursor):
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, has_cursor
+        else:
+            has_next, has_previous = True, has_more
+        next_cursor = encode_cursor(self._key(rows[-1]), "next") if rows and has_next else None
+        previous_cursor = (
+            encode_cursor(self._key(rows[0]), "prev") if rows and has_previous else None
+        )
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
+
+    def page(self, cursor=None):
+        querysets, forward, has_cursor = self._query(cursor)
+        rows = []
+        for queryset in querysets:
+            rows.extend(queryset[: self._limit(rows)])
+            if self._limit(rows) <= 0:
+                break
+        return self._build(rows, forward, has_cursor)
+
+    async def apage(self, cursor=None):
+        querysets, forward, has_cursor = self._query(cursor)
+        rows = []
+        for queryset in querysets:
+            rows.extend([obj async for obj in queryset[: self._limit(rows)]])
+            if self._limit(rows) <= 0:
+                break
+        return self._build(rows, forward, has_cursor)
+
+
+def estimated_count(queryset):
+    """Return a cheap row estimate for ``queryset``, or None if unavailable.
+
+    PostgreSQL answers from the planner (``pg_class.reltuples`` for a whole
+    table, ``EXPLAIN`` row estimates for filtered querysets). SQLite has no
+    planner statistics, so only an unfiltered table is estimated, from the
+    largest primary key.
+    """
+    connection = connections[queryset.db]
+    model = queryset.model
+    unfiltered = not queryset.query.where
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            if unfiltered:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                if row and row[0] >= 0:
+                    return row[0]
+            sql, params = queryset.order_by().values("pk").query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    if unfiltered:
+        return model._default_manager.using(queryset.db).order_by("-pk").values_list(
+            "pk", flat=True
+        ).first() or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    # Uses planner statistics instead of COUNT(*) where the backend has them;
+    # estimates under exact_below rows are replaced by an exact count, as are
+    # filtered querysets unless estimate_filtered is set
+    exact_below = 0
+    estimate_filtered = True
+
+    @cached_property
+    def count(self):
+        if not self.estimate_filtered and self.object_list.query.where:
+            return super().count
+        estimate = estimated_count(self.object_list)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        return estimate
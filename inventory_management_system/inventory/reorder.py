@@ -0,0 +1,106 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, IntegerField, Sum
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Item, ReorderAlert
+
+logger = logging.getLogger(__name__)
+
+# Sent with ``alerts`` (newly opened ReorderAlert rows) after each check
+reorder_alerts_opened = Signal()
+
+
+def low_stock_items():
+    """Items at or below their reorder point, served by ``item_low_stock_idx``."""
+    return (
+        Item.objects.filter(quantity__lte=F("min_stock_level"))
+        .exclude(status="discontinued")
+        .order_by("supplier", "id")
+    )
+
+
+def reorder_lines():
+    return (
+        low_stock_items()
+        .annotate(
+            suggested_quantity=ExpressionWrapper(
+                F("max_stock_level") - F("quantity"), output_field=IntegerField()
+            ),
+            suggested_cost=ExpressionWrapper(
+                (F("max_stock_level") - F("quantity")) * F("cost_price"),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+        )
+        .filter(suggested_quantity__gt=0)
+        .order_by("supplier", "name", "id")
+    )
+
+
+def reorder_suggestions():
+    """Return the reorder queue grouped by supplier.
+
+    Each group has the supplier name, per-supplier totals from one aggregate
+    query, and the item lines (ordering up to ``max_stock_level``).
+    """
+    lines = list(reorder_lines().select_related("category"))
+    totals = {
+        row["supplier"]: row
+        for row in reorder_lines()
+        .order_by()
+        .values("supplier")
+        .annotate(
+            item_count=Count("id"),
+            total_quantity=Sum("suggested_quantity"),
+            total_cost=Sum("suggested_cost"),
+        )
+    }
+    groups = {}
+    for line in lines:
+        group = groups.get(line.supplier)
+        if group is None:
+            group = groups[line.supplier] = dict(totals[line.supplier], lines=[])
+        group["lines"].append(line)
+    return list(groups.values())
+
+
+def check_reorder_levels():
+    """Open alerts for items that crossed below their reorder point and
+    resolve alerts for items restocked above it.
+
+    Only the low-stock items and the open alerts are read, both small sets,
+    so the cost does not grow with the size of the catalog.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        low = dict(low_stock_items().values_list("id", "quantity"))
+        open_alerts = dict(
+            ReorderAlert.objects.filter(resolved_at__isnull=True).values_list("item_id", "id")
+        )
+        recovered = [alert for item_id, alert in open_alerts.items() if item_id not in low]
+        ReorderAlert.objects.filter(id__in=recovered).update(resolved_at=now)
+
+        crossed = [item_id for item_id in low if item_id not in open_alerts]
+        levels = dict(Item.objects.filter(id__in=crossed).values_list("id", "min_stock_level"))
+        alerts = ReorderAlert.objects.bulk_create(
+            [
+                ReorderAlert(
+                    item_id=item_id,
+                    quantity=low[item_id],
+                    min_stock_level=levels[item_id],
+                )
+                for item_id in crossed
+            ]
+        )
+    for alert in alerts:
+        logger.warning(
+            "Item %s fell to %s, at or below its reorder point of %s",
+            alert.item_id,
+            alert.quantity,
+            alert.min_stock_level,
+        )
+    if alerts:
+        reorder_alerts_opened.send(sender=ReorderAlert, alerts=alerts)
+    return alerts, len(recovered)
@@ -0,0 +1,176 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Item
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# A single token of letters, digits and separators that contains a digit is
+# treated as a SKU/barcode and goes through the indexed exact/prefix path.
+CODE_RE = re.compile(r"^(?=.*\d)[\w\-./]+$")
+
+FTS_TABLE = "inventory_item_fts"
+
+
+def search_terms(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def is_code(query):
+    return bool(CODE_RE.match(query))
+
+
+def code_lookup(queryset, query):
+    """Exact, then prefix, match on SKU/barcode using only b-tree range scans."""
+    exact = queryset.filter(Q(sku=query) | Q(barcode=query))
+    if exact.exists():
+        return exact
+    return code_prefix(queryset, query)
+
+
+def code_prefix(queryset, query):
+    condition = Q()
+    for prefix in {query, query.upper()}:
+        upper = prefix + "\U0010ffff"
+        condition |= Q(sku__gte=prefix, sku__lt=upper)
+        condition |= Q(barcode__gte=prefix, barcode__lt=upper)
+    return queryset.filter(condition)
+
+
+class BaseSearchBackend:
+    def __init__(self, using="default"):
+        self.using = using
+
+    def search(self, queryset, query):
+        """Filter ``queryset`` to matches, annotated with ``search_rank``.
+
+        Higher ranks are better matches.
+        """
+        raise NotImplementedError
+
+    def rebuild(self):
+        pass
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    # Portable fallback; scans the table but works on every database
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(name__icontains=query)
+            | Q(description__icontains=query)
+            | Q(sku__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """SQLite FTS5 index, kept in sync by triggers on ``inventory_item``.
+
+    The virtual table is created by migration 0003 as an external-content
+    index, so item text is not stored twice.
+    """
+
+    # bm25 column weights: name, description, sku, barcode
+    rank_sql = f"bm25({FTS_TABLE}, 10.0, 1.0, 5.0, 5.0)"
+
+    def match_expression(self, query):
+        # Quote every token so user input can never be parsed as FTS syntax,
+        # and prefix-match each one for search-as-you-type.
+        return " ".join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        table = Item._meta.db_table
+        matched = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+        )
+        rank = RawSQL(
+            f"SELECT -{self.rank_sql} FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matched).annotate(search_rank=rank)
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """``tsvector`` search over a generated ``search_vector`` column.
+
+    Migration 0003 adds the stored generated column and its GIN index, so
+    PostgreSQL keeps the index current on every write.
+    """
+
+    def tsquery(self, query):
+        return " & ".join(f"{term}:*" for term in search_terms(query))
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return queryset.none()
+        table = Item._meta.db_table
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT id FROM {table} "
+                "WHERE search_vector @@ to_tsquery('simple', %s)",
+                [tsquery],
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank({table}.search_vector, to_tsquery('simple', %s))",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+
+def get_search_backend(using="default"):
+    path = getattr(settings, "INVENTORY_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)(using)
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        return SQLiteFTSSearchBackend(using)
+    if vendor == "postgresql":
+        return PostgresSearchBackend(using)
+    return IContainsSearchBackend(using)
+
+
+def search_items(queryset, query):
+    """Search items, preferring exact SKU/barcode hits over full text.
+
+    The result is annotated with ``search_rank``; callers decide whether to
+    order by it.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if is_code(query):
+        codes = code_lookup(queryset, query)
+        if codes.exists():
+            return codes.annotate(search_rank=Value(1e9, output_field=FloatField()))
+    return get_search_backend(queryset.db).search(queryset, query)
+
+
+async def asearch_items(queryset, query):
+    """Async counterpart of :func:`search_items`."""
+    query = query.strip()
+    if not query:
+        return queryset
+    if is_code(query):
+        exact = queryset.filter(Q(sku=query) | Q(barcode=query))
+        if await exact.aexists():
+            codes = exact
+        else:
+            codes = code_prefix(queryset, query)
+        if await codes.aexists():
+            return codes.annotate(search_rank=Value(1e9, output_field=FloatField()))
+    return get_search_backend(queryset.db).search(queryset, query)
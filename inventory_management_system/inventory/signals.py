@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from . import live, lookup, valuation
+from .fragments import CATEGORY_VERSION, bump_version
+from .facets import FACET_COLUMNS, invalidate_facets
+from .models import Bin, BinStock, Category, Item, Warehouse
+from .stats import invalidate_dashboard_stats
+from .warehouses import invalidate_warehouse_summary
+
+# Sent with ``item_ids`` after bulk writes that bypass post_save, such as
+# F() expression updates and bulk_update/bulk_create. ``fields`` names the
+# Item columns written (None when any may have changed), ``bins`` says
+# whether bin stock moved too and ``groups`` may give the valuation groups
+# of the items, saving a query for them.
+items_updated = Signal()
+
+
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=Category)
+def item_changed(sender, instance, update_fields=None, **kwargs):
+    invalidate_dashboard_stats()
+    # Saves limited to non-facet columns leave the facet counts untouched
+    if update_fields is None or FACET_COLUMNS & set(update_fields):
+        invalidate_facets()
+    # Warehouse totals only read item cost prices
+    if sender is Item and (update_fields is None or "cost_price" in update_fields):
+        invalidate_warehouse_summary()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def category_changed(sender, instance, **kwargs):
+    bump_version(CATEGORY_VERSION)
+    # The category rollup row carries the name as its label
+    key = str(instance.pk)
+    transaction.on_commit(lambda: valuation.mark_stale({"category": {key}}))
+
+
+@receiver([post_save, post_delete], sender=Warehouse)
+def warehouse_changed(sender, instance, **kwargs):
+    invalidate_warehouse_summary()
+
+
+@receiver(post_save, sender=Bin)
+def bin_saved(sender, instance, **kwargs):
+    # Keep the warehouse copied onto bin stock rows in step with the bin
+    BinStock.objects.filter(bin=instance).exclude(warehouse=instance.warehouse_id).update(
+        warehouse=instance.warehouse_id
+    )
+    invalidate_warehouse_summary()
+
+
+@receiver(post_init, sender=Item)
+def remember_item_codes(sender, instance, **kwargs):
+    # Lets the lookup cache drop entries for a SKU/barcode that was changed.
+    # Read from __dict__ so deferred fields are not loaded.
+    instance._loaded_codes = (
+        instance.__dict__.get("sku"),
+        instance.__dict__.get("barcode"),
+    )
+    # Likewise lets the valuation rollup of a group the item left be redone
+    instance._loaded_groups = (
+        instance.__dict__.get("category_id"),
+        instance.__dict__.get("supplier"),
+        instance.__dict__.get("location"),
+    )
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, **kwargs):
+    previous = [code for code in getattr(instance, "_loaded_codes", ()) if code]
+    instance._loaded_codes = (instance.sku, instance.barcode)
+    # Only publish committed data to the shared cache
+    transaction.on_commit(lambda: lookup.item_saved(instance, previous))
+    # Re-read on commit: the instance may hold F() expressions, not values
+    transaction.on_commit(lambda: live.publish_items([instance.pk]))
+    groups = valuation.item_keys(instance, getattr(instance, "_loaded_groups", ()))
+    instance._loaded_groups = (instance.category_id, instance.supplier, instance.location)
+    transaction.on_commit(lambda: valuation.mark_stale(groups))
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: lookup.item_deleted(instance))
+    pk = instance.pk
+    transaction.on_commit(lambda: live.publish_deleted([pk]))
+    groups = valuation.item_keys(instance)
+    transaction.on_commit(lambda: valuation.mark_stale(groups))
+
+
+@receiver(items_updated)
+def items_bulk_changed(sender, item_ids, fields=None, bins=True, groups=None, **kwargs):
+    invalidate_dashboard_stats()
+    # Most stock movements leave the facet columns (status included) as
+    # they were, so the facet cache survives them
+    if fields is None or FACET_COLUMNS & set(fields):
+        invalidate_facets()
+    if bins or fields is None or "cost_price" in fields:
+        invalidate_warehouse_summary()
+    lookup.items_changed(item_ids)
+    # Stock movements and transfers arrive here too, since the stock engine
+    # sends items_updated for every transaction it records
+    live.publish_items(item_ids)
+    if fields is not None and not valuation.VALUED_COLUMNS & set(fields):
+        return
+    if groups is not None:
+        valuation.mark_stale(groups)
+    else:
+        valuation.mark_items_stale(item_ids)
@@ -0,0 +1,83 @@
+// Patches stock figures in place from the server-sent events of /live/
+// (see inventory/live.py), so pages stay current without reloading.
+(function () {
+  var script = document.currentScript;
+  if (!window.EventSource || !script || !script.dataset.url) {
+    return;
+  }
+  var STATUS_CLASSES = { available: "bg-success", out_of_stock: "bg-danger" };
+  var source = new EventSource(script.dataset.url);
+
+  function rowFor(id) {
+    return document.querySelector('tr[data-item-id="' + id + '"]');
+  }
+
+  function field(row, name) {
+    return row.querySelector('[data-field="' + name + '"]');
+  }
+
+  function flash(row) {
+    row.classList.add("table-info");
+    setTimeout(function () {
+      row.classList.remove("table-info");
+    }, 1500);
+  }
+
+  source.addEventListener("items", function (event) {
+    JSON.parse(event.data).items.forEach(function (item) {
+      var row = rowFor(item.id);
+      if (!row) {
+        return;
+      }
+      field(row, "quantity").textContent = item.quantity;
+      var badge = field(row, "status");
+      badge.textContent = item.status_display;
+      badge.className = "badge " + (STATUS_CLASSES[item.status] || "bg-secondary");
+      // Local time from the server, shown as Y-m-d like the template
+      field(row, "updated_at").textContent = item.updated_at.slice(0, 10);
+      flash(row);
+    });
+  });
+
+  source.addEventListener("deleted", function (event) {
+    JSON.parse(event.data).ids.forEach(function (id) {
+      var row = rowFor(id);
+      if (row) {
+        row.classList.add("text-muted", "text-decoration-line-through");
+      }
+    });
+  });
+
+  source.addEventListener("stats", function (event) {
+    var stats = JSON.parse(event.data);
+    document.querySelectorAll("[data-stat]").forEach(function (element) {
+      if (element.dataset.stat in stats) {
+        element.textContent = stats[element.dataset.stat];
+      }
+    });
+    var list = document.querySelector("[data-top-categories]");
+    if (list) {
+      list.replaceChildren.apply(
+        list,
+        stats.top_categories.map(function (category) {
+          var entry = document.createElement("li");
+          entry.className = "list-group-item d-flex justify-content-between align-items-center";
+          entry.textContent = category.name;
+          var badge = document.createElement("span");
+          badge.className = "badge bg-primary rounded-pill";
+          badge.textContent = category.item_count;
+          entry.appendChild(badge);
+          return entry;
+        })
+      );
+    }
+  });
+
+  // Sent after bulk changes too large to patch row by row
+  source.addEventListener("reload", function () {
+    var notice = document.querySelector("[data-live-notice]");
+    if (notice) {
+      notice.classList.remove("d-none");
+    }
+  });
+})();
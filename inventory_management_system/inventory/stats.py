@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Category, Item
+
+STATS_CACHE_KEY = "inventory:dashboard-stats"
+
+
+def _stats_timeout():
+    # Signals keep the cached value fresh; the timeout only bounds staleness
+    # when several processes each hold their own local-memory cache.
+    return getattr(settings, "INVENTORY_STATS_CACHE_TIMEOUT", 300)
+
+
+def stats_query():
+    """One grouped query over categories left-joined to their items."""
+    return (
+        Category.objects.values("id", "name", "items__status")
+        .annotate(
+            item_count=Count("items"),
+            low_stock=Count(
+                "items", filter=Q(items__quantity__lte=F("items__min_stock_level"))
+            ),
+            out_of_stock=Count("items", filter=Q(items__quantity__lte=0)),
+            stock_value=Coalesce(
+                Sum(
+                    F("items__quantity") * F("items__cost_price"),
+                    output_field=DecimalField(max_digits=20, decimal_places=2),
+                ),
+                Decimal("0"),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+
+
+def build_stats(rows):
+    stats = {
+        "total_items": 0,
+        "total_categories": 0,
+        "low_stock_items": 0,
+        "out_of_stock_items": 0,
+        "total_stock_value": Decimal("0"),
+        "by_status": {value: 0 for value, _ in Item.STATUS_CHOICES},
+        "by_category": [],
+    }
+    categories = {}
+    for row in rows:
+        category = categories.get(row["id"])
+        if category is None:
+            category = categories[row["id"]] = {
+                "id": row["id"],
+                "name": row["name"],
+                "item_count": 0,
+                "low_stock": 0,
+                "out_of_stock": 0,
+                "stock_value": Decimal("0"),
+            }
+        if row["items__status"] is None:
+            # Left join row for a category without items
+            continue
+        for key in ("item_count", "low_stock", "out_of_stock", "stock_value"):
+            category[key] += row[key]
+        stats["by_status"][row["items__status"]] = (
+            stats["by_status"].get(row["items__status"], 0) + row["item_count"]
+        )
+
+    for category in categories.values():
+        stats["total_items"] += category["item_count"]
+        stats["low_stock_items"] += category["low_stock"]
+        stats["out_of_stock_items"] += category["out_of_stock"]
+        stats["total_stock_value"] += category["stock_value"]
+
+    stats["total_categories"] = len(categories)
+    stats["by_category"] = sorted(
+        categories.values(), key=lambda c: (-c["item_count"], c["name"])
+    )
+    return stats
+
+
+def compute_dashboard_stats():
+    """Compute every dashboard figure from a single grouped query."""
+    return build_stats(stats_query())
+
+
+def get_dashboard_stats():
+    """Return the cached dashboard statistics, computing them on a miss."""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = compute_dashboard_stats()
+        cache.set(STATS_CACHE_KEY, stats, _stats_timeout())
+    return stats
+
+
+async def aget_dashboard_stats():
+    stats = await cache.aget(STATS_CACHE_KEY)
+    if stats is None:
+        stats = build_stats([row async for row in stats_query()])
+        await cache.aset(STATS_CACHE_KEY, stats, _stats_timeout())
+    return stats
+
+
+def invalidate_dashboard_stats():
+    cache.delete(STATS_CACHE_KEY)
@@ -0,0 +1,377 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import valuation
+from .models import Bin, BinStock, InventoryTransaction, Item
+from .signals import items_updated
+
+INBOUND_TYPES = ("in", "return")
+OUTBOUND_TYPES = ("out",)
+UPDATE_BATCH_SIZE = 1000
+
+
+class StockMovementError(ValueError):
+    """Raised when a movement is malformed or would make stock negative."""
+
+
+def movement_delta(transaction_type, quantity):
+    """Return the signed change in stock for a movement.
+
+    ``in``/``return``/``out`` take a positive quantity; ``adjust`` takes the
+    signed correction (e.g. ``-3`` after a stocktake found three missing).
+    """
+    if transaction_type in INBOUND_TYPES + OUTBOUND_TYPES:
+        if quantity <= 0:
+            raise StockMovementError("Quantity must be a positive number.")
+        return quantity if transaction_type in INBOUND_TYPES else -quantity
+    if transaction_type == "adjust":
+        if quantity == 0:
+            raise StockMovementError("Adjustment quantity cannot be zero.")
+        return quantity
+    if transaction_type == "transfer":
+        raise StockMovementError("Bin transfers do not change stock; use transfer_stock.")
+    raise StockMovementError(f"Unknown transaction type: {transaction_type!r}")
+
+
+def _restock_fields(transaction_type, now):
+    if transaction_type in INBOUND_TYPES:
+        return {"last_restocked": now}
+    return {}
+
+
+def _next_status(status, quantity):
+    if status == "available" and quantity <= 0:
+        return "out_of_stock"
+    if status == "out_of_stock" and quantity > 0:
+        return "available"
+    return status
+
+
+def _pk(obj):
+    return obj.pk if hasattr(obj, "pk") else obj
+
+
+def allocated_quantity():
+    # Stock of the outer Item row that sits in bins
+    return Coalesce(
+        Subquery(
+            BinStock.objects.filter(item=OuterRef("pk"))
+            .order_by()
+            .values("item")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def _move_bin_stock(item_id, bin_id, delta, now):
+    # Same conditional update as the item row, creating the row on first put-away
+    updated = BinStock.objects.filter(
+        item_id=item_id, bin_id=bin_id, quantity__gte=-delta
+    ).update(quantity=F("quantity") + delta, updated_at=now)
+    if updated:
+        return
+    if delta > 0:
+        warehouse_id = Bin.objects.filter(pk=bin_id).values_list("warehouse_id", flat=True).first()
+        if warehouse_id is None:
+            raise StockMovementError(f"Bin {bin_id} does not exist.")
+        try:
+            with transaction.atomic():
+                BinStock.objects.create(
+                    item_id=item_id, bin_id=bin_id, warehouse_id=warehouse_id, quantity=delta
+                )
+            return
+        except IntegrityError:
+            # Another movement created the row first
+            return _move_bin_stock(item_id, bin_id, delta, now)
+    raise StockMovementError(
+        f"Insufficient stock for item {item_id} in bin {bin_id} to apply {delta}."
+    )
+
+
+def apply_movement(
+    item,
+    transaction_type,
+    quantity,
+    user=None,
+    notes="",
+    reference_number="",
+    related_order="",
+    bin=None,
+):
+    """Apply a single stock movement atomically and log it.
+
+    The quantity is changed with a conditional ``UPDATE ... SET quantity =
+    quantity + delta WHERE quantity + delta >= 0``, so concurrent movements on
+    the same item never overwrite each other and stock never goes negative.
+
+    With a ``bin`` the bin's stock row moves by the same amount in the same
+    transaction. Without one, outgoing stock may only come from stock that is
+    not allocated to any bin.
+    """
+    item_id = _pk(item)
+    bin_id = _pk(bin)
+    delta = movement_delta(transaction_type, quantity)
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = Item.objects.filter(pk=item_id, quantity__gte=-delta)
+        if bin_id is None and delta < 0:
+            rows = Item.objects.alias(allocated=allocated_quantity()).filter(
+                pk=item_id, quantity__gte=F("allocated") - delta
+            )
+        updated = rows.update(
+            quantity=F("quantity") + delta,
+            updated_at=now,
+            **_restock_fields(transaction_type, now),
+        )
+        if not updated:
+            if not Item.objects.filter(pk=item_id).exists():
+                raise StockMovementError(f"Item {item_id} does not exist.")
+            raise StockMovementError(
+                f"Insufficient stock for item {item_id} to apply {delta}."
+            )
+        if bin_id is not None:
+            _move_bin_stock(item_id, bin_id, delta, now)
+
+        # The row is now write-locked by this transaction, so the value read
+        # back is exactly the result of our own update.
+        new_quantity, status, *group = Item.objects.filter(pk=item_id).values_list(
+            "quantity", "status", "category_id", "supplier", "location"
+        ).get()
+        new_status = _next_status(status, new_quantity)
+        if new_status != status:
+            Item.objects.filter(pk=item_id).update(status=new_status)
+
+        record = InventoryTransaction.objects.create(
+            item_id=item_id,
+            transaction_type=transaction_type,
+            quantity=quantity,
+            previous_quantity=new_quantity - delta,
+            new_quantity=new_quantity,
+            notes=notes,
+            reference_number=reference_number,
+            related_order=related_order,
+            bin_id=bin_id,
+            created_by=user,
+        )
+        fields = ["quantity", "updated_at", *_restock_fields(transaction_type, now)]
+        if new_status != status:
+            fields.append("status")
+        groups = valuation.keys_for([group])
+        transaction.on_commit(
+            lambda: items_updated.send(
+                sender=Item,
+                item_ids=[item_id],
+                fields=fields,
+                bins=bin_id is not None,
+                groups=groups,
+            )
+        )
+
+    if isinstance(item, Item):
+        item.quantity = new_quantity
+        item.status = new_status
+        item.updated_at = now
+        if transaction_type in INBOUND_TYPES:
+            item.last_restocked = now
+    return record
+
+
+def apply_movements(movements, user=None):
+    """Apply many movements as one all-or-nothing batch.
+
+    ``movements`` is an iterable of dicts with ``item`` (a pk), ``type`` and
+    ``quantity``, plus optional ``bin`` (a pk), ``notes``,
+    ``reference_number`` and ``related_order``. Regardless of batch size this
+    costs two locking reads (items and their bin stock), one bulk ``UPDATE``
+    per table and one bulk ``INSERT``. Movements for the same item are
+    applied in the order given.
+    """
+    movements = list(movements)
+    if not movements:
+        return []
+    deltas = [movement_delta(m["type"], m["quantity"]) for m in movements]
+    item_ids = {m["item"] for m in movements}
+    bin_ids = {m["bin"] for m in movements if m.get("bin")}
+    now = timezone.now()
+
+    with transaction.atomic():
+        items = Item.objects.select_for_update().in_bulk(item_ids)
+        missing = item_ids - set(items)
+        if missing:
+            raise StockMovementError(
+                f"Unknown item ids: {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        bins = Bin.objects.in_bulk(bin_ids) if bin_ids else {}
+        missing = bin_ids - set(bins)
+        if missing:
+            raise StockMovementError(
+                f"Unknown bin ids: {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        stock_rows = {
+            (row.item_id, row.bin_id): row
+            for row in BinStock.objects.select_for_update().filter(item_id__in=item_ids)
+        }
+        allocated = dict.fromkeys(item_ids, 0)
+        for row in stock_rows.values():
+            allocated[row.item_id] += row.quantity
+
+        records = []
+        restocked = set()
+        touched = {}
+        running = {pk: item.quantity for pk, item in items.items()}
+        for movement, delta in zip(movements, deltas):
+            pk = movement["item"]
+            bin_id = movement.get("bin") or None
+            previous = running[pk]
+            if bin_id is None:
+                # Unbinned stock may not dip into what is allocated to bins
+                if previous + delta < allocated[pk]:
+                    raise StockMovementError(
+                        f"Insufficient stock for item {pk} to apply {delta}."
+                    )
+            else:
+                row = stock_rows.get((pk, bin_id))
+                if row is None:
+                    row = stock_rows[pk, bin_id] = BinStock(
+                        item_id=pk, bin_id=bin_id, warehouse_id=bins[bin_id].warehouse_id
+                    )
+                if row.quantity + delta < 0:
+                    raise StockMovementError(
+                        f"Insufficient stock for item {pk} in bin {bin_id} to apply {delta}."
+                    )
+                row.quantity += delta
+                row.updated_at = now
+                allocated[pk] += delta
+                touched[pk, bin_id] = row
+            running[pk] = previous + delta
+            if movement["type"] in INBOUND_TYPES:
+                restocked.add(pk)
+            records.append(
+                InventoryTransaction(
+                    item_id=pk,
+                    transaction_type=movement["type"],
+                    quantity=movement["quantity"],
+                    previous_quantity=previous,
+                    new_quantity=running[pk],
+                    notes=movement.get("notes", ""),
+                    reference_number=movement.get("reference_number", ""),
+                    related_order=movement.get("related_order", ""),
+                    bin_id=bin_id,
+                    created_by=user,
+                )
+            )
+
+        # Items ending up with the same values share one UPDATE ... WHERE id
+        # IN, far cheaper than bulk_update's per-row CASE; stocktakes leave
+        # thousands of items on the same few quantities.
+        groups = defaultdict(list)
+        fields = {"quantity", "updated_at"}
+        for pk, item in items.items():
+            item.quantity = running[pk]
+            status = _next_status(item.status, item.quantity)
+            if status != item.status:
+                item.status = status
+                fields.add("status")
+            item.updated_at = now
+            if pk in restocked:
+                item.last_restocked = now
+            groups[item.quantity, item.status, pk in restocked].append(pk)
+        singles = []
+        for (quantity, status, was_restocked), pks in groups.items():
+            if len(pks) == 1:
+                singles.append(items[pks[0]])
+                continue
+            for start in range(0, len(pks), UPDATE_BATCH_SIZE):
+                Item.objects.filter(pk__in=pks[start:start + UPDATE_BATCH_SIZE]).update(
+                    quantity=quantity,
+                    status=status,
+                    updated_at=now,
+                    **({"last_restocked": now} if was_restocked else {}),
+                )
+        Item.objects.bulk_update(
+            singles,
+            ["quantity", "status", "updated_at", "last_restocked"],
+            batch_size=500,
+        )
+        BinStock.objects.bulk_update(
+            [row for row in touched.values() if row.pk], ["quantity", "updated_at"], batch_size=500
+        )
+        BinStock.objects.bulk_create([row for row in touched.values() if not row.pk])
+        records = InventoryTransaction.objects.bulk_create(records, batch_size=500)
+        changed = sorted(items)
+        if restocked:
+            fields.add("last_restocked")
+        # Valuation groups from the locked rows, so none need to be queried
+        keys = valuation.keys_for(
+            (item.category_id, item.supplier, item.location) for item in items.values()
+        )
+        transaction.on_commit(
+            lambda: items_updated.send(
+                sender=Item, item_ids=changed, fields=fields, bins=bool(touched), groups=keys
+            )
+        )
+    return records
+
+
+def transfer_stock(
+    item, quantity, from_bin=None, to_bin=None, user=None, notes="", reference_number=""
+):
+    """Move stock between bins, logged as one ``transfer`` transaction.
+
+    Either bin may be omitted: no ``from_bin`` puts away stock that is not
+    yet in a bin, no ``to_bin`` takes stock out of its bin without removing
+    it from the item. The item total does not change, so the record's
+    previous and new quantities are both that total.
+    """
+    item_id = _pk(item)
+    from_id, to_id = _pk(from_bin), _pk(to_bin)
+    if quantity <= 0:
+        raise StockMovementError("Quantity must be a positive number.")
+    if from_id == to_id:
+        raise StockMovementError("A transfer needs two different bins.")
+    now = timezone.now()
+
+    with transaction.atomic():
+        try:
+            total, allocated = (
+                Item.objects.select_for_update()
+                .filter(pk=item_id)
+                .annotate(allocated=allocated_quantity())
+                .values_list("quantity", "allocated")
+                .get()
+            )
+        except Item.DoesNotExist:
+            raise StockMovementError(f"Item {item_id} does not exist.")
+        if from_id is None:
+            if total - allocated < quantity:
+                raise StockMovementError(
+                    f"Only {total - allocated} of item {item_id} is not in a bin."
+                )
+        else:
+            _move_bin_stock(item_id, from_id, -quantity, now)
+        if to_id is not None:
+            _move_bin_stock(item_id, to_id, quantity, now)
+        record = InventoryTransaction.objects.create(
+            item_id=item_id,
+            transaction_type="transfer",
+            quantity=quantity,
+            previous_quantity=total,
+            new_quantity=total,
+            notes=notes,
+            reference_number=reference_number,
+            bin_id=from_id,
+            to_bin_id=to_id,
+            created_by=user,
+        )
+        # Only bin stock changes; the item row is untouched
+        transaction.on_commit(
+            lambda: items_updated.send(sender=Item, item_ids=[item_id], fields=[], bins=True)
+        )
+    return record
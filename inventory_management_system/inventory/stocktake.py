@@ -0,0 +1,330 @@
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BinStock, Item, StocktakeBatch, StocktakeCount, StocktakeSession
+from .stock import apply_movements
+from .valuation import ZERO, money
+
+MAX_SCANS_PER_BATCH = 20000
+# Codes or item ids per IN (...) list, well inside every database's limit
+CHUNK_SIZE = 2000
+CENTS = Decimal("0.01")
+
+
+class StocktakeError(ValueError):
+    """Raised for malformed scans or changes to a session that is closed."""
+
+
+def chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def session_items(session):
+    """Items the session is meant to count."""
+    items = Item.objects.all()
+    if session.location:
+        items = items.filter(location=session.location)
+    if session.shelf:
+        items = items.filter(shelf=session.shelf)
+    return items
+
+
+def aggregate_scans(scans):
+    """``(units, scan_count)`` Counters per code from a list of scans.
+
+    A scan is a code string (one unit) or ``{"code": ..., "quantity": n}``
+    for a counted case or pallet.
+    """
+    if not isinstance(scans, list):
+        raise StocktakeError("Expected a list of scans.")
+    if len(scans) > MAX_SCANS_PER_BATCH:
+        raise StocktakeError(f"At most {MAX_SCANS_PER_BATCH} scans per batch.")
+    units, counts = Counter(), Counter()
+    for index, scan in enumerate(scans):
+        quantity = 1
+        if isinstance(scan, dict):
+            scan, quantity = scan.get("code"), scan.get("quantity", 1)
+        if not isinstance(scan, str) or not scan.strip():
+            raise StocktakeError(f"Scan {index} has no code.")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise StocktakeError(f"Scan {index} needs a positive whole quantity.")
+        code = scan.strip()
+        units[code] += quantity
+        counts[code] += 1
+    return units, counts
+
+
+def resolve_codes(codes):
+    """``{code: item_id}`` for the codes that are a barcode or SKU.
+
+    One query per ``CHUNK_SIZE`` codes. A barcode wins over another item's
+    SKU, as scanners read barcodes.
+    """
+    resolved = {}
+    for chunk in chunks(codes):
+        rows = Item.objects.filter(Q(barcode__in=chunk) | Q(sku__in=chunk)).values_list(
+            "pk", "sku", "barcode"
+        )
+        by_barcode = {}
+        for pk, sku, barcode in rows:
+            resolved.setdefault(sku, pk)
+            by_barcode[barcode] = pk
+        resolved.update(by_barcode)
+    return {code: resolved[code] for code in codes if code in resolved}
+
+
+def record_scans(session, batch_id, scans, user=None):
+    """Add a batch of scans to the session's counts.
+
+    Scans are aggregated per code in memory, codes resolved in bulk, and the
+    per-item totals upserted in one statement, so the cost grows with the
+    distinct items in a batch rather than the scans. Returns ``(batch,
+    created)``; a batch id seen before returns the earlier batch untouched.
+    """
+    if not batch_id or len(batch_id) > 100:
+        raise StocktakeError("A batch id of at most 100 characters is required.")
+    units, scan_counts = aggregate_scans(scans)
+    with transaction.atomic():
+        # Serialises batches of one session, so concurrent uploads add up
+        session = StocktakeSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != "counting":
+            raise StocktakeError(f"The stocktake is {session.get_status_display().lower()}.")
+        existing = StocktakeBatch.objects.filter(session=session, batch_id=batch_id).first()
+        if existing is not None:
+            return existing, False
+
+        item_ids = resolve_codes(units)
+        counted, scanned = Counter(), Counter()
+        for code, item_id in item_ids.items():
+            counted[item_id] += units[code]
+            scanned[item_id] += scan_counts[code]
+        expected = {}
+        for chunk in chunks(counted):
+            for item_id, total, scans_so_far in StocktakeCount.objects.filter(
+                session=session, item_id__in=chunk
+            ).values_list("item_id", "counted", "scans"):
+                counted[item_id] += total
+                scanned[item_id] += scans_so_far
+            # Book quantity of items scanned for the first time; kept as it
+            # is by later batches, which only update the totals
+            expected.update(
+                Item.objects.filter(pk__in=chunk)
+                .exclude(stocktake_counts__session=session)
+                .values_list("pk", "quantity")
+            )
+        StocktakeCount.objects.bulk_create(
+            [
+                StocktakeCount(
+                    session=session,
+                    item_id=item_id,
+                    counted=total,
+                    scans=scanned[item_id],
+                    expected=expected.get(item_id),
+                )
+                for item_id, total in counted.items()
+            ],
+            batch_size=CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=["session", "item"],
+            update_fields=["counted", "scans", "updated_at"],
+        )
+        batch = StocktakeBatch.objects.create(
+            session=session,
+            batch_id=batch_id,
+            scans=sum(scan_counts.values()),
+            items=len(counted),
+            unknown={code: total for code, total in units.items() if code not in item_ids},
+            created_by=user,
+        )
+    return batch, True
+
+
+def variances(session):
+    """Items whose count differs from the books, in one query.
+
+    Covers every item in the session's scope plus any item scanned there
+    from elsewhere. Annotated with ``counted``, ``expected`` (the quantity
+    on record when the item was first scanned), ``variance`` (counted minus
+    expected), ``variance_value`` at cost and ``posted_at`` once posted.
+    Unscanned items in scope count as zero against their current quantity.
+    """
+    counts = StocktakeCount.objects.filter(session=session)
+    count = counts.filter(item=OuterRef("pk"))
+    return (
+        Item.objects.filter(
+            Q(pk__in=session_items(session).values("pk")) | Q(pk__in=counts.values("item"))
+        )
+        .annotate(
+            counted=Coalesce(
+                Subquery(count.values("counted")[:1], output_field=IntegerField()), Value(0)
+            ),
+            expected=Coalesce(
+                Subquery(count.values("expected")[:1], output_field=IntegerField()),
+                F("quantity"),
+            ),
+            posted_at=Subquery(count.values("posted_at")[:1]),
+        )
+        .annotate(variance=F("counted") - F("expected"))
+        .exclude(variance=0)
+        .annotate(variance_value=money(F("variance") * F("cost_price")))
+    )
+
+
+def unposted_variances(session):
+    """The variances still to be posted."""
+    return variances(session).filter(posted_at__isnull=True)
+
+
+def variance_summary(session):
+    """Totals for the review page: what was counted and what is off."""
+    summary = StocktakeCount.objects.filter(session=session).aggregate(
+        items_counted=Count("id"),
+        units_counted=Coalesce(Sum("counted"), 0),
+        scans=Coalesce(Sum("scans"), 0),
+    )
+    summary.update(
+        variances(session).aggregate(
+            variance_items=Count("id"),
+            net_units=Coalesce(Sum("variance"), 0),
+            shrinkage=Coalesce(money(Sum("variance_value", filter=Q(variance__lt=0))), ZERO),
+            overage=Coalesce(money(Sum("variance_value", filter=Q(variance__gt=0))), ZERO),
+        )
+    )
+    for key in ("shrinkage", "overage"):
+        summary[key] = summary[key].quantize(CENTS)
+    summary["net_value"] = summary["shrinkage"] + summary["overage"]
+    return summary
+
+
+def shrinkage_movements(shortfalls):
+    """Movements taking ``{item_id: (quantity, missing)}`` out of stock.
+
+    A session counts everything on its shelves, bins included, but missing
+    stock cannot be pinned on a bin. It comes out of stock not allocated to
+    any bin first, then out of the item's bins, fullest first, so the item
+    total matches the count and no bin goes negative.
+    """
+    allocated = defaultdict(list)
+    for chunk in chunks(shortfalls):
+        rows = (
+            BinStock.objects.filter(item_id__in=chunk, quantity__gt=0)
+            .order_by("item_id", "-quantity", "bin_id")
+            .values_list("item_id", "bin_id", "quantity")
+        )
+        for item_id, bin_id, quantity in rows:
+            allocated[item_id].append((bin_id, quantity))
+
+    movements = []
+    for pk, (quantity, missing) in shortfalls.items():
+        loose = quantity - sum(held for _, held in allocated[pk])
+        if loose > 0:
+            movements.append({"item": pk, "quantity": -min(loose, missing)})
+            missing -= min(loose, missing)
+        for bin_id, held in allocated[pk]:
+            if not missing:
+                break
+            movements.append({"item": pk, "bin": bin_id, "quantity": -min(held, missing)})
+            missing -= min(held, missing)
+    return movements
+
+
+def post_variances(session, user=None, item_ids=None, progress=None):
+    """Post unposted variances as 'adjust' movements.
+
+    Only items in ``item_ids`` are adjusted when it is given. Each adjustment
+    is the variance against the quantity on record at the count, so stock
+    that moved between scanning and posting keeps those movements (but never
+    goes below zero). Overages go to stock not yet in a bin; see
+    ``shrinkage_movements`` for shortages.
+
+    Items are posted ``CHUNK_SIZE`` at a time, each chunk in its own
+    transaction that also marks its counts posted, and ``progress(done,
+    total)`` is called between them. A post that stops part way therefore
+    carries on where it left off when repeated. The session is closed once no
+    unposted variance is left; otherwise it is open for counting again.
+    Returns the number of items adjusted.
+    """
+    pending = unposted_variances(session)
+    if item_ids is not None:
+        pending = pending.filter(pk__in=item_ids)
+    pks = list(pending.order_by("pk").values_list("pk", flat=True))
+    adjusted = 0
+    for done, chunk in enumerate(chunks(pks, CHUNK_SIZE), 1):
+        adjusted += post_chunk(session, chunk, user)
+        if progress is not None:
+            progress(min(done * CHUNK_SIZE, len(pks)), len(pks))
+
+    with transaction.atomic():
+        session = StocktakeSession.objects.select_for_update().get(pk=session.pk)
+        if session.status not in ("counting", "posting"):
+            raise StocktakeError(f"The stocktake is {session.get_status_display().lower()}.")
+        if unposted_variances(session).exists():
+            session.status = "counting"
+            session.save(update_fields=["status"])
+        else:
+            session.status = "posted"
+            session.posted_by = user
+            session.posted_at = timezone.now()
+            session.save(update_fields=["status", "posted_by", "posted_at"])
+    return adjusted
+
+
+def post_chunk(session, item_ids, user=None):
+    """Post the unposted variances of ``item_ids`` in one transaction."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Checked for every chunk, so a cancelled session stops the post
+        session = StocktakeSession.objects.select_for_update().get(pk=session.pk)
+        if session.status not in ("counting", "posting"):
+            raise StocktakeError(f"The stocktake is {session.get_status_display().lower()}.")
+        rows = list(
+            unposted_variances(session)
+            .filter(pk__in=item_ids)
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", "quantity", "expected", "counted")
+        )
+        movements = []
+        shortfalls = {}
+        for pk, quantity, expected, counted in rows:
+            delta = max(counted - expected, -quantity)
+            if delta < 0:
+                shortfalls[pk] = (quantity, -delta)
+            elif delta > 0:
+                movements.append({"item": pk, "quantity": delta})
+        movements.extend(shrinkage_movements(shortfalls))
+        movements.sort(key=lambda movement: movement["item"])
+        for movement in movements:
+            movement.update(
+                type="adjust",
+                notes=f"Stocktake: {session.name}",
+                reference_number=f"STK-{session.pk}",
+            )
+        if movements:
+            apply_movements(movements, user=user)
+
+        # What the books said, kept next to what was counted
+        StocktakeCount.objects.bulk_create(
+            [
+                StocktakeCount(
+                    session=session,
+                    item_id=pk,
+                    counted=counted,
+                    expected=expected,
+                    posted_at=now,
+                )
+                for pk, quantity, expected, counted in rows
+            ],
+            batch_size=CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=["session", "item"],
+            update_fields=["expected", "posted_at"],
+        )
+    return len({movement["item"] for movement in movements})
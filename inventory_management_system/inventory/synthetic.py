@@ -0,0 +1,235 @@
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .facets import invalidate_facets
+from .models import Category, InventoryTransaction, Item
+from .stats import invalidate_dashboard_stats
+
+ADJECTIVES = [
+    "Steel", "Brass", "Copper", "Plastic", "Rubber", "Heavy", "Compact", "Cordless",
+    "Industrial", "Galvanised", "Stainless", "Flexible", "Insulated", "Premium", "Mini",
+]
+NOUNS = [
+    "Bolt", "Washer", "Hinge", "Bracket", "Drill", "Hammer", "Clamp", "Hose", "Cable",
+    "Valve", "Filter", "Glove", "Brush", "Tape", "Sealant", "Pump", "Switch", "Socket",
+]
+SIZES = ["M4", "M6", "M8", "10mm", "25mm", "1in", "2in", "Small", "Large", "XL"]
+SHELVES = "ABCDEFGH"
+
+# (type, weight); outgoing stock dominates, as in a real store
+MOVEMENT_WEIGHTS = [("in", 30), ("out", 55), ("adjust", 10), ("return", 5)]
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` store the given created_at/updated_at values.
+
+    auto_now and auto_now_add overwrite them on insert, which would put the
+    whole synthetic history at the moment the generator ran.
+    """
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def batched(objects, size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Generator:
+    """Deterministic synthetic inventory for load tests and benchmarks.
+
+    Items get unique ``<prefix>-<n>`` SKUs and barcodes. Transactions are
+    spread evenly over ``days`` and chain correctly per item: each one's
+    previous_quantity is the last one's new_quantity, and every item's stored
+    quantity matches its last transaction. Movements are generated twice from
+    the same seed, once to work out final item quantities and once to insert
+    them, so memory grows with the number of items but not of transactions.
+    """
+
+    def __init__(
+        self,
+        categories=10,
+        items=1000,
+        transactions=10000,
+        users=5,
+        days=365,
+        batch_size=5000,
+        seed=0,
+        prefix="GEN",
+        progress=None,
+    ):
+        self.counts = {
+            "categories": categories,
+            "items": items,
+            "transactions": transactions,
+            "users": users,
+        }
+        self.batch_size = batch_size
+        self.seed = seed
+        self.prefix = prefix
+        self.progress = progress or (lambda message: None)
+        self.end = timezone.now()
+        self.start = self.end - timedelta(days=days)
+
+    def run(self):
+        with explicit_timestamps(Category, Item, InventoryTransaction):
+            user_ids = self.create_users()
+            category_ids = self.create_categories()
+            initial = self.initial_quantities()
+            final, last_moved, last_restocked = self.replay(initial)
+            item_ids = self.create_items(category_ids, user_ids, final, last_moved, last_restocked)
+            self.create_transactions(item_ids, user_ids, initial)
+        invalidate_dashboard_stats()
+        invalidate_facets()
+        return self.counts
+
+    def rng(self, stream):
+        # Independent, reproducible random streams per kind of row
+        return random.Random(f"{self.seed}:{stream}")
+
+    def insert(self, model, objects, label, keep_ids=True):
+        ids = []
+        inserted = 0
+        for batch in batched(objects, self.batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            if keep_ids:
+                ids.extend(obj.pk for obj in batch)
+            inserted += len(batch)
+            self.progress(f"{label}: {inserted}")
+        return ids
+
+    def create_users(self):
+        password = make_password(f"{self.prefix.lower()}-password")
+        users = (
+            User(username=f"{self.prefix.lower()}-user-{n}", password=password)
+            for n in range(self.counts["users"])
+        )
+        return self.insert(User, users, "users")
+
+    def create_categories(self):
+        rng = self.rng("categories")
+        categories = (
+            Category(
+                name=f"{self.prefix} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}s {n}",
+                description=f"Synthetic category {n}",
+                created_at=self.start,
+                updated_at=self.start,
+            )
+            for n in range(self.counts["categories"])
+        )
+        return self.insert(Category, categories, "categories")
+
+    def initial_quantities(self):
+        rng = self.rng("initial")
+        return [rng.randint(0, 200) for _ in range(self.counts["items"])]
+
+    def movements(self, initial):
+        """Yield (item index, type, quantity, previous, new, created_at)."""
+        rng = self.rng("movements")
+        kinds, weights = zip(*MOVEMENT_WEIGHTS)
+        quantities = list(initial)
+        count = self.counts["transactions"]
+        step = (self.end - self.start) / max(count, 1)
+        for n in range(count):
+            index = rng.randrange(len(quantities))
+            kind = rng.choices(kinds, weights)[0]
+            amount = rng.randint(1, 50)
+            previous = quantities[index]
+            if kind == "out" and previous == 0:
+                kind = "in"
+            if kind == "out":
+                amount = min(amount, previous)
+                delta = -amount
+            elif kind == "adjust":
+                amount = rng.randint(-min(previous, 10), 10) or 1
+                delta = amount
+            else:
+                delta = amount
+            quantities[index] = previous + delta
+            yield index, kind, amount, previous, previous + delta, self.start + step * n
+
+    def replay(self, initial):
+        final = list(initial)
+        last_moved = {}
+        last_restocked = {}
+        for index, kind, _, _, new, created_at in self.movements(initial):
+            final[index] = new
+            last_moved[index] = created_at
+            if kind == "in":
+                last_restocked[index] = created_at
+        return final, last_moved, last_restocked
+
+    def create_items(self, category_ids, user_ids, final, last_moved, last_restocked):
+        rng = self.rng("items")
+
+        def items():
+            for n, quantity in enumerate(final):
+                cost = Decimal(rng.randint(50, 50000)) / 100
+                min_level = rng.choice([5, 10, 20, 50])
+                created_at = self.start - timedelta(minutes=rng.randint(0, 10000))
+                yield Item(
+                    name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(SIZES)}",
+                    description=f"Synthetic item {n}",
+                    category_id=rng.choice(category_ids),
+                    sku=f"{self.prefix}-{n:08d}",
+                    barcode=f"{self.prefix}{n:012d}",
+                    cost_price=cost,
+                    selling_price=(cost * Decimal("1.4")).quantize(Decimal("0.01")),
+                    quantity=quantity,
+                    min_stock_level=min_level,
+                    max_stock_level=min_level * 10,
+                    status="available" if quantity > 0 else "out_of_stock",
+                    location=f"Aisle {rng.randint(1, 20)}",
+                    shelf=rng.choice(SHELVES),
+                    supplier=f"Supplier {rng.randint(1, 50)}",
+                    created_by_id=rng.choice(user_ids) if user_ids else None,
+                    created_at=created_at,
+                    updated_at=last_moved.get(n, created_at),
+                    last_restocked=last_restocked.get(n),
+                )
+
+        return self.insert(Item, items(), "items")
+
+    def create_transactions(self, item_ids, user_ids, initial):
+        rng = self.rng("transactions")
+        records = (
+            InventoryTransaction(
+                item_id=item_ids[index],
+                transaction_type=kind,
+                quantity=amount,
+                previous_quantity=previous,
+                new_quantity=new,
+                reference_number=f"PO-{rng.randint(1000, 99999)}" if kind == "in" else "",
+                created_by_id=rng.choice(user_ids) if user_ids else None,
+                created_at=created_at,
+            )
+            for index, kind, amount, previous, new, created_at in self.movements(initial)
+        )
+        self.insert(InventoryTransaction, records, "transactions", keep_ids=False)
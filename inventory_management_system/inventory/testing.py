@@ -0,0 +1,21 @@
+from .metrics import get_query_budget
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that a response stayed within its query budget.
+
+    Budgets come from ``INVENTORY_QUERY_BUDGETS`` unless given explicitly, and
+    the count is the one recorded by ``QueryMetricsMiddleware``.
+    """
+
+    def assertWithinQueryBudget(self, response, budget=None):
+        metrics = response.wsgi_request.query_metrics
+        if budget is None:
+            budget = get_query_budget(metrics.view_name)
+        if budget is None:
+            self.fail(f"No query budget configured for {metrics.view_name}")
+        self.assertLessEqual(
+            metrics.query_count,
+            budget,
+            f"{metrics.view_name} ran {metrics.query_count} queries, budget is {budget}",
+        )
@@ -1,3 +1,1477 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import forecast, jobs, live, valuation
+from .lookup import LocalLRU, local_cache, lookup_code
+from .models import (
+    ArchivedTransaction, Bin, Category, InventoryTransaction, Item, Job, ReorderAlert,
+    StocktakeCount, StocktakeSession, Supplier, ValuationRollup, Warehouse,
+)
+from .archive import archive_transactions
+from .barcodes import code128_modules
+from .facets import get_facets
+from .forecast import apply_levels, demand_stats, forecast_levels
+from .history import compact, start_of, stock_at, stock_series
+from .importer import ItemImporter, iter_csv
+from .metrics import registry
+from .pagination import KeysetPaginator
+from .reorder import check_reorder_levels, low_stock_items, reorder_suggestions
+from .search import IContainsSearchBackend, search_items
+from .stats import get_dashboard_stats
+from .stock import StockMovementError, apply_movement, apply_movements, transfer_stock
+from .stocktake import post_variances, variance_summary, variances
+from .valuation import refresh_rollups, valuation_report, valued_items
+from .testing import QueryBudgetMixin
+from .warehouses import warehouse_summary
+
+
+def make_item(category, sku, **kwargs):
+    defaults = {
+        "name": f"Item {sku}",
+        "barcode": f"BC-{sku}",
+        "cost_price": Decimal("2.50"),
+        "selling_price": Decimal("4.00"),
+        "quantity": 20,
+    }
+    defaults.update(kwargs)
+    return Item.objects.create(category=category, sku=sku, **defaults)
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user("clerk", password="secret-pass-123")
+        self.tools = Category.objects.create(name="Tools")
+        self.paint = Category.objects.create(name="Paint")
+
+
+class DashboardStatsTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        make_item(self.tools, "T-1", quantity=0, status="out_of_stock")
+        make_item(self.tools, "T-2", quantity=5)
+        make_item(self.paint, "P-1", quantity=40, cost_price=Decimal("1.25"))
+        Category.objects.create(name="Empty")
+
+    def test_aggregates(self):
+        stats = get_dashboard_stats()
+        self.assertEqual(stats["total_items"], 3)
+        self.assertEqual(stats["total_categories"], 3)
+        self.assertEqual(stats["low_stock_items"], 2)
+        self.assertEqual(stats["out_of_stock_items"], 1)
+        self.assertEqual(stats["total_stock_value"], Decimal("62.50"))
+        self.assertEqual(stats["by_status"]["available"], 2)
+        self.assertEqual(stats["by_status"]["out_of_stock"], 1)
+        self.assertEqual(
+            [(c["name"], c["item_count"]) for c in stats["by_category"]],
+            [("Tools", 2), ("Paint", 1), ("Empty", 0)],
+        )
+
+    def test_cached_and_invalidated_on_write(self):
+        with self.assertNumQueries(1):
+            get_dashboard_stats()
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+        make_item(self.paint, "P-2", quantity=0)
+        self.assertEqual(get_dashboard_stats()["out_of_stock_items"], 2)
+
+    def test_dashboard_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["total_items"], 3)
+        self.assertEqual(response.context["top_categories"][0]["name"], "Tools")
+
+
+class StockMovementTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = make_item(self.tools, "T-1", quantity=10)
+
+    def test_movement_updates_quantity_and_logs(self):
+        record = apply_movement(self.item, "out", 4, user=self.user)
+        self.assertEqual((record.previous_quantity, record.new_quantity), (10, 6))
+        apply_movement(self.item.pk, "adjust", -1)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 5)
+        self.assertEqual(self.item.transactions.count(), 2)
+
+    def test_rejects_negative_stock(self):
+        with self.assertRaises(StockMovementError):
+            apply_movement(self.item, "out", 11)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 10)
+        self.assertFalse(InventoryTransaction.objects.exists())
+
+    def test_out_of_stock_status(self):
+        apply_movement(self.item, "out", 10)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, "out_of_stock")
+        apply_movement(self.item, "in", 3)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.status, "available")
+        self.assertIsNotNone(self.item.last_restocked)
+
+    def test_batch_is_atomic_and_ordered(self):
+        other = make_item(self.paint, "P-1", quantity=0)
+        # savepoint, items, bin stock, update, insert, release
+        with self.assertNumQueries(6):
+            records = apply_movements(
+                [
+                    {"item": other.pk, "type": "in", "quantity": 5},
+                    {"item": self.item.pk, "type": "out", "quantity": 3},
+                    {"item": other.pk, "type": "out", "quantity": 2},
+                ]
+            )
+        self.assertEqual([r.new_quantity for r in records], [5, 7, 3])
+        with self.assertRaises(StockMovementError):
+            apply_movements(
+                [
+                    {"item": other.pk, "type": "out", "quantity": 1},
+                    {"item": self.item.pk, "type": "out", "quantity": 50},
+                ]
+            )
+        other.refresh_from_db()
+        self.assertEqual(other.quantity, 3)
+
+    def test_update_view_logs_quantity_change(self):
+        self.client.force_login(self.user)
+        data = {
+            "name": "Renamed", "category": self.tools.pk, "sku": "T-1",
+            "barcode": "BC-T-1", "cost_price": "2.50", "selling_price": "4.00",
+            "quantity": 7, "quantity_seen": 10, "min_stock_level": 10, "max_stock_level": 100,
+            "status": "available",
+        }
+        response = self.client.post(reverse("item-update", args=[self.item.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.quantity), ("Renamed", 7))
+        record = self.item.transactions.get()
+        self.assertEqual((record.transaction_type, record.quantity), ("adjust", -3))
+
+    def test_concurrent_edits_keep_both_quantity_changes(self):
+        self.client.force_login(self.user)
+        url = reverse("item-update", args=[self.item.pk])
+        seen = self.client.get(url).context["form"]["quantity_seen"].value()
+        data = {
+            "name": "Hammer", "category": self.tools.pk, "sku": "T-1",
+            "barcode": "BC-T-1", "cost_price": "2.50", "selling_price": "4.00",
+            "quantity_seen": seen, "min_stock_level": 10, "max_stock_level": 100,
+            "status": "available",
+        }
+        # Both clerks opened the form at 10: one received 5, the other sold 2
+        self.assertEqual(self.client.post(url, {**data, "quantity": 15}).status_code, 302)
+        self.assertEqual(self.client.post(url, {**data, "quantity": 8}).status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 13)
+        self.assertEqual(
+            list(self.item.transactions.order_by("pk").values_list("quantity", flat=True)),
+            [5, -2],
+        )
+        # An unchanged quantity leaves the stock alone
+        self.client.post(url, {**data, "name": "Claw hammer", "quantity": seen})
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.quantity), ("Claw hammer", 13))
+
+    def test_batch_endpoint(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("stock-batch"),
+            json.dumps({"movements": [{"sku": "T-1", "type": "out", "quantity": 2}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["transactions"][0]["new_quantity"], 8)
+        response = self.client.post(
+            reverse("stock-movement", args=[self.item.pk]),
+            {"transaction_type": "out", "quantity": 100},
+        )
+        self.assertEqual(response.status_code, 409)
+
+
+class KeysetPaginationTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(7):
+            # Duplicate names force the id tiebreaker
+            make_item(self.tools, f"T-{n}", name=f"Widget {n // 2}")
+
+    def test_walks_forward_and_back(self):
+        queryset = Item.objects.all()
+        paginator = KeysetPaginator(queryset, 3, ("name", "id"))
+        expected = list(queryset.order_by("name", "id"))
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        self.assertEqual(list(first) + list(second) + list(third), expected)
+        self.assertFalse(third.has_next)
+        self.assertEqual(list(paginator.page(second.previous_cursor)), list(first))
+        self.assertIsNone(first.previous_cursor)
+
+    def test_item_list_cursor_mode(self):
+        self.client.force_login(self.user)
+        url = reverse("item-list")
+        with self.assertNumQueries(5):  # session, user, page, locations, warehouses
+            response = self.client.get(url, {"paginate": "cursor"})
+        page = response.context["page_obj"]
+        self.assertEqual(len(page), 7)
+        self.assertEqual(self.client.get(url, {"cursor": "bogus"}).status_code, 404)
+
+    def test_transaction_history(self):
+        item = Item.objects.first()
+        for _ in range(3):
+            apply_movement(item, "in", 1)
+        self.client.force_login(self.user)
+        url = reverse("item-transaction-history", args=[item.pk])
+        first = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual([r["new_quantity"] for r in first["results"]], [23, 22])
+        rest = self.client.get(url, {"limit": 2, "cursor": first["next"]}).json()
+        self.assertEqual([r["new_quantity"] for r in rest["results"]], [21])
+        self.assertIsNone(rest["next"])
+
+
+class SearchTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_item(
+            self.tools, "HM-1001", name="Claw hammer", description="Steel head"
+        )
+        self.mallet = make_item(
+            self.tools, "HM-1002", name="Rubber mallet", description="Like a hammer"
+        )
+        make_item(self.paint, "PT-2001", name="Gloss paint")
+
+    def test_full_text_ranks_name_matches_first(self):
+        results = list(search_items(Item.objects.all(), "hamm").order_by("-search_rank"))
+        self.assertEqual(results, [self.hammer, self.mallet])
+
+    def test_index_follows_writes(self):
+        self.mallet.name = "Rubber sledge"
+        self.mallet.description = ""
+        self.mallet.save()
+        self.assertFalse(search_items(Item.objects.all(), "mallet").exists())
+        self.assertTrue(search_items(Item.objects.all(), "sledge").exists())
+        self.mallet.delete()
+        self.assertEqual(list(search_items(Item.objects.all(), "hammer")), [self.hammer])
+
+    def test_code_exact_and_prefix(self):
+        self.assertEqual(list(search_items(Item.objects.all(), "HM-1001")), [self.hammer])
+        self.assertEqual(search_items(Item.objects.all(), "hm-10").count(), 2)
+        self.assertEqual(
+            list(search_items(Item.objects.all(), "BC-PT-2001")),
+            [Item.objects.get(sku="PT-2001")],
+        )
+
+    def test_quotes_are_not_fts_syntax(self):
+        self.assertFalse(search_items(Item.objects.all(), 'claw" OR "x').exists())
+        self.assertEqual(
+            IContainsSearchBackend().search(Item.objects.all(), "gloss").count(), 1
+        )
+
+
+class ItemImportTests(InventoryTestCase):
+    CSV = (
+        "sku,name,category,barcode,cost_price,selling_price,quantity,status\n"
+        "T-1,Hammer v2,Tools,BC-T-1,3.00,5.00,99,available\n"
+        "N-1,Nails,Fasteners,BC-N-1,0.10,0.25,500,\n"
+        "N-2,Screws,Fasteners,BC-N-2,abc,0.25,10,\n"
+        "N-1,Nails again,Fasteners,BC-N-9,0.10,0.25,1,\n"
+        "N-3,Bolts,Fasteners,BC-T-1,0.10,0.25,1,\n"
+        "N-4,Washers,Fasteners,BC-N-4,0.10,0.25,1,broken\n"
+    )
+
+    def test_upserts_and_reports_errors(self):
+        make_item(self.tools, "T-1", name="Hammer", quantity=7)
+        result = ItemImporter(batch_size=2).run(iter_csv(io.BytesIO(self.CSV.encode())))
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(
+            sorted((row, field) for row, field, _ in result.errors),
+            [(4, "cost_price"), (5, "sku"), (6, "barcode"), (7, "status")],
+        )
+        hammer = Item.objects.get(sku="T-1")
+        # Existing stock is not overwritten by a catalog refresh
+        self.assertEqual((hammer.name, hammer.quantity), ("Hammer v2", 7))
+        nails = Item.objects.get(sku="N-1")
+        self.assertEqual((nails.category.name, nails.quantity), ("Fasteners", 500))
+
+    def test_partial_columns_keep_other_fields(self):
+        make_item(
+            self.tools, "T-1", status="discontinued", min_stock_level=25,
+            supplier="Acme", location="A1",
+        )
+        make_item(self.tools, "T-2", barcode="")
+        make_item(self.tools, "T-3")
+        csv_file = (
+            "sku,name,category,cost_price,selling_price,min_stock_level\n"
+            "T-1,Hammer v2,Tools,3.00,5.00,\n"
+            "T-2,Saw v2,Tools,3.00,5.00,40\n"
+            "T-3,Drill v2,Tools,3.00,5.00,\n"
+            "T-4,Chisel,Tools,3.00,5.00,\n"
+        )
+        result = ItemImporter().run(iter_csv(io.BytesIO(csv_file.encode())))
+        self.assertEqual((result.created, result.updated), (0, 3))
+        # Only one item may be without a barcode, and T-2 already is
+        self.assertEqual([(row, field) for row, field, _ in result.errors], [(5, "barcode")])
+        hammer = Item.objects.get(sku="T-1")
+        self.assertEqual(
+            (hammer.name, hammer.barcode, hammer.status, hammer.min_stock_level),
+            ("Hammer v2", "BC-T-1", "discontinued", 25),
+        )
+        self.assertEqual((hammer.supplier, hammer.location), ("Acme", "A1"))
+        self.assertEqual(Item.objects.get(sku="T-2").min_stock_level, 40)
+        self.assertEqual(Item.objects.get(sku="T-3").barcode, "BC-T-3")
+
+    def test_upload_endpoint(self):
+        self.client.force_login(self.user)
+        upload = io.BytesIO(self.CSV.encode())
+        upload.name = "catalog.csv"
+        response = self.client.post(reverse("item-import"), {"file": upload})
+        self.assertEqual(response.json()["created"], 2)
+        self.assertEqual(Item.objects.get(sku="N-1").created_by, self.user)
+
+
+class ExportTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.hammer = make_item(self.tools, "T-1", name="Hammer", location="Aisle 1")
+        make_item(self.paint, "P-1", name="Gloss", location="Aisle 2")
+
+    def test_item_csv_honours_filters(self):
+        response = self.client.get(
+            reverse("item-export", args=["csv"]), {"location": "Aisle 1"}
+        )
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["id", "sku", "barcode"])
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Hammer,Tools", lines[1])
+
+    def test_transaction_json(self):
+        apply_movement(self.hammer, "out", 5, user=self.user)
+        response = self.client.get(reverse("transaction-export", args=["json"]))
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(rows[0]["sku"], "T-1")
+        self.assertEqual(rows[0]["created_by"], "clerk")
+        bad = self.client.get(reverse("transaction-export", args=["json"]), {"from": "x"})
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(self.client.get("/items/export.xml").status_code, 404)
+
+
+class LabelPrintTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.items = [
+            make_item(self.tools, f"T-{n}", location="Aisle 1", shelf="A")
+            for n in range(3)
+        ]
+
+    def test_code128_checksum(self):
+        # Start B, "A" (33), checksum (104 + 33) % 103 = 34, stop
+        modules = code128_modules("A")
+        self.assertEqual(len(modules), 6 * 3 + 7)
+        self.assertEqual(modules[12:18], [1, 3, 1, 1, 2, 3])
+
+    def test_batch_render_uses_one_item_query(self):
+        url = reverse("print-labels")
+        with self.assertNumQueries(3):  # session, user, items with categories
+            response = self.client.get(url, {"location": "Aisle 1", "shelf": "A"})
+        self.assertEqual(response.content.count(b'class="label"'), 3)
+        self.assertIn(b"<svg", response.content)
+        response = self.client.get(url, {"ids": f"{self.items[0].pk},{self.items[1].pk}"})
+        self.assertEqual(response.content.count(b'class="label"'), 2)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_label_cache_follows_edits(self):
+        url = reverse("print-labels")
+        self.client.get(url, {"pk": self.items[0].pk})
+        self.items[0].name = "Renamed"
+        self.items[0].save()
+        response = self.client.get(url, {"pk": self.items[0].pk})
+        self.assertIn(b"Renamed", response.content)
+
+
+class FragmentCacheTests(InventoryTestCase):
+    def test_item_rows_follow_edits(self):
+        self.client.force_login(self.user)
+        items = [make_item(self.tools, f"R-{n}", location="Aisle 1") for n in range(12)]
+        response = self.client.get(reverse("item-list"), {"location": "Aisle 1", "page": 2})
+        self.assertContains(response, 'href="?page=1&amp;location=Aisle+1"')
+        self.assertNotContains(response, "page=2&amp;page")
+        items[0].name = "Anvil"
+        items[0].save()
+        response = self.client.get(reverse("item-list"))
+        self.assertContains(response, "<td>Anvil</td>")
+
+    def test_category_page_cached_until_category_changes(self):
+        url = reverse("category-list")
+        self.assertContains(self.client.get(url), "Paint")
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), "Paint")
+        self.paint.name = "Coatings"
+        self.paint.save()
+        self.assertContains(self.client.get(url), "Coatings")
+        self.client.force_login(self.user)
+        self.client.get(url)
+        with self.assertNumQueries(2):  # session, user
+            response = self.client.get(url)
+        self.assertContains(response, "Coatings")
+        self.assertContains(response, "Welcome, clerk")
+
+
+class QueryBudgetTests(QueryBudgetMixin, InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.client.force_login(self.user)
+        for n in range(15):
+            make_item(self.tools if n % 2 else self.paint, f"S-{n}", location=f"Aisle {n % 3}")
+
+    def test_key_views_within_budget(self):
+        item = Item.objects.first()
+        for name, args in [
+            ("dashboard", []),
+            ("item-list", []),
+            ("print-item", [item.pk]),
+            ("category-list", []),
+        ]:
+            with self.subTest(name):
+                self.assertWithinQueryBudget(self.client.get(reverse(name, args=args)))
+        response = self.client.get(reverse("print-labels"), {"location": "Aisle 1"})
+        self.assertWithinQueryBudget(response)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("item-list"))
+        with self.settings(INVENTORY_QUERY_BUDGETS={"dashboard": 0}):
+            with self.assertLogs("inventory.middleware", "WARNING"):
+                self.client.get(reverse("dashboard"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        with self.settings(INVENTORY_METRICS_TOKEN="scrape-me"):
+            response = self.client.get(
+                reverse("metrics"), headers={"Authorization": "Bearer wrong"}
+            )
+            self.assertEqual(response.status_code, 404)
+            self.client.logout()
+            response = self.client.get(
+                reverse("metrics"), headers={"Authorization": "Bearer scrape-me"}
+            )
+        body = response.content.decode()
+        self.assertIn('inventory_requests_total{view="item-list"} 1', body)
+        self.assertIn('inventory_request_query_budget_exceeded_total{view="dashboard"} 1', body)
+        self.assertIn('inventory_request_duration_seconds_count{view="item-list"} 1', body)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+        metrics = self.client.get(reverse("item-list")).wsgi_request.query_metrics
+        self.assertGreater(metrics.template_time, 0)
+
+
+class FacetTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        make_item(self.tools, "T-1", name="Hammer", location="Aisle 1", shelf="A")
+        make_item(self.tools, "T-2", name="Saw", location="Aisle 1", shelf="B")
+        make_item(self.paint, "P-1", name="Gloss", location="Aisle 2", shelf="A")
+
+    def counts(self, facets, field):
+        return {c["label"]: c["count"] for c in facets[field] if c["count"]}
+
+    def test_counts_apply_other_filters(self):
+        facets = get_facets({"location": "Aisle 1"})
+        # The location facet ignores its own filter...
+        self.assertEqual(self.counts(facets, "location"), {"Aisle 1": 2, "Aisle 2": 1})
+        # ...while the others are narrowed by it
+        self.assertEqual(self.counts(facets, "category"), {"Tools": 2})
+        self.assertEqual(self.counts(facets, "shelf"), {"A": 1, "B": 1})
+        facets = get_facets({"search": "gloss"})
+        self.assertEqual(self.counts(facets, "category"), {"Paint": 1})
+
+    def test_cached_and_invalidated(self):
+        get_facets({})
+        with self.assertNumQueries(0):
+            get_facets({"shelf": "A"})
+        item = Item.objects.get(sku="P-1")
+        item.save(update_fields=["description"])
+        with self.assertNumQueries(0):
+            get_facets({})
+        # Movements that leave the status alone keep the cache warm
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(item, "out", 1)
+            apply_movements([{"item": item.pk, "type": "in", "quantity": 1}])
+        with self.assertNumQueries(0):
+            get_facets({})
+        item.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(item, "out", item.quantity)
+        self.assertEqual(self.counts(get_facets({}), "status")["Out of Stock"], 1)
+
+    def test_warehouse_counts_follow_bin_stock_only(self):
+        warehouse = Warehouse.objects.create(code="MAIN", name="Main")
+        shelf = Bin.objects.create(warehouse=warehouse, code="A-01")
+        item = Item.objects.get(sku="P-1")
+        get_facets({})
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(item, "out", 1)
+        with self.assertNumQueries(0):
+            get_facets({})
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer_stock(item, 5, to_bin=shelf)
+        self.assertEqual(self.counts(get_facets({}), "warehouse"), {"Main": 1})
+
+
+class WarehouseTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.main = Warehouse.objects.create(code="MAIN", name="Main")
+        self.north = Warehouse.objects.create(code="NORTH", name="North")
+        self.bin_a = Bin.objects.create(warehouse=self.main, code="A-01")
+        self.bin_c = Bin.objects.create(warehouse=self.north, code="C-01")
+        self.item = make_item(self.tools, "T-1", quantity=10)
+
+    def bin_quantities(self):
+        return dict(self.item.bin_stock.values_list("bin__code", "quantity"))
+
+    def test_bin_movements_keep_item_total(self):
+        record = transfer_stock(self.item, 6, to_bin=self.bin_a)
+        self.assertEqual((record.previous_quantity, record.new_quantity), (10, 10))
+        # Only the 4 units not put away can leave without naming a bin
+        with self.assertRaises(StockMovementError):
+            apply_movement(self.item, "out", 5)
+        apply_movement(self.item, "out", 4)
+        apply_movement(self.item, "out", 2, bin=self.bin_a)
+        with self.assertRaises(StockMovementError):
+            apply_movements(
+                [
+                    {"item": self.item.pk, "type": "in", "quantity": 5, "bin": self.bin_c.pk},
+                    {"item": self.item.pk, "type": "out", "quantity": 6, "bin": self.bin_c.pk},
+                ]
+            )
+        apply_movements([{"item": self.item.pk, "type": "in", "quantity": 5, "bin": self.bin_c.pk}])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 9)
+        self.assertEqual(self.bin_quantities(), {"A-01": 4, "C-01": 5})
+
+    def test_transfer_view_and_warehouse_queries(self):
+        transfer_stock(self.item, 6, to_bin=self.bin_a)
+        make_item(self.paint, "P-1")
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("stock-transfer", args=[self.item.pk]),
+            {"from_bin": self.bin_a.pk, "to_bin": self.bin_c.pk, "quantity": 2},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["transaction_type"], "transfer")
+        self.assertEqual(self.bin_quantities(), {"A-01": 4, "C-01": 2})
+        response = self.client.post(
+            reverse("stock-transfer", args=[self.item.pk]),
+            {"from_bin": self.bin_a.pk, "to_bin": self.bin_c.pk, "quantity": 5},
+        )
+        self.assertEqual(response.status_code, 409)
+
+        response = self.client.get(reverse("item-list"), {"warehouse": self.north.pk})
+        self.assertEqual([i.sku for i in response.context["items"]], ["T-1"])
+        summary = {row["code"]: row for row in warehouse_summary()}
+        self.assertEqual((summary["MAIN"]["items"], summary["MAIN"]["units"]), (1, 4))
+        self.assertEqual(summary["NORTH"]["value"], Decimal("5.00"))
+        data = self.client.get(reverse("api-item-bins", args=[self.item.pk])).json()
+        self.assertEqual(data["unallocated"], 4)
+
+
+class AdminTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser("boss", password="secret-pass-123")
+        self.client.force_login(self.admin)
+        self.items = [make_item(self.tools, f"A-{n}", quantity=5) for n in range(3)]
+
+    def changelist_queries(self, model):
+        url = reverse(f"admin:inventory_{model}_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_grow_with_rows(self):
+        for item in self.items:
+            apply_movement(item, "in", 1, user=self.admin)
+        counts = [self.changelist_queries("item"), self.changelist_queries("inventorytransaction")]
+        for n in range(10):
+            item = make_item(self.paint, f"B-{n}")
+            apply_movement(item, "out", 1, user=self.admin)
+        self.assertEqual(
+            [self.changelist_queries("item"), self.changelist_queries("inventorytransaction")],
+            counts,
+        )
+        response = self.client.get(
+            reverse("admin:inventory_item_changelist"), {"q": "item a-1", "category_name": "too"}
+        )
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_only_unfiltered_changelists_are_estimated(self):
+        url = reverse("admin:inventory_item_changelist")
+        with patch("inventory.pagination.estimated_count", return_value=50000):
+            response = self.client.get(url)
+            self.assertEqual(response.context["cl"].result_count, 50000)
+            response = self.client.get(url, {"q": "a-1"})
+            self.assertEqual(response.context["cl"].result_count, 1)
+            response = self.client.get(url, {"category_name": "too"})
+            self.assertEqual(response.context["cl"].result_count, 3)
+
+    def test_bulk_adjust_goes_through_the_log(self):
+        url = reverse("admin:inventory_item_changelist")
+        selected = [item.pk for item in self.items[:2]]
+        data = {"action": "adjust_stock", "_selected_action": selected}
+        response = self.client.post(url, data)
+        self.assertContains(response, "Adjust stock")
+        response = self.client.post(url, {**data, "apply": "yes", "quantity": "-6"}, follow=True)
+        self.assertContains(response, "Insufficient stock")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {**data, "apply": "yes", "quantity": "-2"})
+        self.assertRedirects(response, url)
+        self.assertEqual(
+            list(Item.objects.order_by("sku").values_list("quantity", flat=True)), [3, 3, 5]
+        )
+        records = InventoryTransaction.objects.filter(transaction_type="adjust")
+        self.assertEqual(sorted(records.values_list("item_id", flat=True)), selected)
+        self.assertEqual({r.created_by for r in records}, {self.admin})
+
+
+class ReorderTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.low = make_item(self.tools, "T-1", quantity=4, supplier="Acme")
+        make_item(self.tools, "T-2", quantity=50, supplier="Acme")
+        make_item(self.paint, "P-1", quantity=10, max_stock_level=30, supplier="Hue")
+
+    def test_suggestions_grouped_by_supplier(self):
+        groups = reorder_suggestions()
+        self.assertEqual([g["supplier"] for g in groups], ["Acme", "Hue"])
+        self.assertEqual(groups[0]["total_quantity"], 96)
+        self.assertEqual(groups[1]["total_cost"], Decimal("50.00"))
+        self.assertEqual(groups[0]["lines"][0], self.low)
+
+    def test_low_stock_query_uses_partial_index(self):
+        sql, params = low_stock_items().values("id").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("item_low_stock_idx", plan)
+
+    def test_alerts_only_on_crossings(self):
+        with self.assertLogs("inventory.reorder", "WARNING"):
+            opened, _ = check_reorder_levels()
+        self.assertEqual(len(opened), 2)
+        self.assertEqual(check_reorder_levels(), ([], 0))
+        apply_movement(self.low, "in", 20)
+        opened, resolved = check_reorder_levels()
+        self.assertEqual((opened, resolved), ([], 1))
+        apply_movement(self.low, "out", 20)
+        with self.assertLogs("inventory.reorder", "WARNING"):
+            opened, _ = check_reorder_levels()
+        self.assertEqual([a.item_id for a in opened], [self.low.pk])
+        self.assertEqual(ReorderAlert.objects.filter(item=self.low).count(), 2)
+
+
+class ValuationTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_item(self.tools, "T-1", quantity=4, supplier="Acme", location="A1")
+        make_item(self.tools, "T-2", quantity=2, supplier="Acme", cost_price=Decimal("10.00"))
+        make_item(self.paint, "P-1", quantity=3, cost_price=Decimal("0"), location="A1")
+
+    def report(self, dimension):
+        refresh_rollups()
+        rows, totals = valuation_report(dimension)
+        return {row.label: (row.item_count, row.units, row.stock_value) for row in rows}, totals
+
+    def test_rollups_match_per_item_values(self):
+        rows, totals = self.report("category")
+        self.assertEqual(
+            rows, {"Tools": (2, 6, Decimal("30.00")), "Paint": (1, 3, Decimal("0.00"))}
+        )
+        self.assertEqual(totals["stock_value"], sum(i.total_value() for i in Item.objects.all()))
+        self.assertEqual(self.report("supplier")[0]["No supplier"], (1, 3, Decimal("0.00")))
+        for item in valued_items():
+            stored = Item.objects.get(pk=item.pk)
+            self.assertEqual(item.stock_value, stored.total_value())
+            self.assertEqual(item.profit_margin, round(stored.profit_margin(), 2))
+
+    def test_rollups_follow_item_changes(self):
+        self.report("category")
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.hammer, "in", 6)
+        self.assertEqual(ValuationRollup.objects.filter(stale=True).count(), 3)
+        self.assertEqual(self.report("category")[0]["Tools"], (2, 12, Decimal("45.00")))
+
+        self.hammer.refresh_from_db()
+        self.hammer.category = self.paint
+        self.hammer.location = "B2"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hammer.save()
+        self.assertEqual(
+            self.report("category")[0],
+            {"Tools": (1, 2, Decimal("20.00")), "Paint": (2, 13, Decimal("25.00"))},
+        )
+        self.assertEqual(self.report("location")[0]["A1"], (1, 3, Decimal("0.00")))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.filter(sku="T-2").delete()
+        self.assertNotIn("Tools", self.report("category")[0])
+
+    def test_groups_already_stale_are_not_written_again(self):
+        refresh_rollups()
+        groups = valuation.item_keys(self.hammer)
+        valuation.mark_stale(groups)
+        self.assertEqual(ValuationRollup.objects.filter(stale=True).count(), 3)
+        with CaptureQueriesContext(connection) as queries:
+            valuation.mark_stale(groups)
+        self.assertEqual([q["sql"].split()[0] for q in queries], ["SELECT"])
+        valuation.mark_stale({"location": {"Z9"}})
+        self.assertTrue(ValuationRollup.objects.get(dimension="location", key="Z9").stale)
+
+    def test_changes_during_a_refresh_flag_their_groups_again(self):
+        refresh_rollups()
+        apply_movement(self.hammer, "in", 6)
+        valuation.mark_stale(valuation.item_keys(self.hammer))
+        group_totals = valuation.group_totals
+
+        def concurrent_change(dimension, keys):
+            # Committed after the refresh cleared the flags, before it reads
+            if dimension == "category":
+                valuation.mark_stale({"category": {str(self.tools.pk)}})
+            return group_totals(dimension, keys)
+
+        with patch("inventory.valuation.group_totals", side_effect=concurrent_change):
+            self.assertEqual(refresh_rollups(), 3)
+        self.assertEqual(
+            list(ValuationRollup.objects.filter(stale=True).values_list("dimension", "key")),
+            [("category", str(self.tools.pk))],
+        )
+        self.assertEqual(self.report("category")[0]["Tools"], (2, 12, Decimal("45.00")))
+
+    def test_stale_rows_are_served_and_refreshed_in_background(self):
+        self.report("category")
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.hammer, "in", 6)
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.get(reverse("valuation-report"), {"by": "category"})
+            self.assertContains(response, "being recomputed in the background")
+        self.assertTrue(response.context["totals"]["stale"])
+        tools = next(row for row in response.context["rows"] if row.label == "Tools")
+        self.assertEqual((tools.units, tools.stale), (6, True))
+        self.assertEqual(Job.objects.filter(kind="refresh_valuation").count(), 1)
+
+        jobs.work(once=True)
+        response = self.client.get(reverse("valuation-report"), {"by": "category"})
+        self.assertNotContains(response, "being recomputed in the background")
+        self.assertContains(response, "Tools")
+
+    def test_report_views(self):
+        refresh_rollups()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("valuation-report"), {"by": "supplier"})
+        self.assertContains(response, "Acme")
+        response = self.client.get(reverse("valuation-export", args=["csv"]), {"by": "category"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("dimension,key,label,item_count"))
+        self.assertIn("Tools", lines[1])
+        response = self.client.get(reverse("valuation-export", args=["csv"]), {"by": "item"})
+        self.assertEqual(len(b"".join(response.streaming_content).decode().splitlines()), 4)
+        response = self.client.get(reverse("valuation-export", args=["csv"]), {"by": "shelf"})
+        self.assertEqual(response.status_code, 400)
+
+
+class JobTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        files = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, files)
+        settings = override_settings(INVENTORY_JOB_FILES_DIR=files)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.calls = []
+
+        @jobs.task("test_flaky", max_attempts=2)
+        def flaky(context, fail=0):
+            self.calls.append(context.job.attempts)
+            if context.job.attempts <= fail:
+                raise RuntimeError("temporary")
+            return {"attempts": context.job.attempts}
+
+        @jobs.task("test_cancelled")
+        def cancelled(context):
+            jobs.cancel_job(Job.objects.get(pk=context.job.pk))
+            context.progress(1, 10, force=True)
+            self.calls.append("not stopped")
+
+        for name in ("test_flaky", "test_cancelled"):
+            self.addCleanup(jobs.TASKS.pop, name)
+
+    def test_failed_jobs_retry_with_backoff(self):
+        job = jobs.enqueue("test_flaky", {"fail": 1}, self.user)
+        with self.assertLogs("inventory.jobs", "ERROR"):
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertIn("temporary", job.error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ("succeeded", {"attempts": 2}))
+
+        job = jobs.enqueue("test_flaky", {"fail": 5})
+        with self.assertLogs("inventory.jobs", "ERROR"):
+            jobs.work(once=True)
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_cancel_and_abandoned_jobs(self):
+        job = jobs.enqueue("test_cancelled")
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "cancelled")
+        self.assertEqual(self.calls, [])
+
+        job = jobs.enqueue("test_flaky")
+        self.assertEqual(jobs.claim("gone:1"), [job.pk])
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.claim("other:2"), [])
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 2))
+
+    def test_background_import_and_status_api(self):
+        self.client.force_login(self.user)
+        upload = io.BytesIO(ItemImportTests.CSV.encode())
+        upload.name = "catalog.csv"
+        response = self.client.post(reverse("item-import"), {"file": upload, "background": "1"})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "queued")
+        self.assertFalse(Item.objects.filter(sku="N-1").exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.work(once=True)
+        status = self.client.get(response.json()["url"]).json()
+        self.assertEqual((status["status"], status["result"]["rejected"]), ("succeeded", 4))
+        self.assertEqual(Item.objects.get(sku="N-1").created_by, self.user)
+        report = self.client.get(status["output"])
+        self.assertIn(b"row,field,message", b"".join(report.streaming_content))
+
+        other = User.objects.create_user("other", password="pw")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(status["url"]).status_code, 404)
+        self.assertEqual(self.client.get(reverse("api-job-list")).json()["results"], [])
+
+    @override_settings(INVENTORY_INLINE_LABELS=1)
+    def test_large_label_runs_are_queued(self):
+        self.client.force_login(self.user)
+        make_item(self.tools, "T-1", location="Aisle 1")
+        make_item(self.tools, "T-2", location="Aisle 1")
+        # Over the inline budget by the job insert
+        with self.assertLogs("inventory.middleware", "WARNING"):
+            response = self.client.get(reverse("print-labels"), {"location": "Aisle 1"})
+        job = Job.objects.get()
+        self.assertRedirects(response, job.get_absolute_url())
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.percent), ("succeeded", {"labels": 2}, 100))
+        self.assertContains(self.client.get(job.get_absolute_url()), "Download result")
+        labels = self.client.get(reverse("job-output", args=[job.pk]))
+        self.assertIn(b"T-2", b"".join(labels.streaming_content))
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    # Not TestCase: the heartbeat thread must see the job outside a transaction
+    def setUp(self):
+        @jobs.task("test_quiet")
+        def quiet(context):
+            # Long enough to look abandoned without a heartbeat; another
+            # worker checking now must leave the job alone
+            time.sleep(0.3)
+            jobs.requeue_abandoned()
+            return {"done": True}
+
+        self.addCleanup(jobs.TASKS.pop, "test_quiet")
+
+    @override_settings(INVENTORY_JOB_STALE_AFTER=0.2)
+    def test_single_worker_sends_heartbeats(self):
+        job = jobs.enqueue("test_quiet")
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("succeeded", 1))
+
+
+class StocktakeTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.hammer = make_item(self.tools, "T-1", quantity=5, location="A1")
+        self.saw = make_item(self.tools, "T-2", quantity=3, location="A1")
+        self.drill = make_item(self.tools, "T-3", quantity=2, location="A1")
+        self.paint = make_item(self.paint, "P-1", quantity=8, location="B1")
+        self.session = StocktakeSession.objects.create(name="Aisle A1", location="A1")
+
+    def scan(self, batch, scans):
+        return self.client.post(
+            reverse("stocktake-scans", args=[self.session.pk]),
+            json.dumps({"batch": batch, "scans": scans}),
+            content_type="application/json",
+        )
+
+    def test_batches_are_aggregated_and_deduplicated(self):
+        scans = ["BC-T-1"] * 4 + ["T-2", "T-2", {"code": "BC-T-1", "quantity": 3}, "NOPE"]
+        with CaptureQueriesContext(connection) as small:
+            response = self.scan("dev1-1", scans)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["unknown"], {"NOPE": 1})
+        self.assertEqual(self.scan("dev1-1", scans).status_code, 200)
+        with CaptureQueriesContext(connection) as large:
+            self.scan("dev2-1", ["BC-P-1"] * 5000 + ["T-2"] * 5000)
+        self.assertLessEqual(len(large), len(small))
+
+        counts = dict(
+            StocktakeCount.objects.filter(session=self.session).values_list("item__sku", "counted")
+        )
+        self.assertEqual(counts, {"T-1": 7, "T-2": 5002, "P-1": 5000})
+        self.assertEqual(self.scan("dev1-2", [{"code": "T-1", "quantity": 0}]).status_code, 400)
+
+    def test_variances_and_posting(self):
+        self.scan("b1", ["T-1"] * 5 + ["T-2"] * 4 + ["P-1"])
+        rows = {item.sku: (item.counted, item.variance) for item in variances(self.session)}
+        # Unscanned items in scope count as zero; P-1 was found here
+        self.assertEqual(rows, {"T-2": (4, 1), "T-3": (0, -2), "P-1": (1, -7)})
+        summary = variance_summary(self.session)
+        self.assertEqual((summary["variance_items"], summary["net_units"]), (3, -8))
+        self.assertEqual(summary["shrinkage"], Decimal("-22.50"))
+
+        response = self.client.post(
+            reverse("stocktake-post", args=[self.session.pk]),
+            {"item": [self.saw.pk, self.drill.pk]},
+        )
+        self.assertRedirects(response, self.session.get_absolute_url())
+        quantities = dict(Item.objects.values_list("sku", "quantity"))
+        self.assertEqual(quantities, {"T-1": 5, "T-2": 4, "T-3": 0, "P-1": 8})
+        adjustment = InventoryTransaction.objects.get(item=self.drill)
+        self.assertEqual(
+            (adjustment.transaction_type, adjustment.quantity, adjustment.reference_number),
+            ("adjust", -2, f"STK-{self.session.pk}"),
+        )
+        self.assertEqual(
+            StocktakeCount.objects.get(session=self.session, item=self.drill).expected, 2
+        )
+        # P-1 is still to post, so the session stays open
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "counting")
+        self.assertContains(
+            self.client.get(self.session.get_absolute_url()), 'name="item"', count=1
+        )
+
+        response = self.client.post(reverse("stocktake-post", args=[self.session.pk]))
+        self.assertRedirects(response, self.session.get_absolute_url())
+        quantities = dict(Item.objects.values_list("sku", "quantity"))
+        self.assertEqual(quantities, {"T-1": 5, "T-2": 4, "T-3": 0, "P-1": 1})
+        # Already posted items are not adjusted twice
+        self.assertEqual(InventoryTransaction.objects.filter(item=self.drill).count(), 1)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "posted")
+        self.assertEqual(self.scan("late", ["T-1"]).status_code, 409)
+
+    def test_posting_commits_chunks_and_reports_progress_between_them(self):
+        self.scan("b1", ["T-2"] * 4 + ["P-1"])
+        reports = []
+        depth = len(connection.atomic_blocks)
+
+        def progress(done, total):
+            # Outside the posting transactions, so the job row is not held locked
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            reports.append((done, total))
+            if (done, total) == (1, 4):
+                raise RuntimeError("worker lost")
+
+        with patch("inventory.stocktake.CHUNK_SIZE", 1), self.assertRaises(RuntimeError):
+            post_variances(self.session, progress=progress)
+        # The first chunk stays posted; posting again carries on from there
+        self.assertEqual(
+            list(Item.objects.filter(sku__in=["T-1", "T-2"]).values_list("quantity", flat=True)),
+            [0, 3],
+        )
+        with patch("inventory.stocktake.CHUNK_SIZE", 1):
+            self.assertEqual(post_variances(self.session, progress=progress), 3)
+        self.assertEqual(reports, [(1, 4), (1, 3), (2, 3), (3, 3)])
+        self.assertEqual(
+            dict(Item.objects.values_list("sku", "quantity")),
+            {"T-1": 0, "T-2": 4, "T-3": 0, "P-1": 1},
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "posted")
+
+    def test_movements_after_the_count_are_kept(self):
+        self.scan("b1", ["T-1"] * 10 + ["T-2"] * 3)
+        apply_movement(self.hammer, "out", 3)
+        apply_movement(self.saw, "in", 2)
+        # A later batch adds to the count but keeps the first book quantity
+        self.scan("b2", ["T-2"])
+        rows = {item.sku: (item.expected, item.variance) for item in variances(self.session)}
+        self.assertEqual(rows, {"T-1": (5, 5), "T-2": (3, 1), "T-3": (2, -2)})
+        self.client.post(reverse("stocktake-post", args=[self.session.pk]))
+        quantities = dict(Item.objects.values_list("sku", "quantity"))
+        self.assertEqual(quantities, {"T-1": 7, "T-2": 6, "T-3": 0, "P-1": 8})
+
+    def test_shrinkage_of_binned_stock(self):
+        warehouse = Warehouse.objects.create(code="MAIN", name="Main")
+        small = Bin.objects.create(warehouse=warehouse, code="A-01")
+        large = Bin.objects.create(warehouse=warehouse, code="A-02")
+        item = make_item(self.tools, "T-9", quantity=10, location="A1")
+        transfer_stock(item, 2, to_bin=small)
+        transfer_stock(item, 6, to_bin=large)
+        self.scan("b1", ["T-9"] * 3 + ["T-1"] * 5 + ["T-2"] * 3 + ["T-3"] * 2)
+        response = self.client.post(reverse("stocktake-post", args=[self.session.pk]))
+        self.assertRedirects(response, self.session.get_absolute_url())
+        # The 7 missing come from the 2 loose units, then the fullest bin
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 3)
+        self.assertEqual(
+            dict(item.bin_stock.values_list("bin__code", "quantity")),
+            {"A-01": 2, "A-02": 1},
+        )
+        self.assertEqual(
+            list(
+                item.transactions.filter(transaction_type="adjust")
+                .order_by("id")
+                .values_list("bin__code", "quantity")
+            ),
+            [(None, -2), ("A-02", -5)],
+        )
+
+    @override_settings(INVENTORY_INLINE_STOCKTAKE_POSTS=1)
+    def test_large_stocktakes_post_in_background(self):
+        self.scan("b1", ["T-1"] * 6)
+        response = self.client.post(reverse("stocktake-post", args=[self.session.pk]))
+        job = Job.objects.get(kind="post_stocktake")
+        self.assertRedirects(response, job.get_absolute_url())
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "posting")
+        self.assertEqual(self.scan("b2", ["T-1"]).status_code, 409)
+
+        jobs.work(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ("succeeded", {"adjusted": 3}))
+        self.assertEqual(Item.objects.get(sku="T-1").quantity, 6)
+        # A posted session still shows what it adjusted
+        self.assertEqual(variance_summary(self.session)["variance_items"], 3)
+
+    @override_settings(INVENTORY_INLINE_STOCKTAKE_POSTS=1)
+    def test_failed_posting_reopens_the_session(self):
+        self.client.post(reverse("stocktake-post", args=[self.session.pk]))
+        # Out of attempts on a broken job
+        job = Job.objects.get(kind="post_stocktake")
+        Job.objects.filter(pk=job.pk).update(
+            params={"session": self.session.pk, "item_ids": ["x"]}, max_attempts=1
+        )
+        with self.assertLogs("inventory.jobs", "ERROR"):
+            jobs.work(once=True)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "counting")
+        self.assertContains(self.client.get(self.session.get_absolute_url()), "is failed")
+        self.assertEqual(self.scan("b1", ["T-1"]).status_code, 201)
+
+        # A session stuck in posting can still be cancelled
+        StocktakeSession.objects.filter(pk=self.session.pk).update(status="posting")
+        self.client.post(reverse("stocktake-cancel", args=[self.session.pk]))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, "cancelled")
+
+
+class ForecastTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        Supplier.objects.create(name="Acme", lead_time_days=4)
+        self.busy = make_item(self.tools, "F-1", quantity=100, supplier="Acme")
+        self.idle = make_item(self.tools, "F-2", quantity=100)
+        self.dropped = make_item(self.tools, "F-3", quantity=100, status="discontinued")
+        self.painted = make_item(self.paint, "F-4", quantity=100)
+        self.now = timezone.now()
+        for day in (1, 3, 5, 7, 9):
+            for item in (self.busy, self.dropped, self.painted):
+                record = apply_movement(item, "out", 4 if item != self.painted else day)
+                InventoryTransaction.objects.filter(pk=record.pk).update(
+                    created_at=self.now - timedelta(days=day)
+                )
+
+    def test_levels_follow_demand(self):
+        # 4 units every other day: mean 2/day, deviation 2
+        levels = forecast_levels(days=10, now=self.now)
+        self.assertEqual(levels[self.busy.pk], (15, 75))
+        self.assertNotIn(self.dropped.pk, levels)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("forecast_demand", days=10, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(
+            dict(Item.objects.values_list("sku", "min_stock_level")),
+            {"F-1": 15, "F-2": 10, "F-3": 10, "F-4": levels[self.painted.pk][0]},
+        )
+        self.assertEqual(apply_levels(levels), 0)
+
+    def test_pure_python_fallback(self):
+        expected = {self.busy.pk: (15, 75), self.painted.pk: (32, 107)}
+        with patch("inventory.forecast.np", None):
+            self.assertEqual(forecast_levels(days=10, now=self.now), expected)
+            item_ids, means, deviations = demand_stats(
+                [(2, 4), (1, 2), (2, 0), (1, 4)], days=2
+            )
+        self.assertEqual((item_ids, means, deviations), ([1, 2], [3.0, 2.0], [1.0, 2.0]))
+
+    @skipUnless(forecast.np, "NumPy is not installed")
+    def test_numpy_matches_pure_python(self):
+        rows = [(3, 4), (1, 2), (3, 1), (1, 5), (2, 7)]
+        vectorized = [list(values) for values in demand_stats(iter(rows), days=7)]
+        with patch("inventory.forecast.np", None):
+            pure = demand_stats(iter(rows), days=7)
+            expected = forecast_levels(days=10, now=self.now)
+        self.assertEqual(vectorized[0], pure[0])
+        for got, want in zip(vectorized[1:], pure[1:]):
+            self.assertEqual([round(value, 9) for value in got], [round(v, 9) for v in want])
+        self.assertEqual(forecast_levels(days=10, now=self.now), expected)
+        self.assertEqual([len(values) for values in demand_stats(iter(()), days=7)], [0, 0, 0])
+
+    def test_workers_partition_by_category(self):
+        single = forecast_levels(days=10, now=self.now)
+        self.assertEqual(forecast_levels(days=10, now=self.now, workers=2), single)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "forecast_demand", days=10, workers=2, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        self.assertEqual(
+            Item.objects.get(pk=self.painted.pk).min_stock_level, single[self.painted.pk][0]
+        )
+
+
+class APITests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        self.hammer = make_item(self.tools, "T-1", name="Hammer", status="available")
+        self.saw = make_item(self.tools, "T-2", name="Saw")
+        make_item(self.paint, "P-1", name="Gloss")
+
+    def test_field_selection_and_bulk_codes(self):
+        response = self.client.get(
+            reverse("api-item-list"),
+            {"skus": "T-1,P-1", "fields": "sku,quantity,category_name"},
+        )
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"sku": "P-1", "quantity": 20, "category_name": "Paint"},
+                {"sku": "T-1", "quantity": 20, "category_name": "Tools"},
+            ],
+        )
+        bad = self.client.get(reverse("api-item-list"), {"fields": "secret"})
+        self.assertEqual(bad.status_code, 400)
+
+    def test_dashboard_stats_match_the_async_endpoint(self):
+        response = self.client.get(reverse("api-dashboard"))
+        self.assertEqual(response.json()["total_items"], 3)
+        self.assertEqual(response.json(), self.client.get(reverse("async-dashboard")).json())
+
+    def test_item_etag_revalidation(self):
+        url = reverse("api-item-detail", args=[self.hammer.pk])
+        etag = self.client.get(url)["ETag"]
+        with self.assertNumQueries(3):  # session, user, updated_at only
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        apply_movement(self.hammer, "out", 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["quantity"], 19)
+
+    def test_list_etag_changes_with_items(self):
+        url = reverse("api-item-list")
+        etag = self.client.get(url, {"search": "saw"})["ETag"]
+        self.assertEqual(
+            self.client.get(url, {"search": "saw"}, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.saw.delete()
+        self.assertEqual(
+            self.client.get(url, {"search": "saw"}, HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_list_etag_covers_the_page_only(self):
+        url = reverse("api-item-list")
+        params = {"limit": 1, "fields": "sku,category_name"}
+        etag = self.client.get(url, params)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"].upper()])
+        # Items past the page do not matter; a renamed category on it does
+        self.saw.delete()
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.paint.name = "Enamel"
+        self.paint.save()
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()["results"], [{"sku": "P-1", "category_name": "Enamel"}])
+
+        detail = reverse("api-item-detail", args=[self.hammer.pk])
+        etag = self.client.get(detail)["ETag"]
+        self.tools.name = "Hand tools"
+        self.tools.save()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_requires_login_and_get(self):
+        self.assertEqual(self.client.post(reverse("api-category-list")).status_code, 405)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api-category-list")).status_code, 401)
+
+
+class CodeLookupTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item = make_item(self.tools, "T-1", barcode="0123456789")
+        local_cache.clear()
+        cache.clear()
+
+    def test_tiers_and_negative_caching(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup_code("0123456789")["sku"], "T-1")
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup_code("T-1")["id"], self.item.pk)
+            lookup_code("0123456789")
+        local_cache.clear()
+        with self.assertNumQueries(0):
+            lookup_code("0123456789")
+        with self.assertNumQueries(1):
+            self.assertIsNone(lookup_code("NOPE"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(lookup_code("NOPE"))
+
+    def test_write_through(self):
+        lookup_code("T-1")
+        self.assertIsNone(lookup_code("T-9"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.sku = "T-9"
+            self.item.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(lookup_code("T-9")["id"], self.item.pk)
+        self.assertIsNone(lookup_code("T-1"))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.item, "out", 5)
+        self.assertEqual(lookup_code("0123456789")["quantity"], 15)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertIsNone(lookup_code("T-9"))
+
+    def test_lru_is_bounded(self):
+        lru = LocalLRU(maxsize=2)
+        for key in "abc":
+            lru.set(key, key)
+        self.assertEqual((lru.get("a"), lru.get("c"), len(lru)), (None, "c", 2))
+
+    def test_endpoint(self):
+        self.client.force_login(self.user)
+        url = reverse("api-code-lookup")
+        self.assertEqual(self.client.get(url, {"code": "T-1"}).json()["id"], self.item.pk)
+        self.assertEqual(self.client.get(url, {"code": "missing"}).status_code, 404)
+
+
+class AsyncAPITests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_item(self.tools, "T-1", name="Hammer")
+        make_item(self.paint, "P-1", name="Gloss")
+        self.async_client.force_login(self.user)
+
+    async def test_async_reads(self):
+        response = await self.async_client.get(
+            reverse("async-item-list"), {"search": "hammer", "fields": "sku,category_name"}
+        )
+        self.assertEqual(response.json()["results"], [{"sku": "T-1", "category_name": "Tools"}])
+        response = await self.async_client.get(reverse("async-item-detail", args=[self.hammer.pk]))
+        self.assertEqual(response.json()["sku"], "T-1")
+        response = await self.async_client.get(reverse("async-dashboard"))
+        self.assertEqual(response.json()["total_items"], 2)
+        response = await self.async_client.get(reverse("async-code-lookup"), {"code": "BC-P-1"})
+        self.assertEqual(response.json()["sku"], "P-1")
+        response = await self.async_client.get(reverse("async-category-list"))
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    async def test_async_metrics_count_queries(self):
+        response = await self.async_client.get(reverse("async-item-list"))
+        self.assertGreater(response.asgi_request.query_metrics.query_count, 0)
+
+
+class LiveUpdateTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hammer = make_item(self.tools, "T-1", name="Hammer", quantity=5)
+        self.async_client.force_login(self.user)
+
+    def move(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_movement(self.hammer, "out", quantity)
+
+    @override_settings(INVENTORY_LIVE_POLL_INTERVAL=0.01)
+    async def test_stream_pushes_item_deltas(self):
+        response = await self.async_client.get(reverse("live-events"), {"stats": "1"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b"retry:"))
+
+        await sync_to_async(self.move)(5)
+        event = (await anext(stream)).decode()
+        self.assertIn("event: items\n", event)
+        item = json.loads(event.split("data: ")[1])["items"][0]
+        self.assertEqual(
+            (item["id"], item["quantity"], item["status"]), (self.hammer.pk, 0, "out_of_stock")
+        )
+        stats = (await anext(stream)).decode()
+        self.assertIn("event: stats\n", stats)
+        self.assertEqual(json.loads(stats.split("data: ")[1])["out_of_stock_items"], 1)
+
+        # A reconnecting browser replays what it missed from the log
+        last_id = int(event.split("\n")[0].removeprefix("id: "))
+        response = await self.async_client.get(
+            reverse("live-events"), headers={"last-event-id": str(last_id - 1)}
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertIn(f"id: {last_id}\n", (await anext(stream)).decode())
+
+    def test_wsgi_clients_are_told_not_to_reconnect(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("live-events")).status_code, 204)
+
+    async def test_entries_numbered_but_not_written_are_awaited(self):
+        broker = live.Broker()
+        subscriber = await broker.subscribe()
+        broker.task.cancel()
+        # A publisher between numbering an entry and writing it
+        sequence = 1
+        await cache.aset(live.SEQUENCE_KEY, sequence, None)
+        await broker.deliver()
+        self.assertTrue(subscriber.queue.empty())
+        await cache.aset(f"{live.LOG_PREFIX}{sequence}", {"type": "deleted", "ids": [1]})
+        await broker.deliver()
+        self.assertEqual(subscriber.queue.get_nowait(), (sequence, {"type": "deleted", "ids": [1]}))
+
+        # One that never shows up ends in a reload
+        sequence = await cache.aincr(live.SEQUENCE_KEY)
+        await broker.deliver()
+        broker.missing_since -= live.MISSING_TIMEOUT + 1
+        await broker.deliver()
+        self.assertEqual(subscriber.queue.get_nowait(), (sequence, live.RELOAD))
+
+    def test_bulk_changes_publish_a_reload(self):
+        ids = [self.hammer.pk] * (live.MAX_ITEMS_PER_EVENT + 1)
+        sequence = live.publish_items(ids)
+        self.assertEqual(cache.get(f"{live.LOG_PREFIX}{sequence}"), live.RELOAD)
+
+
+def at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+
+class StockHistoryTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.days = [date(2026, 1, 30) + timedelta(days=n) for n in range(4)]
+        self.item = make_item(self.tools, "T-1", quantity=10, cost_price=Decimal("2.00"))
+        Item.objects.filter(pk=self.item.pk).update(created_at=at(self.days[0]))
+        for day, movement, quantity in [(1, "out", 3), (3, "in", 5)]:
+            record = apply_movement(self.item, movement, quantity)
+            InventoryTransaction.objects.filter(pk=record.pk).update(created_at=at(self.days[day]))
+
+    def test_snapshots_match_log(self):
+        expected = [10, 7, 7, 12]
+        # Before compaction everything is answered from the log
+        self.assertEqual([stock_at(d)[self.item.pk][0] for d in self.days], expected)
+        self.assertEqual(compact(until=self.days[3]), 4)
+        self.assertEqual([stock_at(d)[self.item.pk][0] for d in self.days], expected)
+        self.assertEqual(compact(until=self.days[3]), 0)
+        self.assertNotIn(self.item.pk, stock_at(self.days[0] - timedelta(days=1)))
+        # Feb 1 is a checkpoint, so later reads start there
+        self.assertTrue(self.item.snapshots.filter(date=self.days[2]).exists())
+        self.assertEqual(stock_at(self.days[3] + timedelta(days=5))[self.item.pk][0], 12)
+
+    def test_series_and_report(self):
+        compact(until=self.days[2])
+        series = stock_series(self.days[0], self.days[3])
+        self.assertEqual([p["quantity"] for p in series], [10, 7, 7, 12])
+        self.assertEqual(series[-1]["value"], Decimal("24.00"))
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("api-stock-over-time"),
+            {"start": "2026-01-30", "end": "2026-02-02", "category": self.tools.pk},
+        )
+        self.assertEqual([p["quantity"] for p in response.json()["results"]], [10, 7, 7, 12])
+
+    def test_archive_reads_through(self):
+        self.assertEqual(archive_transactions(start_of(self.days[2])), 1)
+        self.assertEqual(self.item.transactions.count(), 1)
+        self.assertEqual(ArchivedTransaction.objects.count(), 1)
+        # Snapshots were rolled up to the cutoff, so history is unchanged
+        self.assertEqual([stock_at(d)[self.item.pk][0] for d in self.days], [10, 7, 7, 12])
+
+        self.client.force_login(self.user)
+        url = reverse("item-transaction-history", args=[self.item.pk])
+        first = self.client.get(url, {"limit": 1}).json()
+        second = self.client.get(url, {"limit": 1, "cursor": first["next"]}).json()
+        self.assertEqual([r["transaction_type"] for r in first["results"]], ["in"])
+        self.assertEqual([r["transaction_type"] for r in second["results"]], ["out"])
+        self.assertIsNone(second["next"])
+        back = self.client.get(url, {"limit": 1, "cursor": second["previous"]}).json()
+        self.assertEqual(back["results"], first["results"])
+
+        response = self.client.get(reverse("transaction-export", args=["json"]))
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([r["transaction_type"] for r in rows], ["out", "in"])
+        response = self.client.get(
+            reverse("transaction-export", args=["json"]), {"from": "2026-02-01"}
+        )
+        rows = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([r["transaction_type"] for r in rows], ["in"])
+
+
+class SyntheticDataTests(InventoryTestCase):
+    def test_generated_history_is_consistent(self):
+        call_command(
+            "generate_data", items=30, transactions=400, categories=3, users=2, stdout=io.StringIO()
+        )
+        items = Item.objects.filter(sku__startswith="GEN-")
+        self.assertEqual(items.count(), 30)
+        for item in items:
+            records = list(item.transactions.order_by("created_at", "id"))
+            for before, after in zip(records, records[1:]):
+                self.assertEqual(before.new_quantity, after.previous_quantity)
+            if records:
+                self.assertEqual(records[-1].new_quantity, item.quantity)
+        self.assertFalse(InventoryTransaction.objects.filter(new_quantity__lt=0).exists())
+
+        self.user.is_superuser = self.user.is_staff = True
+        self.user.save()
+        out = io.StringIO()
+        call_command("benchmark", username="clerk", iterations=2, warmup=0, stdout=out)
+        self.assertIn("admin changelist", out.getvalue())
@@ -5,13 +5,39 @@ from .views import (
     DashboardView,
     ItemListView,
     CategoryListView,
+    ReorderListView,
+    ValuationReportView,
+    ValuationExportView,
+    ValuationRefreshView,
+    StocktakeListView,
+    StocktakeCreateView,
+    StocktakeDetailView,
+    StocktakeScanView,
+    StocktakeVarianceExportView,
+    StocktakePostView,
+    StocktakeCancelView,
+    JobListView,
+    JobDetailView,
+    JobCancelView,
+    job_output,
     ItemCreateView,
     ItemDetailView,
     ItemUpdateView,
     ItemDeleteView,
     print_item_detail,
+    print_item_labels,
+    metrics_view,
+    live_events,
+    StockMovementView,
+    StockTransferView,
+    StockBatchView,
+    TransactionHistoryView,
+    ItemImportView,
+    ItemExportView,
+    TransactionExportView,
 )
 from django.contrib.auth import views as auth_views
+from . import api, async_api
 
 urlpatterns = [
     path("", Index.as_view(), name="index"),
@@ -34,5 +60,81 @@ urlpatterns = [
     path("item/<int:pk>/edit/", ItemUpdateView.as_view(), name="item-update"),
     path("item/<int:pk>/delete/", ItemDeleteView.as_view(), name="item-delete"),
     path("item/<int:pk>/print/", print_item_detail, name="print-item"),
+    path("items/print/", print_item_labels, name="print-labels"),
+    path("items/import/", ItemImportView.as_view(), name="item-import"),
+    path(
+        "items/export.<str:fmt>",
+        ItemExportView.as_view(),
+        name="item-export",
+    ),
+    path(
+        "transactions/export.<str:fmt>",
+        TransactionExportView.as_view(),
+        name="transaction-export",
+    ),
     path("categories/", CategoryListView.as_view(), name="category-list"),
+    path("reorder/", ReorderListView.as_view(), name="reorder-list"),
+    path("reports/valuation/", ValuationReportView.as_view(), name="valuation-report"),
+    path(
+        "reports/valuation.<str:fmt>",
+        ValuationExportView.as_view(),
+        name="valuation-export",
+    ),
+    path(
+        "reports/valuation/refresh/",
+        ValuationRefreshView.as_view(),
+        name="valuation-refresh",
+    ),
+    # Stocktakes
+    path("stocktakes/", StocktakeListView.as_view(), name="stocktake-list"),
+    path("stocktakes/new/", StocktakeCreateView.as_view(), name="stocktake-create"),
+    path("stocktakes/<int:pk>/", StocktakeDetailView.as_view(), name="stocktake-detail"),
+    path("stocktakes/<int:pk>/scans/", StocktakeScanView.as_view(), name="stocktake-scans"),
+    path(
+        "stocktakes/<int:pk>/variances.<str:fmt>",
+        StocktakeVarianceExportView.as_view(),
+        name="stocktake-variances",
+    ),
+    path("stocktakes/<int:pk>/post/", StocktakePostView.as_view(), name="stocktake-post"),
+    path("stocktakes/<int:pk>/cancel/", StocktakeCancelView.as_view(), name="stocktake-cancel"),
+    # Background jobs
+    path("jobs/", JobListView.as_view(), name="job-list"),
+    path("jobs/<int:pk>/", JobDetailView.as_view(), name="job-detail"),
+    path("jobs/<int:pk>/cancel/", JobCancelView.as_view(), name="job-cancel"),
+    path("jobs/<int:pk>/output/", job_output, name="job-output"),
+    path("metrics/", metrics_view, name="metrics"),
+    path("live/", live_events, name="live-events"),
+    # Stock movements
+    path("item/<int:pk>/stock/", StockMovementView.as_view(), name="stock-movement"),
+    path("item/<int:pk>/transfer/", StockTransferView.as_view(), name="stock-transfer"),
+    path("stock/batch/", StockBatchView.as_view(), name="stock-batch"),
+    path("transactions/", TransactionHistoryView.as_view(), name="transaction-history"),
+    path(
+        "item/<int:pk>/transactions/",
+        TransactionHistoryView.as_view(),
+        name="item-transaction-history",
+    ),
+    # JSON API
+    path("api/items/", api.item_list, name="api-item-list"),
+    path("api/items/<int:pk>/", api.item_detail, name="api-item-detail"),
+    path("api/items/<int:pk>/bins/", api.item_bins, name="api-item-bins"),
+    path("api/lookup/", api.code_lookup, name="api-code-lookup"),
+    path("api/categories/", api.category_list, name="api-category-list"),
+    path("api/dashboard/", api.dashboard_stats, name="api-dashboard"),
+    path("api/suppliers/", api.supplier_list, name="api-supplier-list"),
+    path("api/warehouses/", api.warehouse_list, name="api-warehouse-list"),
+    path("api/transactions/", api.transaction_list, name="api-transaction-list"),
+    path("api/jobs/", api.job_list, name="api-job-list"),
+    path("api/jobs/<int:pk>/", api.job_detail, name="api-job-detail"),
+    path(
+        "api/reports/stock-over-time/",
+        api.stock_over_time,
+        name="api-stock-over-time",
+    ),
+    # Async (ASGI) read endpoints
+    path("api/async/items/", async_api.item_list, name="async-item-list"),
+    path("api/async/items/<int:pk>/", async_api.item_detail, name="async-item-detail"),
+    path("api/async/categories/", async_api.category_list, name="async-category-list"),
+    path("api/async/dashboard/", async_api.dashboard_stats, name="async-dashboard"),
+    path("api/async/lookup/", async_api.code_lookup, name="async-code-lookup"),
 ]
@@ -0,0 +1,259 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from .models import Item, ValuationRollup
+
+# Rollup dimension -> (item column, column holding its display label)
+DIMENSIONS = {
+    "category": ("category_id", "category__name"),
+    "supplier": ("supplier", "supplier"),
+    "location": ("location", "location"),
+}
+# Item columns the rollups are computed from or grouped by
+VALUED_COLUMNS = {
+    "quantity", "cost_price", "selling_price",
+    "category", "category_id", "supplier", "location",
+}
+EMPTY_LABELS = {"supplier": "No supplier", "location": "Unassigned"}
+
+MONEY = DecimalField(max_digits=16, decimal_places=2)
+PERCENT = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal("0"), output_field=MONEY)
+
+
+def money(expression, output_field=MONEY):
+    # Rounded in SQL, as SQLite computes decimal expressions in floating point
+    return Round(ExpressionWrapper(expression, output_field), 2, output_field=output_field)
+
+
+def margin(profit, cost):
+    # Markup on cost, as Item.profit_margin() computes it; 0 when cost is 0
+    return Case(
+        When(**{f"{cost.name}__gt": 0}, then=money(profit * 100 / cost, PERCENT)),
+        default=Value(Decimal("0"), output_field=PERCENT),
+        output_field=PERCENT,
+    )
+
+
+def valued_items(queryset=None):
+    """Items annotated with their value, computed by the database.
+
+    ``stock_value`` and ``profit_margin`` match ``Item.total_value()`` and
+    ``Item.profit_margin()``; ``retail_value`` and ``potential_profit`` are
+    the same at selling price.
+    """
+    queryset = Item.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        stock_value=money(F("quantity") * F("cost_price")),
+        retail_value=money(F("quantity") * F("selling_price")),
+        potential_profit=money(F("quantity") * (F("selling_price") - F("cost_price"))),
+        profit_margin=margin(F("selling_price") - F("cost_price"), F("cost_price")),
+    )
+
+
+def group_totals(dimension, keys=None):
+    """Aggregate items per group of ``dimension``, optionally only ``keys``."""
+    column, label = DIMENSIONS[dimension]
+    queryset = Item.objects.all()
+    if keys is not None:
+        queryset = queryset.filter(**{f"{column}__in": keys})
+    return (
+        queryset.values(column, label)
+        .annotate(
+            item_count=Count("id"),
+            units=Coalesce(Sum("quantity"), 0),
+            stock_value=Coalesce(Sum(F("quantity") * F("cost_price"), output_field=MONEY), ZERO),
+            retail_value=Coalesce(
+                Sum(F("quantity") * F("selling_price"), output_field=MONEY), ZERO
+            ),
+        )
+        .order_by()
+    )
+
+
+def keys_for(rows):
+    """``{dimension: {key, ...}}`` for ``(category_id, supplier, location)`` rows."""
+    keys = {dimension: set() for dimension in DIMENSIONS}
+    for category_id, supplier, location in rows:
+        keys["category"].add(str(category_id))
+        keys["supplier"].add(supplier)
+        keys["location"].add(location)
+    return keys
+
+
+def group_keys(queryset):
+    """``{dimension: {key, ...}}`` for the groups the given items belong to."""
+    rows = queryset.order_by().values_list("category_id", "supplier", "location").distinct()
+    return keys_for(rows.iterator(chunk_size=10000))
+
+
+def item_keys(item, previous=()):
+    """Groups of ``item``, plus those of ``previous`` (category id, supplier, location)."""
+    keys = {
+        "category": {str(item.category_id)},
+        "supplier": {item.supplier},
+        "location": {item.location},
+    }
+    for dimension, key in zip(DIMENSIONS, previous):
+        if key is not None:
+            keys[dimension].add(str(key))
+    return keys
+
+
+def mark_stale(keys):
+    """Flag the given groups for recomputation, creating rows for new ones.
+
+    Only rows not flagged yet are written, so changes to a group already
+    waiting for a refresh cost one read.
+    """
+    groups = Q()
+    for dimension, group in keys.items():
+        if group:
+            groups |= Q(dimension=dimension, key__in=group)
+    if not groups:
+        return
+    rollups = ValuationRollup.objects.filter(groups)
+    found = dict(
+        ((dimension, key), stale)
+        for dimension, key, stale in rollups.values_list("dimension", "key", "stale")
+    )
+    if not all(found.values()):
+        rollups.filter(stale=False).update(stale=True)
+    missing = [
+        ValuationRollup(dimension=dimension, key=key, stale=True)
+        for dimension, group in keys.items()
+        for key in group
+        if (dimension, key) not in found
+    ]
+    if missing:
+        ValuationRollup.objects.bulk_create(missing, batch_size=500, ignore_conflicts=True)
+
+
+def mark_items_stale(item_ids):
+    mark_stale(group_keys(Item.objects.filter(pk__in=item_ids)))
+
+
+def refresh_rollups(full=False):
+    """Recompute stale rollup rows (every row with ``full``) from the items.
+
+    The stale flags are cleared and committed before the items are read, so
+    a change committed while the totals are computed flags its group again
+    and is picked up by the next refresh. Groups left without items are
+    deleted. Returns the number of groups recomputed.
+    """
+    refreshed = 0
+    for dimension in DIMENSIONS:
+        rollups = ValuationRollup.objects.filter(dimension=dimension)
+        with transaction.atomic():
+            # A dimension with no rows yet (first run) is built in full
+            if full or not rollups.exists():
+                keys = None
+                claimed = rollups
+            else:
+                keys = list(
+                    rollups.select_for_update().filter(stale=True).values_list("key", flat=True)
+                )
+                if not keys:
+                    continue
+                claimed = rollups.filter(key__in=keys)
+            claimed.filter(stale=True).update(stale=False)
+        try:
+            refreshed += rebuild_rollups(dimension, keys)
+        except Exception:
+            # Flagged again so the next refresh retries them
+            claimed.update(stale=True)
+            raise
+    return refreshed
+
+
+def rebuild_rollups(dimension, keys=None):
+    """Rewrite the rollup rows of ``keys`` (all groups when None) from the items.
+
+    The rows are locked while they are rewritten, so concurrent refreshes of
+    a group write in the order they read the items. Stale flags are left as
+    they are.
+    """
+    now = timezone.now()
+    column, label = DIMENSIONS[dimension]
+    rollups = ValuationRollup.objects.filter(dimension=dimension)
+    with transaction.atomic():
+        locked = rollups.select_for_update()
+        list((locked if keys is None else locked.filter(key__in=keys)).values_list("pk", flat=True))
+        rows = [
+            ValuationRollup(
+                dimension=dimension,
+                key=str(row[column]),
+                label=row[label] or EMPTY_LABELS.get(dimension, ""),
+                item_count=row["item_count"],
+                units=row["units"],
+                stock_value=row["stock_value"],
+                retail_value=row["retail_value"],
+                stale=False,
+                refreshed_at=now,
+            )
+            for row in group_totals(dimension, keys)
+        ]
+        ValuationRollup.objects.bulk_create(
+            rows,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=["dimension", "key"],
+            update_fields=[
+                "label",
+                "item_count",
+                "units",
+                "stock_value",
+                "retail_value",
+                "refreshed_at",
+            ],
+        )
+        # Groups flagged again meanwhile may have gained items
+        emptied = rollups.exclude(key__in=[row.key for row in rows]).filter(stale=False)
+        if keys is not None:
+            emptied = emptied.filter(key__in=keys)
+        emptied.delete()
+    return len(keys) if keys is not None else len(rows)
+
+
+def valuation_report(dimension):
+    """Rollup rows for ``dimension`` with profit figures, plus grand totals.
+
+    Rows are served as they are, so a read never aggregates items. Groups
+    changed since their last refresh keep ``stale`` set, and
+    ``totals["stale"]`` says whether a refresh is due, including the first
+    one before any rollup exists.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown valuation dimension: {dimension!r}")
+    rows = ValuationRollup.objects.filter(dimension=dimension).annotate(
+        potential_profit=money(F("retail_value") - F("stock_value")),
+        profit_margin=margin(F("retail_value") - F("stock_value"), F("stock_value")),
+    )
+    totals = rows.aggregate(
+        item_count=Coalesce(Sum("item_count"), 0),
+        units=Coalesce(Sum("units"), 0),
+        stock_value=Coalesce(Sum("stock_value"), ZERO),
+        retail_value=Coalesce(Sum("retail_value"), ZERO),
+        groups=Count("pk"),
+        stale_groups=Count("pk", filter=Q(stale=True)),
+    )
+    totals["potential_profit"] = totals["retail_value"] - totals["stock_value"]
+    totals["stale"] = bool(totals["stale_groups"]) or (
+        not totals["groups"] and Item.objects.exists()
+    )
+    return rows, totals
+
@@ -8,12 +8,78 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
+import json
+import os
+from collections import Counter
+from datetime import date
+
 from django.contrib.auth import authenticate, login
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models.functions import Abs
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy
-from .forms import UserRegisterForm
-from .models import Item, Category
+from django.utils.crypto import constant_time_compare
+from .archive import reaches_archive
+from .export import (
+    ITEM_EXPORT_FIELDS,
+    ITEM_VALUATION_FIELDS,
+    STOCKTAKE_VARIANCE_FIELDS,
+    STREAMERS,
+    TRANSACTION_EXPORT_FIELDS,
+    VALUATION_EXPORT_FIELDS,
+)
+from .facets import get_facets
+from .fragments import CATEGORY_VERSION, cache_version, render_item_rows
+from .forms import ItemUpdateForm, StockMovementForm, StockTransferForm, UserRegisterForm
+from .importer import ItemImporter, iter_csv, iter_xlsx
+from .jobs import cancel_job, enqueue, enqueue_once, job_payload
+from .labels import label_items, render_labels
+from .live import event_stream
+from .history import start_of
+from .metrics import registry
+from .models import (
+    ArchivedTransaction,
+    Item,
+    Category,
+    InventoryTransaction,
+    Job,
+    StocktakeSession,
+    ValuationRollup,
+)
+from .pagination import (
+    EstimatedCountPaginator,
+    InvalidCursor,
+    KeysetPaginator,
+    estimated_count,
+)
+from .reorder import reorder_suggestions
+from .search import asearch_items, search_items
+from .stats import get_dashboard_stats
+from .stock import StockMovementError, apply_movement, apply_movements, transfer_stock
+from .stocktake import (
+    StocktakeError,
+    post_variances,
+    record_scans,
+    unposted_variances,
+    variance_summary,
+    variances,
+)
+from .valuation import DIMENSIONS, valuation_report, valued_items
+from .warehouses import stocked_in
 
 
 # Basic homepage with - navbar, buttons for login and signup etc.
@@ -45,64 +111,176 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Dashboard statistics
-        context["total_items"] = Item.objects.count()
-        context["total_categories"] = Category.objects.count()
-
-        # More statistics
-        context["low_stock_items"] = 1  # Default
-        context["out_of_stock_items"] = 23  # Default
+        # Dashboard statistics, served from cache and refreshed on item changes
+        stats = get_dashboard_stats()
+        context.update(stats)
+        context["top_categories"] = stats["by_category"][:5]
 
         return context
 
 
-class ItemListView(LoginRequiredMixin, ListView):
-    model = Item
-    template_name = "inventory/item_list.html"
-    context_object_name = "items"
-    paginate_by = 10
+class ItemFilterMixin:
+    """Item list filters, shared by the list, export and facet code."""
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
+    def filter_items(self, queryset):
+        queryset = self.filter_fields(queryset)
+
+        # Search by name, description, SKU or barcode if provided
+        search = self.request.GET.get("search", "").strip()
+        if search:
+            queryset = search_items(queryset, search)
+
+        return queryset
+
+    async def afilter_items(self, queryset):
+        queryset = self.filter_fields(queryset)
+        search = self.request.GET.get("search", "").strip()
+        if search:
+            queryset = await asearch_items(queryset, search)
+        return queryset
 
+    def filter_fields(self, queryset):
         # Filter by status if provided
         status = self.request.GET.get("status")
         if status:
             queryset = queryset.filter(status=status)
 
-        # Filter by location if provided
+        # Filter by location if provided; the choices come from the location
+        # facet, so an exact match can use the (location, shelf) index
         location = self.request.GET.get("location")
         if location:
-            queryset = queryset.filter(location__icontains=location)
+            queryset = queryset.filter(location=location)
 
-        # Search by name or description if provided
-        search = self.request.GET.get("search")
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search)
-                | Q(description__icontains=search)
-                | Q(sku__icontains=search)
-            )
+        # Items holding stock in a warehouse
+        warehouse = self.request.GET.get("warehouse")
+        if warehouse and warehouse.isdigit():
+            queryset = queryset.filter(stocked_in(warehouse))
+
+        # Filter by shelf and category if provided
+        shelf = self.request.GET.get("shelf")
+        if shelf:
+            queryset = queryset.filter(shelf=shelf)
+        category = self.request.GET.get("category")
+        if category and category.isdigit():
+            queryset = queryset.filter(category_id=category)
+
+        return queryset
+
+
+class ItemListView(LoginRequiredMixin, ItemFilterMixin, ListView):
+    model = Item
+    template_name = "inventory/item_list.html"
+    context_object_name = "items"
+    paginate_by = 10
+    keyset_ordering = ("name", "id")
+
+    def use_keyset(self):
+        # Opt in per request with ?paginate=cursor, or globally via settings
+        return (
+            self.request.GET.get("paginate") == "cursor"
+            or "cursor" in self.request.GET
+            or getattr(settings, "INVENTORY_KEYSET_PAGINATION", False)
+        )
 
+    def get_paginator(self, queryset, per_page, **kwargs):
+        if self.request.GET.get("count") == "estimated":
+            return EstimatedCountPaginator(queryset, per_page, **kwargs)
+        return super().get_paginator(queryset, per_page, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_queryset(self):
+        queryset = self.filter_items(super().get_queryset())
+        if self.request.GET.get("search", "").strip() and not self.use_keyset():
+            # Cursor pages must keep the (name, id) order
+            queryset = queryset.order_by("-search_rank", "name", "id")
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["status_choices"] = dict(Item.STATUS_CHOICES)
 
-        # Get unique locations for filter dropdown
-        context["locations"] = (
-            Item.objects.exclude(location="")
-            .values_list("location", flat=True)
-            .distinct()
-        )
+        # Query string of the active filters, for building pagination links
+        params = self.request.GET.copy()
+        params.pop("page", None)
+        params.pop("cursor", None)
+        context["filter_query"] = params.urlencode()
+
+        page = context["page_obj"]
+        if self.use_keyset():
+            context["keyset"] = True
+            if self.request.GET.get("count") == "estimated":
+                context["estimated_count"] = estimated_count(self.get_queryset())
+        elif page is not None:
+            # Links are built once here rather than per link in the template;
+            # only the pages around the current one are linked.
+            def page_url(number):
+                return f"?page={number}&{context['filter_query']}".rstrip("&")
+
+            window = range(
+                max(1, page.number - 2), min(page.paginator.num_pages, page.number + 2) + 1
+            )
+            context["page_links"] = [(number, page_url(number)) for number in window]
+            context["page_urls"] = {
+                "first": page_url(1),
+                "last": page_url(page.paginator.num_pages),
+                "previous": page_url(page.number - 1),
+                "next": page_url(page.number + 1),
+            }
+
+        context["item_rows"] = render_item_rows(context["items"])
+
+        # Filter dropdown choices with item counts, served from cache
+        context["facets"] = get_facets(self.request.GET)
 
         return context
 
 
 def print_item_detail(request, pk):
-    item = get_object_or_404(Item, pk=pk)
-    return render(request, "inventory/print_item.html", {"item": item})
+    item = get_object_or_404(Item.objects.select_related("category"), pk=pk)
+    return TemplateResponse(request, "inventory/print_item.html", {"item": item})
+
+
+def inline_labels():
+    # Larger label runs are rendered by a background job
+    return getattr(settings, "INVENTORY_INLINE_LABELS", 1000)
+
+
+@login_required
+def print_item_labels(request):
+    # Items are chosen by ?pk=1&pk=2 (or ?ids=1,2) and/or category, location
+    # and shelf filters; everything is fetched in one query.
+    pks = request.GET.getlist("pk") + [
+        pk for pk in request.GET.get("ids", "").split(",") if pk
+    ]
+    filters = {
+        "category_id": request.GET.get("category"),
+        "location": request.GET.get("location"),
+        "shelf": request.GET.get("shelf"),
+    }
+    filters = {key: value for key, value in filters.items() if value}
+    if not pks and not filters:
+        return TemplateResponse(
+            request, "inventory/print_labels.html", {"labels": []}, status=400
+        )
+    limit = inline_labels()
+    try:
+        items = list(label_items(pks, **filters)[:limit + 1])
+    except (ValueError, ValidationError):
+        raise Http404("Invalid label selection.")
+    if len(items) > limit:
+        job = enqueue("render_labels", {"pks": pks, "filters": filters}, request.user)
+        return redirect(job)
+    return TemplateResponse(
+        request, "inventory/print_labels.html", {"labels": render_labels(items)}
+    )
 
 
 # Add these views for item operations
@@ -114,24 +292,34 @@ class ItemDetailView(LoginRequiredMixin, DetailView):
 class ItemUpdateView(LoginRequiredMixin, UpdateView):
     model = Item
     template_name = "inventory/item_form.html"
-    fields = [
-        "name",
-        "description",
-        "category",
-        "sku",
-        "barcode",
-        "cost_price",
-        "selling_price",
-        "quantity",
-        "min_stock_level",
-        "max_stock_level",
-        "status",
-        "location",
-        "shelf",
-        "supplier",
-    ]
+    form_class = ItemUpdateForm
     success_url = reverse_lazy("item-list")
 
+    def form_valid(self, form):
+        # Quantity edits become an 'adjust' movement of the change from the
+        # quantity the user was shown, so stock moved by others meanwhile is
+        # kept rather than overwritten.
+        fields = [f for f in form.changed_data if f not in ("quantity", "quantity_seen")]
+        delta = form.cleaned_data["quantity"] - form.cleaned_data["quantity_seen"]
+        with transaction.atomic():
+            if fields:
+                form.instance.save(update_fields=fields + ["updated_at"])
+            if delta:
+                try:
+                    apply_movement(
+                        form.instance,
+                        "adjust",
+                        delta,
+                        user=self.request.user,
+                        notes="Edited from item form",
+                    )
+                except StockMovementError as exc:
+                    transaction.set_rollback(True)
+                    form.add_error("quantity", str(exc))
+                    return self.form_invalid(form)
+        self.object = form.instance
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class ItemDeleteView(LoginRequiredMixin, DeleteView):
     model = Item
@@ -165,7 +353,544 @@ class ItemCreateView(LoginRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class ReorderListView(LoginRequiredMixin, TemplateView):
+    template_name = "inventory/reorder_list.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["suppliers"] = reorder_suggestions()
+        return context
+
+
+def queue_valuation_refresh(request, totals):
+    # Stale rollups are recomputed by a worker, never inside the request
+    if totals["stale"]:
+        enqueue_once("refresh_valuation", {"full": False}, request.user)
+
+
+class ValuationReportView(LoginRequiredMixin, TemplateView):
+    """Stock value and potential profit per category, supplier or location.
+
+    Served from the materialized rollups as they are; groups changed since
+    their last refresh are marked and recomputed in the background.
+    """
+
+    template_name = "inventory/valuation_report.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        dimension = self.request.GET.get("by", "category")
+        if dimension not in DIMENSIONS:
+            dimension = "category"
+        rows, totals = valuation_report(dimension)
+        queue_valuation_refresh(self.request, totals)
+        context.update(
+            dimension=dimension,
+            dimensions=ValuationRollup.DIMENSION_CHOICES,
+            rows=rows,
+            totals=totals,
+        )
+        return context
+
+
+class ValuationRefreshView(LoginRequiredMixin, View):
+    """Rebuild every valuation rollup in the background."""
+
+    def post(self, request):
+        job = enqueue("refresh_valuation", {"full": True}, request.user)
+        return redirect(job)
+
+
 class CategoryListView(ListView):
+    """Category cards, cached until a category changes.
+
+    Signed-in users get the cached card list inside their own page; anonymous
+    hits are served the whole cached page.
+    """
+
     model = Category
     template_name = "inventory/category_list.html"
     context_object_name = "categories"
+
+    def cache_timeout(self):
+        return getattr(settings, "INVENTORY_CATEGORY_CACHE_TIMEOUT", 3600)
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+        key = f"inventory:category-page:{cache_version(CATEGORY_VERSION)}"
+        content = cache.get(key)
+        if content is None:
+            response = super().get(request, *args, **kwargs).render()
+            cache.set(key, response.content, self.cache_timeout())
+            return response
+        return HttpResponse(content)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # The queryset is only evaluated when the fragment is not cached
+        context["cache_timeout"] = self.cache_timeout()
+        context["categories_version"] = cache_version(CATEGORY_VERSION)
+        return context
+
+
+def transaction_payload(record):
+    return {
+        "id": record.pk,
+        "item": record.item_id,
+        "transaction_type": record.transaction_type,
+        "quantity": record.quantity,
+        "previous_quantity": record.previous_quantity,
+        "new_quantity": record.new_quantity,
+        "bin": record.bin_id,
+        "to_bin": record.to_bin_id,
+        "created_at": record.created_at.isoformat() if record.created_at else None,
+    }
+
+
+class StockMovementView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        form = StockMovementForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+        try:
+            record = apply_movement(pk, user=request.user, **form.cleaned_data)
+        except StockMovementError as exc:
+            return JsonResponse({"errors": {"quantity": [str(exc)]}}, status=409)
+        return JsonResponse(transaction_payload(record), status=201)
+
+
+class StockTransferView(LoginRequiredMixin, View):
+    """Move stock of one item between bins (or into/out of a bin)."""
+
+    def post(self, request, pk):
+        form = StockTransferForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+        try:
+            record = transfer_stock(pk, user=request.user, **form.cleaned_data)
+        except StockMovementError as exc:
+            return JsonResponse({"errors": {"quantity": [str(exc)]}}, status=409)
+        return JsonResponse(transaction_payload(record), status=201)
+
+
+class StockBatchView(LoginRequiredMixin, View):
+    """Apply a JSON list of movements atomically.
+
+    Each movement identifies its item by ``item`` (pk) or ``sku`` and carries
+    the same fields as a single movement; the whole batch fails if any one
+    movement is invalid or would take stock below zero.
+    """
+
+    def post(self, request):
+        try:
+            payload = json.loads(request.body)
+            rows = payload["movements"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {"errors": {"movements": ["Expected a JSON body with a movements list."]}},
+                status=400,
+            )
+
+        skus = {row["sku"] for row in rows if isinstance(row, dict) and "sku" in row}
+        sku_map = dict(Item.objects.filter(sku__in=skus).values_list("sku", "pk"))
+
+        movements, errors = [], {}
+        for index, row in enumerate(rows):
+            if not isinstance(row, dict):
+                errors[index] = {"__all__": ["Expected an object."]}
+                continue
+            form = StockMovementForm(
+                {
+                    "transaction_type": row.get("type"),
+                    "quantity": row.get("quantity"),
+                    "notes": row.get("notes", ""),
+                    "reference_number": row.get("reference_number", ""),
+                    "related_order": row.get("related_order", ""),
+                    "bin": row.get("bin"),
+                }
+            )
+            item_id = row.get("item") or sku_map.get(row.get("sku"))
+            if not form.is_valid():
+                errors[index] = form.errors
+            elif not item_id:
+                errors[index] = {"item": ["Unknown item."]}
+            else:
+                data = form.cleaned_data
+                movements.append(
+                    {
+                        "item": item_id,
+                        "type": data["transaction_type"],
+                        "quantity": data["quantity"],
+                        "notes": data["notes"],
+                        "reference_number": data["reference_number"],
+                        "related_order": data["related_order"],
+                        "bin": data["bin"],
+                    }
+                )
+        if errors:
+            return JsonResponse({"errors": errors}, status=400)
+
+        try:
+            records = apply_movements(movements, user=request.user)
+        except StockMovementError as exc:
+            return JsonResponse({"errors": {"movements": [str(exc)]}}, status=409)
+        return JsonResponse(
+            {"transactions": [transaction_payload(r) for r in records]}, status=201
+        )
+
+
+class TransactionHistoryView(LoginRequiredMixin, View):
+    """Newest-first transaction history, paged by (created_at, id) cursors."""
+
+    max_page_size = 100
+
+    def get(self, request, pk=None):
+        queryset = InventoryTransaction.objects.all()
+        archived = ArchivedTransaction.objects.all()
+        if pk is not None:
+            queryset = queryset.filter(item_id=pk)
+            archived = archived.filter(item_id=pk)
+        try:
+            limit = min(int(request.GET.get("limit", 25)), self.max_page_size)
+        except ValueError:
+            limit = 25
+        # Older pages continue into the archive once the live rows run out
+        paginator = KeysetPaginator(
+            queryset, max(limit, 1), ("-created_at", "-id"), fallbacks=[archived]
+        )
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            return JsonResponse({"errors": {"cursor": [str(exc)]}}, status=400)
+        data = {
+            "results": [transaction_payload(record) for record in page],
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        }
+        if request.GET.get("count") == "estimated":
+            counts = [estimated_count(queryset), estimated_count(archived)]
+            data["estimated_count"] = None if None in counts else sum(counts)
+        return JsonResponse(data)
+
+
+class ItemImportView(LoginRequiredMixin, View):
+    """Upload a CSV or XLSX file and upsert its rows by SKU.
+
+    Responds with created/updated/rejected counts and the first
+    ``max_errors`` row errors. Files over ``INVENTORY_INLINE_IMPORT_BYTES``
+    (or any file with ``background=1``) are imported by a background job
+    instead; the response is then a 202 pointing at the job's status.
+    """
+
+    max_errors = 1000
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return JsonResponse({"errors": {"file": ["No file uploaded."]}}, status=400)
+        try:
+            batch_size = int(request.POST.get("batch_size", 1000))
+        except ValueError:
+            batch_size = 1000
+
+        inline_bytes = getattr(settings, "INVENTORY_INLINE_IMPORT_BYTES", 256 * 1024)
+        if request.POST.get("background") == "1" or upload.size > inline_bytes:
+            job = enqueue(
+                "import_items", {"batch_size": max(batch_size, 1)}, request.user, upload
+            )
+            return JsonResponse(job_payload(job), status=202)
+
+        importer = ItemImporter(batch_size=max(batch_size, 1), user=request.user)
+        if upload.name.lower().endswith(".xlsx"):
+            rows = iter_xlsx(upload)
+        else:
+            rows = iter_csv(upload.file)
+        try:
+            result = importer.run(rows)
+        except ImportError as exc:
+            return JsonResponse({"errors": {"file": [str(exc)]}}, status=400)
+        return JsonResponse(result.as_dict(self.max_errors))
+
+
+class ExportMixin:
+    fields = None
+    filename = None
+
+    def stream(self, queryset, fmt):
+        if fmt not in STREAMERS:
+            raise Http404(f"Unsupported export format: {fmt}")
+        streamer, content_type = STREAMERS[fmt]
+        response = StreamingHttpResponse(
+            streamer(queryset, self.fields), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="{self.filename}.{fmt}"'
+        return response
+
+
+class ItemExportView(LoginRequiredMixin, ItemFilterMixin, ExportMixin, View):
+    """Stream every item matching the item list filters as CSV or JSON."""
+
+    fields = ITEM_EXPORT_FIELDS
+    filename = "items"
+
+    def get(self, request, fmt):
+        queryset = self.filter_items(Item.objects.all()).order_by("pk")
+        return self.stream(queryset, fmt)
+
+
+class TransactionExportView(LoginRequiredMixin, ExportMixin, View):
+    """Stream transaction history, optionally filtered by item, type and date."""
+
+    fields = TRANSACTION_EXPORT_FIELDS
+    filename = "transactions"
+
+    def get(self, request, fmt):
+        filters = {
+            "item_id": request.GET.get("item"),
+            "transaction_type": request.GET.get("type"),
+            "created_at__date__gte": request.GET.get("from"),
+            "created_at__date__lte": request.GET.get("to"),
+        }
+        filters = {k: v for k, v in filters.items() if v}
+        since = filters.get("created_at__date__gte")
+        try:
+            querysets = [InventoryTransaction.objects.filter(**filters)]
+            # Archived rows all predate the live ones, so they stream first
+            if reaches_archive(since and start_of(date.fromisoformat(since))):
+                querysets.insert(0, ArchivedTransaction.objects.filter(**filters))
+        except (ValueError, ValidationError) as exc:
+            return JsonResponse({"errors": {"__all__": [str(exc)]}}, status=400)
+        return self.stream([qs.order_by("created_at", "id") for qs in querysets], fmt)
+
+
+class ValuationExportView(LoginRequiredMixin, ExportMixin, View):
+    """Stream a valuation rollup (?by=category|supplier|location), or every
+    item's valuation with ?by=item, as CSV or JSON."""
+
+    def get(self, request, fmt):
+        dimension = request.GET.get("by", "category")
+        self.filename = f"valuation-{dimension}"
+        if dimension == "item":
+            self.fields = ITEM_VALUATION_FIELDS
+            return self.stream(valued_items().order_by("pk"), fmt)
+        if dimension not in DIMENSIONS:
+            return JsonResponse(
+                {"errors": {"by": [f"Choose item or one of: {', '.join(DIMENSIONS)}."]}},
+                status=400,
+            )
+        self.fields = VALUATION_EXPORT_FIELDS
+        rows, totals = valuation_report(dimension)
+        queue_valuation_refresh(request, totals)
+        return self.stream(rows, fmt)
+
+
+class StocktakeListView(LoginRequiredMixin, ListView):
+    model = StocktakeSession
+    template_name = "inventory/stocktake_list.html"
+    context_object_name = "sessions"
+    paginate_by = 50
+
+
+class StocktakeCreateView(LoginRequiredMixin, CreateView):
+    model = StocktakeSession
+    template_name = "inventory/stocktake_form.html"
+    fields = ["name", "location", "shelf", "notes"]
+
+    def form_valid(self, form):
+        form.instance.created_by = self.request.user
+        return super().form_valid(form)
+
+
+class StocktakeDetailView(LoginRequiredMixin, DetailView):
+    """Review page: count totals, the largest variances and unknown codes."""
+
+    model = StocktakeSession
+    template_name = "inventory/stocktake_detail.html"
+    context_object_name = "session"
+    max_variances = 100
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        session = self.object
+        unknown = Counter()
+        for codes in session.batches.values_list("unknown", flat=True):
+            unknown.update(codes)
+        context.update(
+            summary=variance_summary(session),
+            variances=variances(session).order_by(
+                Abs("variance_value").desc(), "pk"
+            )[:self.max_variances],
+            unknown=unknown.most_common(self.max_variances),
+            batches=session.batches.select_related("created_by")[:20],
+            post_job=Job.objects.filter(kind="post_stocktake", params__session=session.pk).first(),
+        )
+        return context
+
+
+class StocktakeScanView(LoginRequiredMixin, View):
+    """Ingest a batch of scans for a stocktake.
+
+    The JSON body is ``{"batch": "<id>", "scans": [...]}`` with up to
+    ``MAX_SCANS_PER_BATCH`` scans, each a barcode/SKU string or
+    ``{"code": ..., "quantity": n}``. Replaying a batch id is harmless: the
+    earlier result is returned with status 200 instead of 201.
+    """
+
+    def post(self, request, pk):
+        session = get_object_or_404(StocktakeSession, pk=pk)
+        try:
+            payload = json.loads(request.body)
+            batch_id, scans = str(payload["batch"]), payload["scans"]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {"errors": {"scans": ["Expected a JSON body with batch and scans."]}},
+                status=400,
+            )
+        try:
+            batch, created = record_scans(session, batch_id, scans, user=request.user)
+        except StocktakeError as exc:
+            status = 400 if session.status == "counting" else 409
+            return JsonResponse({"errors": {"scans": [str(exc)]}}, status=status)
+        return JsonResponse(
+            {
+                "batch": batch.batch_id,
+                "scans": batch.scans,
+                "items": batch.items,
+                "unknown": batch.unknown,
+                "duplicate": not created,
+            },
+            status=201 if created else 200,
+        )
+
+
+class StocktakeVarianceExportView(LoginRequiredMixin, ExportMixin, View):
+    """Stream every variance of a stocktake as CSV or JSON."""
+
+    fields = STOCKTAKE_VARIANCE_FIELDS
+
+    def get(self, request, pk, fmt):
+        session = get_object_or_404(StocktakeSession, pk=pk)
+        self.filename = f"stocktake-{session.pk}-variances"
+        return self.stream(variances(session).order_by("location", "shelf", "sku"), fmt)
+
+
+class StocktakePostView(LoginRequiredMixin, View):
+    """Post the variances (only the ``item`` ids given, if any) as 'adjust'
+    movements. Large stocktakes are posted by a background job."""
+
+    def post(self, request, pk):
+        session = get_object_or_404(StocktakeSession, pk=pk)
+        item_ids = request.POST.getlist("item") or None
+        if item_ids is not None and not all(pk.isdigit() for pk in item_ids):
+            return JsonResponse({"errors": {"item": ["Item ids must be numbers."]}}, status=400)
+        if session.status not in ("counting", "posting"):
+            return JsonResponse(
+                {"errors": {"__all__": [f"The stocktake is {session.get_status_display().lower()}."]}},
+                status=409,
+            )
+        pending = unposted_variances(session)
+        if item_ids is not None:
+            pending = pending.filter(pk__in=item_ids)
+        inline_posts = getattr(settings, "INVENTORY_INLINE_STOCKTAKE_POSTS", 2000)
+        if pending.count() > inline_posts:
+            # No more scans while the job posts
+            StocktakeSession.objects.filter(pk=session.pk).update(status="posting")
+            job = enqueue(
+                "post_stocktake", {"session": session.pk, "item_ids": item_ids}, request.user
+            )
+            return redirect(job)
+        try:
+            post_variances(session, user=request.user, item_ids=item_ids)
+        except (StocktakeError, StockMovementError) as exc:
+            return JsonResponse({"errors": {"__all__": [str(exc)]}}, status=409)
+        return redirect(session)
+
+
+class StocktakeCancelView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        # A posting job finding the session cancelled fails without posting
+        StocktakeSession.objects.filter(pk=pk, status__in=["counting", "posting"]).update(
+            status="cancelled"
+        )
+        return redirect(get_object_or_404(StocktakeSession, pk=pk))
+
+
+def user_jobs(request):
+    # Staff see every job; everyone else only the jobs they started
+    if request.user.is_staff:
+        return Job.objects.all()
+    return Job.objects.filter(created_by=request.user)
+
+
+class JobListView(LoginRequiredMixin, ListView):
+    template_name = "inventory/job_list.html"
+    context_object_name = "jobs"
+    paginate_by = 50
+
+    def get_queryset(self):
+        return user_jobs(self.request).select_related("created_by")
+
+
+class JobDetailView(LoginRequiredMixin, DetailView):
+    template_name = "inventory/job_detail.html"
+    context_object_name = "job"
+
+    def get_queryset(self):
+        return user_jobs(self.request)
+
+
+class JobCancelView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        job = get_object_or_404(user_jobs(request), pk=pk)
+        cancel_job(job)
+        return redirect(job)
+
+
+@login_required
+def job_output(request, pk):
+    job = get_object_or_404(user_jobs(request), pk=pk)
+    if not job.output_file:
+        raise Http404("This job has no output.")
+    return FileResponse(
+        job.output_file.open("rb"),
+        as_attachment=True,
+        filename=os.path.basename(job.output_file.name),
+    )
+
+
+def metrics_view(request):
+    # Scraped by Prometheus with INVENTORY_METRICS_TOKEN as a bearer token;
+    # staff can also view it. Client addresses are not trusted, since behind
+    # a reverse proxy every request comes from the proxy.
+    token = getattr(settings, "INVENTORY_METRICS_TOKEN", "")
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    authorized = bool(token) and scheme.lower() == "bearer" and constant_time_compare(
+        credentials.strip(), token
+    )
+    if not (authorized or request.user.is_staff):
+        raise Http404
+    return HttpResponse(
+        registry.prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@login_required
+async def live_events(request):
+    # Server-sent item deltas (and dashboard counters with ?stats=1). Needs
+    # an ASGI server: under WSGI a stream would hold a worker thread for good,
+    # so browsers are told not to reconnect (204) and pages stay static.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    try:
+        last_event_id = int(request.headers["Last-Event-ID"])
+    except (KeyError, ValueError):
+        last_event_id = None
+    response = StreamingHttpResponse(
+        event_stream(request.GET.get("stats") == "1", last_event_id),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
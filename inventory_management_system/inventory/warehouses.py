@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import BinStock, Warehouse
+
+WAREHOUSE_CACHE_KEY = "inventory:warehouse-summary"
+
+
+def warehouse_summary():
+    """Items in stock, units and stock value per warehouse.
+
+    Item and unit counts come from the (warehouse, item, quantity) index on
+    bin stock; only the value needs the item's cost price.
+    """
+    in_stock = Q(stock__quantity__gt=0)
+    return list(
+        Warehouse.objects.annotate(
+            items=Count("stock__item", filter=in_stock, distinct=True),
+            units=Coalesce(Sum("stock__quantity"), 0),
+            value=Coalesce(
+                Sum(F("stock__quantity") * F("stock__item__cost_price")),
+                Value(Decimal("0")),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        ).values("id", "code", "name", "is_active", "items", "units", "value")
+    )
+
+
+def cached_warehouse_summary():
+    rows = cache.get(WAREHOUSE_CACHE_KEY)
+    if rows is None:
+        rows = warehouse_summary()
+        cache.set(
+            WAREHOUSE_CACHE_KEY,
+            rows,
+            getattr(settings, "INVENTORY_FACETS_CACHE_TIMEOUT", 300),
+        )
+    return rows
+
+
+def invalidate_warehouse_summary():
+    cache.delete(WAREHOUSE_CACHE_KEY)
+
+
+def stocked_in(warehouse_id):
+    # Exists() on the index rather than a join, so no DISTINCT is needed
+    return Exists(
+        BinStock.objects.filter(item=OuterRef("pk"), warehouse_id=warehouse_id, quantity__gt=0)
+    )
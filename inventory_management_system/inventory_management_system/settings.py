@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -20,12 +21,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-wqdkzt^r0+0u+$-!!!i_04qr4d1%#9e$)n^wlq&-yu!89^-#+c'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'django-insecure-wqdkzt^r0+0u+$-!!!i_04qr4d1%#9e$)n^wlq&-yu!89^-#+c'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -50,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inventory.middleware.QueryMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'inventory_management_system.urls'
@@ -78,7 +82,7 @@ WSGI_APPLICATION = 'inventory_management_system.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -126,4 +130,31 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 LOGIN_REDIRECT_URL = '/dashboard'
-LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/'
+
+# Bearer token that lets Prometheus scrape /metrics/ without logging in
+# (staff can always view it); scraping is off while it is empty
+INVENTORY_METRICS_TOKEN = os.environ.get('INVENTORY_METRICS_TOKEN', '')
+
+# Maximum SQL queries per request, by URL name. Requests over budget are
+# logged and counted in /metrics/; tests assert them with QueryBudgetMixin.
+INVENTORY_QUERY_BUDGETS = {
+    'dashboard': 3,
+    'item-list': 6,
+    'print-item': 1,
+    'print-labels': 3,
+    'category-list': 3,
+}
+
+# Lead time for items whose supplier has no Supplier record, in days
+INVENTORY_DEFAULT_LEAD_TIME_DAYS = 7
+
+# Background jobs (inventory.jobs, run by `manage.py run_jobs`). Uploaded
+# inputs and rendered outputs live here; it must be shared with the workers.
+INVENTORY_JOB_FILES_DIR = BASE_DIR / 'job_files'
+# Uploads larger than this, and label runs over this many labels, are handed
+# to a background job instead of being processed in the request
+INVENTORY_INLINE_IMPORT_BYTES = 256 * 1024
+INVENTORY_INLINE_LABELS = 1000
+# Stocktakes with more variances than this are posted by a background job
+INVENTORY_INLINE_STOCKTAKE_POSTS = 2000
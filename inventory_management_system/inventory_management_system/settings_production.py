@@ -0,0 +1,153 @@
+"""
+Production settings, configured from the environment.
+
+Use with DJANGO_SETTINGS_MODULE=inventory_management_system.settings_production.
+Everything not set here comes from settings.py.
+
+Environment variables:
+    DJANGO_SECRET_KEY       required
+    DJANGO_ALLOWED_HOSTS    comma-separated host names
+    DJANGO_DEBUG            '1' to enable debug (default off)
+    DATABASE_ENGINE         'sqlite' (default) or 'postgresql'
+    DJANGO_SQLITE_PATH      SQLite database file (default BASE_DIR/db.sqlite3)
+    SQLITE_BUSY_TIMEOUT     seconds a writer waits for the lock (default 20)
+    SQLITE_MMAP_SIZE        bytes of the database to memory-map (default 256 MiB)
+    POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT
+    POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE
+                            enable the psycopg connection pool when max > 0
+    CONN_MAX_AGE            seconds to keep connections open when not pooling
+                            (default 60)
+    CACHE_URL               redis://... or memcached://host:port; otherwise a
+                            file cache under CACHE_DIR
+    CACHE_DIR               file cache directory (default BASE_DIR/.cache)
+    STATIC_ROOT             collectstatic target (default BASE_DIR/staticfiles)
+    INVENTORY_METRICS_TOKEN bearer token for scraping /metrics/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, TEMPLATES
+
+if 'DJANGO_SECRET_KEY' not in os.environ:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY for production.')
+
+DEBUG = os.environ.get('DJANGO_DEBUG', '0') == '1'
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+# Database
+# SQLite runs in WAL mode so readers never block the writer, and takes the
+# write lock when a transaction starts (BEGIN IMMEDIATE) so concurrent stock
+# updates queue on busy_timeout instead of failing with "database is locked"
+# when a read lock cannot be upgraded. PostgreSQL uses the driver's pool when
+# configured, persistent connections otherwise.
+
+if os.environ.get('DATABASE_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'inventory'),
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', ''),
+            'PORT': os.environ.get('POSTGRES_PORT', ''),
+            'CONN_MAX_AGE': env_int('CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if env_int('POSTGRES_POOL_MAX_SIZE', 0) > 0:
+        # Pooled connections are returned after each request; CONN_MAX_AGE must be 0
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': env_int('POSTGRES_POOL_MIN_SIZE', 2),
+            'max_size': env_int('POSTGRES_POOL_MAX_SIZE', 0),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': env_int('CONN_MAX_AGE', 60),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': env_int('SQLITE_BUSY_TIMEOUT', 20),
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)};"
+                    'PRAGMA cache_size=-20000;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+
+
+# Templates are compiled once per process
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+
+# Cache
+# Dashboard stats, facets, labels and code lookups are invalidated through the
+# cache, so every worker process must share it; local memory is not enough.
+
+CACHE_URL = os.environ.get('CACHE_URL', '')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_URL.removeprefix('memcached://'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / '.cache'),
+        }
+    }
+
+
+# Static files get content-hashed names, so they can be cached forever
+
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+    },
+}